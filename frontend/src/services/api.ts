@@ -305,8 +305,18 @@ export const leadsAPI = {
 
   async getLeads(): Promise<Lead[]> {
     try {
-      const response = await apiClient.get<Lead[]>('/api/v1/leads');
-      return response.data;
+      // The endpoint is paginated; follow X-Next-Cursor until the last page
+      const leads: Lead[] = [];
+      let cursor: string | undefined;
+      do {
+        const response = await apiClient.get<Lead[]>('/api/v1/leads', {
+          params: { limit: 500, cursor },
+        });
+        leads.push(...response.data);
+        const next = response.headers['x-next-cursor'];
+        cursor = typeof next === 'string' && next ? next : undefined;
+      } while (cursor);
+      return leads;
     } catch (error) {
       throw handleError(error as AxiosError<ApiError>);
     }
@@ -0,0 +1,201 @@
+"""
+Agent message bus on Redis Streams.
+
+Every agent has its own stream (agent_stream:<agent_id>) read through a
+consumer group named after the agent, so several replicas of one agent
+share the work without racing. Entries stay pending until a consumer
+acknowledges them. Entries left pending by a crashed consumer are reclaimed
+by the survivors, and entries that keep failing are moved to a dead-letter
+stream (agent_stream:<agent_id>:dead).
+"""
+
+import json
+import socket
+from typing import Any, Dict, List, Optional, Tuple
+
+import redis
+
+from .core.config import settings
+
+STREAM_KEY = "agent_stream:{agent_id}"
+DEAD_LETTER_KEY = "agent_stream:{agent_id}:dead"
+
+# (entry id, decoded envelope)
+BusMessage = Tuple[str, Dict[str, Any]]
+
+
+def stream_key(agent_id: str) -> str:
+    return STREAM_KEY.format(agent_id=agent_id)
+
+
+def dead_letter_key(agent_id: str) -> str:
+    return DEAD_LETTER_KEY.format(agent_id=agent_id)
+
+
+def consumer_name(index: int) -> str:
+    """
+    Names a worker's consumer thread "<AGENT_WORKER_ID>-<index>". The name
+    is stable across restarts, so a restarted worker gets its own pending
+    entries back. Consumers that share a name share pending entries, so
+    each worker process on a host needs its own AGENT_WORKER_ID.
+    """
+    return f"{settings.AGENT_WORKER_ID or socket.gethostname()}-{index}"
+
+
+def encode_envelope(sender_id: str, message: Any, **extra: Any) -> Dict[str, str]:
+    return {"data": json.dumps({"sender_id": sender_id, "message": message, **extra})}
+
+
+def publish(
+    r: redis.Redis, recipient_id: str, sender_id: str, message: Any, **extra: Any
+) -> str:
+    """Appends a message to the recipient's stream and returns its entry id."""
+    return r.xadd(
+        stream_key(recipient_id),
+        encode_envelope(sender_id, message, **extra),
+        maxlen=settings.AGENT_STREAM_MAXLEN,
+        approximate=True,
+    )
+
+
+def publish_many(
+    r: redis.Redis, messages: List[Tuple[str, str, Any]]
+) -> List[str]:
+    """
+    Appends several (recipient_id, sender_id, message) entries in one round
+    trip and returns their entry ids. Not atomic: an entry that fails does
+    not undo the others.
+    """
+    pipe = r.pipeline(transaction=False)
+    for recipient_id, sender_id, message in messages:
+        pipe.xadd(
+            stream_key(recipient_id),
+            encode_envelope(sender_id, message),
+            maxlen=settings.AGENT_STREAM_MAXLEN,
+            approximate=True,
+        )
+    return pipe.execute()
+
+
+def ensure_group(r: redis.Redis, agent_id: str) -> None:
+    """Creates the agent's consumer group (and stream) if it does not exist yet."""
+    try:
+        r.xgroup_create(stream_key(agent_id), agent_id, id="0", mkstream=True)
+    except redis.ResponseError as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+
+
+def _decode(entries) -> List[BusMessage]:
+    messages = []
+    for entry_id, fields in entries:
+        if fields is None:  # entry trimmed from the stream while pending
+            continue
+        messages.append((entry_id, json.loads(fields["data"])))
+    return messages
+
+
+def read(
+    r: redis.Redis,
+    agent_id: str,
+    consumer: str,
+    count: int = 10,
+    block_ms: Optional[int] = None,
+    last_id: str = ">",
+) -> List[BusMessage]:
+    """
+    Reads entries for a consumer of the agent's group.
+
+    The default ">" returns entries never delivered to the group. Any other
+    id returns this consumer's own unacknowledged entries after that id,
+    which is how a restarted consumer resumes ("0" for all of them).
+    """
+    response = r.xreadgroup(
+        agent_id,
+        consumer,
+        {stream_key(agent_id): last_id},
+        count=count,
+        block=block_ms,
+    )
+    if not response:
+        return []
+    _, entries = response[0]
+    return _decode(entries)
+
+
+def ack(r: redis.Redis, agent_id: str, *entry_ids: str) -> None:
+    if entry_ids:
+        r.xack(stream_key(agent_id), agent_id, *entry_ids)
+
+
+def dead_letter(
+    r: redis.Redis, agent_id: str, entry_id: str, envelope: Dict[str, Any], reason: str
+) -> None:
+    """Moves an entry to the agent's dead-letter stream and acknowledges it."""
+    r.xadd(
+        dead_letter_key(agent_id),
+        {
+            "data": json.dumps(envelope),
+            "source_id": entry_id,
+            "reason": reason,
+        },
+        maxlen=settings.AGENT_STREAM_MAXLEN,
+        approximate=True,
+    )
+    ack(r, agent_id, entry_id)
+
+
+def reclaim(
+    r: redis.Redis,
+    agent_id: str,
+    consumer: str,
+    min_idle_ms: int = settings.AGENT_RECLAIM_IDLE_MS,
+    max_deliveries: int = settings.AGENT_MAX_DELIVERIES,
+    count: int = 50,
+) -> List[BusMessage]:
+    """
+    Claims entries that have been pending for longer than min_idle_ms,
+    whether their consumer died or failed to handle them. Entries already
+    delivered max_deliveries times are dead-lettered instead of being
+    handed out again.
+    """
+    stream = stream_key(agent_id)
+    stale = r.xpending_range(
+        stream, agent_id, min="-", max="+", count=count, idle=min_idle_ms
+    )
+    if not stale:
+        return []
+
+    poisoned = {p["message_id"] for p in stale if p["times_delivered"] >= max_deliveries}
+    claimed = _decode(
+        r.xclaim(stream, agent_id, consumer, min_idle_ms, [p["message_id"] for p in stale])
+    )
+
+    messages = []
+    for entry_id, envelope in claimed:
+        if entry_id in poisoned:
+            dead_letter(r, agent_id, entry_id, envelope, "max deliveries exceeded")
+        else:
+            messages.append((entry_id, envelope))
+    return messages
+
+
+def pop(r: redis.Redis, agent_id: str, consumer: str = "mcp-api") -> Optional[Dict[str, Any]]:
+    """
+    Takes a single message off the agent's stream and acknowledges it at once.
+    Used by the polling HTTP endpoint, which has no way to acknowledge later.
+    The group is only created when a read finds it missing, rather than on
+    every poll.
+    """
+    try:
+        messages = read(r, agent_id, consumer, count=1)
+    except redis.ResponseError as e:
+        if "NOGROUP" not in str(e):
+            raise
+        ensure_group(r, agent_id)
+        messages = read(r, agent_id, consumer, count=1)
+    if not messages:
+        return None
+    entry_id, envelope = messages[0]
+    ack(r, agent_id, entry_id)
+    return envelope
@@ -1,3 +1,4 @@
+import redis
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List # Import List
@@ -5,6 +6,8 @@ from typing import List # Import List
 from ... import db_models, schemas
 from ...database import get_db
 from ...dependencies import get_current_active_user
+from ...redis_client import get_redis
+from ...services import pool_monitor, token_registry, user_principals
 
 router = APIRouter()
 
@@ -128,6 +131,7 @@ async def delete_product(
 async def make_user_superuser(
     user_id: str,
     db: Session = Depends(get_db),
+    r: redis.Redis = Depends(get_redis),
     current_user: db_models.User = Depends(get_current_active_user),
 ):
     """
@@ -151,6 +155,8 @@ async def make_user_superuser(
     db.add(user_to_update)
     db.commit()
     db.refresh(user_to_update)
+    # Effective on the user's next request, not when the cached principal expires
+    user_principals.invalidate(user_to_update.email, r=r)
 
     print(
         f"User {user_to_update.email} granted superuser privileges by {current_user.email}."
@@ -158,5 +164,58 @@ async def make_user_superuser(
     return user_to_update
 
 
+@router.post("/admin/deactivate-user/{user_id}", response_model=schemas.UserResponse)
+async def deactivate_user(
+    user_id: str,
+    db: Session = Depends(get_db),
+    r: redis.Redis = Depends(get_redis),
+    current_user: db_models.User = Depends(get_current_active_user),
+):
+    """
+    Allows a superuser to deactivate a user. Their tokens stop working at once.
+    """
+    if not current_user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only superusers can deactivate users.",
+        )
+
+    user_to_update = (
+        db.query(db_models.User).filter(db_models.User.id == user_id).first()
+    )
+    if not user_to_update:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="User not found."
+        )
+    if user_to_update.id == current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Superusers cannot deactivate themselves.",
+        )
+
+    user_to_update.is_active = False
+    db.add(user_to_update)
+    db.commit()
+    db.refresh(user_to_update)
+    user_principals.invalidate(user_to_update.email, r=r)
+    token_registry.revoke_user(r, user_to_update.email)
+
+    print(f"User {user_to_update.email} deactivated by {current_user.email}.")
+    return user_to_update
 
 
+@router.get("/admin/db-pool")
+async def get_db_pool_metrics(
+    current_user: db_models.User = Depends(get_current_active_user),
+):
+    """
+    Connection pool metrics for each database engine in this process:
+    checkouts, wait times, current usage and connections held past
+    DB_SESSION_LEAK_SECONDS (with where they were checked out).
+    """
+    if not current_user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only superusers can view database pool metrics.",
+        )
+    return pool_monitor.snapshot()
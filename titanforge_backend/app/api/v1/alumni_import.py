@@ -3,20 +3,25 @@ DeVry Alumni Pipeline - Lead Import and Outreach
 Handles CSV upload for alumni contacts and auto-triggers personalized outreach
 """
 
-import csv
-import io
-from typing import List, Optional
-from datetime import datetime
-from fastapi import APIRouter, HTTPException, Depends, UploadFile, File
+import asyncio
+import os
+import shutil
+import uuid
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, status
+from fastapi.responses import FileResponse
 from pydantic import BaseModel, EmailStr
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-import re
 
 from ...database import get_db
 from ... import db_models
 from ...dependencies import get_current_active_user
+from ...services.alumni_importer import ALUMNI_SOURCE, error_report_path
+from ...services.import_jobs import enqueue_import_job, serialize_job, spool_path
 
 router = APIRouter(prefix="/leads", tags=["leads"])
+jobs_router = APIRouter(prefix="/alumni", tags=["leads"])
 
 
 class AlumniContact(BaseModel):
@@ -30,19 +35,18 @@ class AlumniContact(BaseModel):
 class ImportResponse(BaseModel):
     """Response from alumni import."""
     status: str
-    imported_count: int
-    skipped_count: int
-    errors: List[str] = []
     message: str
+    import_id: str
+    status_url: str
 
 
-def validate_email(email: str) -> bool:
-    """Validate email format."""
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return re.match(pattern, email) is not None
+def _spool_upload(upload, path: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as spooled:
+        shutil.copyfileobj(upload, spooled, length=1024 * 1024)
 
 
-@router.post("/import-alumni")
+@router.post("/import-alumni", status_code=status.HTTP_202_ACCEPTED)
 async def import_alumni_contacts(
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
@@ -53,6 +57,9 @@ async def import_alumni_contacts(
     Expected CSV columns: name, email, company, title
     
     Automatically creates leads and triggers personalized outreach emails.
+    The file is spooled to disk and imported by a background job; poll
+    status_url for progress. Rejected rows can be downloaded from the
+    job's error_report_url.
     """
     
     if not current_user.is_superuser:
@@ -62,110 +69,68 @@ async def import_alumni_contacts(
     if not file.filename.endswith('.csv'):
         raise HTTPException(status_code=400, detail="File must be a CSV file")
     
+    job_id = uuid.uuid4()
+    path = spool_path(str(job_id))
     try:
-        # Read CSV file
-        contents = await file.read()
-        csv_text = contents.decode('utf-8')
-        csv_reader = csv.DictReader(io.StringIO(csv_text))
-        
-        imported_count = 0
-        skipped_count = 0
-        errors = []
-        
-        # Required columns
-        required_columns = {'name', 'email'}
-        
-        if not csv_reader.fieldnames:
-            raise ValueError("CSV file is empty")
-        
-        csv_columns = set(csv_reader.fieldnames)
-        if not required_columns.issubset(csv_columns):
-            raise ValueError(f"CSV must contain columns: {', '.join(required_columns)}")
-        
-        # Process each row
-        for row_num, row in enumerate(csv_reader, start=2):  # Start at 2 (header is 1)
-            try:
-                # Extract and validate data
-                name = row.get('name', '').strip()
-                email = row.get('email', '').strip()
-                company = row.get('company', '').strip()
-                title = row.get('title', '').strip()
-                
-                # Validation
-                if not name:
-                    errors.append(f"Row {row_num}: Name is required")
-                    skipped_count += 1
-                    continue
-                
-                if not email:
-                    errors.append(f"Row {row_num}: Email is required")
-                    skipped_count += 1
-                    continue
-                
-                if not validate_email(email):
-                    errors.append(f"Row {row_num}: Invalid email format: {email}")
-                    skipped_count += 1
-                    continue
-                
-                # Check if lead already exists
-                existing_lead = db.query(db_models.Lead).filter(
-                    db_models.Lead.email == email
-                ).first()
-                
-                if existing_lead:
-                    skipped_count += 1
-                    continue
-                
-                # Create new lead
-                lead = db_models.Lead(
-                    email=email,
-                    name=name,
-                    company=company if company else "DeVry Alumni",
-                    source="devry_alumni_import",
-                    status="new",
-                    phone=None,
-                    message=f"Title: {title}" if title else None,
-                )
-                
-                db.add(lead)
-                imported_count += 1
-                
-                # Trigger agent for personalized outreach email
-                # (In production, this would queue an agent task)
-                outreach_context = {
-                    "contact_name": name,
-                    "contact_email": email,
-                    "company": company or "DeVry Alumni Network",
-                    "title": title,
-                    "import_timestamp": datetime.utcnow().isoformat(),
-                }
-                
-                # Log event for agent processing
-                event = db_models.Event(
-                    user_id=current_user.id,
-                    event_type="alumni_outreach_triggered",
-                    payload=outreach_context,
-                )
-                db.add(event)
-            
-            except Exception as e:
-                errors.append(f"Row {row_num}: {str(e)}")
-                skipped_count += 1
-                continue
-        
-        # Commit all changes
-        db.commit()
-        
-        return ImportResponse(
-            status="success" if imported_count > 0 else "partial",
-            imported_count=imported_count,
-            skipped_count=skipped_count,
-            errors=errors if len(errors) > 0 else [],
-            message=f"Successfully imported {imported_count} alumni contacts. {skipped_count} skipped."
-        )
-    
+        await asyncio.to_thread(_spool_upload, file.file, path)
+    except OSError as e:
+        raise HTTPException(status_code=500, detail=f"Could not store upload: {str(e)}")
+
+    job = db_models.ImportJob(
+        id=job_id,
+        kind="alumni",
+        filename=file.filename,
+        file_path=path,
+        status="queued",
+        created_by=current_user.id,
+    )
+    db.add(job)
+    db.commit()
+    # A failed push is picked up later by the runners' stale-job sweep
+    try:
+        enqueue_import_job(str(job_id))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error processing CSV file: {str(e)}")
+        print(f"[WARNING] Could not enqueue import job {job_id}: {e}")
+
+    return ImportResponse(
+        status="queued",
+        message=f"Import of {file.filename} queued.",
+        import_id=str(job_id),
+        status_url=f"/api/v1/alumni/import/{job_id}",
+    )
+
+
+@jobs_router.get("/import/{job_id}")
+async def get_alumni_import_job(
+    job_id: uuid.UUID,
+    db: Session = Depends(get_db),
+    current_user: db_models.User = Depends(get_current_active_user),
+):
+    """Progress of a background alumni import."""
+    if not current_user.is_superuser:
+        raise HTTPException(status_code=403, detail="Only admins can view import status")
+
+    job = db.get(db_models.ImportJob, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return serialize_job(job)
+
+
+@router.get("/import-alumni/{import_id}/errors")
+async def download_alumni_import_errors(
+    import_id: uuid.UUID,
+    current_user: db_models.User = Depends(get_current_active_user),
+):
+    """Download the rows rejected by an alumni import as CSV."""
+    if not current_user.is_superuser:
+        raise HTTPException(status_code=403, detail="Only admins can view import reports")
+
+    path = error_report_path(str(import_id))
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="No error report for this import")
+    return FileResponse(
+        path, media_type="text/csv", filename=f"alumni-import-{import_id}-errors.csv"
+    )
 
 
 @router.get("/alumni/status")
@@ -178,15 +143,23 @@ async def get_alumni_import_status(
     if not current_user.is_superuser:
         raise HTTPException(status_code=403, detail="Only admins can view import status")
     
-    alumni_leads = db.query(db_models.Lead).filter(
-        db_models.Lead.source == "devry_alumni_import"
-    ).all()
+    by_status = dict(
+        db.query(db_models.Lead.status, func.count(db_models.Lead.id))
+        .filter(db_models.Lead.source == ALUMNI_SOURCE)
+        .group_by(db_models.Lead.status)
+        .all()
+    )
+    last_import = (
+        db.query(func.max(db_models.Lead.created_at))
+        .filter(db_models.Lead.source == ALUMNI_SOURCE)
+        .scalar()
+    )
     
     # Calculate metrics
-    total = len(alumni_leads)
-    new_leads = sum(1 for lead in alumni_leads if lead.status == "new")
-    contacted = sum(1 for lead in alumni_leads if lead.status == "contacted")
-    converted = sum(1 for lead in alumni_leads if lead.status == "converted")
+    total = sum(by_status.values())
+    new_leads = by_status.get("new", 0)
+    contacted = by_status.get("contacted", 0)
+    converted = by_status.get("converted", 0)
     
     return {
         "status": "active",
@@ -195,5 +168,5 @@ async def get_alumni_import_status(
         "contacted": contacted,
         "converted": converted,
         "conversion_rate": f"{(converted / total * 100):.1f}%" if total > 0 else "0%",
-        "last_import": max((lead.created_at for lead in alumni_leads), default=None),
+        "last_import": last_import,
     }
@@ -1,15 +1,21 @@
+from datetime import date
+
+import redis
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from ... import db_models
-from ...database import get_db
-from ...dependencies import get_current_active_user
+from ...database import get_async_read_db
+from ...dependencies import get_current_active_user, send_agent_message
+from ...redis_client import get_redis
+from ...services import metrics_rollup
 
 router = APIRouter()
 
 @router.get("/summary")
 async def get_analytics_summary(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
     current_user: db_models.User = Depends(get_current_active_user),
 ):
     if not current_user.is_superuser:
@@ -18,41 +24,68 @@ async def get_analytics_summary(
             detail="Not authorized to view analytics.",
         )
 
-    total_users = db.query(db_models.User).count()
-    total_signups = (
-        db.query(db_models.Event)
-        .filter(db_models.Event.event_type == "user_signup")
-        .count()
-    )
-    active_subscriptions = (
-        db.query(db_models.Subscription)
-        .filter(db_models.Subscription.status == "active")
-        .count()
-    )
-
-    mrr_estimate = 0
-    active_subs = (
-        db.query(db_models.Subscription)
-        .filter(db_models.Subscription.status == "active")
-        .all()
+    # Every counter in one statement: MRR is aggregated in SQL over the
+    # subscription/product join (yearly plans normalised to monthly) rather
+    # than looked up product by product.
+    subscriptions = (
+        select(
+            func.count(db_models.Subscription.id).label("active_subscriptions"),
+            func.coalesce(func.sum(metrics_rollup.monthly_amount_cents()), 0).label(
+                "mrr_cents"
+            ),
+        )
+        .join(db_models.Product, db_models.Subscription.product_id == db_models.Product.id)
+        .where(db_models.Subscription.status == "active")
+        .subquery()
     )
-    for sub in active_subs:
-        product = (
-            db.query(db_models.Product)
-            .filter(db_models.Product.id == sub.product_id)
-            .first()
+    summary = (await db.execute(
+        select(
+            select(func.count(db_models.User.id)).scalar_subquery().label("total_users"),
+            metrics_rollup.event_total("user_signup").label("total_signups"),
+            subscriptions.c.active_subscriptions,
+            subscriptions.c.mrr_cents,
         )
-        if product and product.type == "subscription":
-            if product.interval == "month":
-                mrr_estimate += product.unit_amount
-            elif product.interval == "year":
-                mrr_estimate += product.unit_amount / 12
+    )).one()
 
-    mrr_estimate_dollars = mrr_estimate / 100
+    mrr_estimate_dollars = float(summary.mrr_cents) / 100
 
     return {
-        "total_users": total_users,
-        "total_signups": total_signups,
-        "active_subscriptions": active_subscriptions,
+        "total_users": summary.total_users,
+        "total_signups": int(summary.total_signups),
+        "active_subscriptions": summary.active_subscriptions,
         "mrr_estimate_usd": round(mrr_estimate_dollars, 2),
     }
+
+
+@router.post("/rollup/backfill", status_code=status.HTTP_202_ACCEPTED)
+async def backfill_daily_metrics(
+    start_date: date,
+    end_date: date,
+    current_user: db_models.User = Depends(get_current_active_user),
+    r: redis.Redis = Depends(get_redis),
+):
+    """Queues a recomputation of the daily_metrics rollup for a date range."""
+    if not current_user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to backfill analytics.",
+        )
+    if end_date < start_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="end_date must not be before start_date.",
+        )
+
+    send_agent_message(
+        recipient_id="analytics_agent",
+        sender_id="mcp",
+        message_content={
+            "action": "backfill_daily_metrics",
+            "start_date": start_date.isoformat(),
+            "end_date": end_date.isoformat(),
+        },
+        r=r,
+    )
+    return {
+        "message": f"Backfill of daily metrics from {start_date} to {end_date} queued."
+    }
@@ -1,18 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
-from datetime import timedelta
+from typing import Optional
 
 from ... import crud, db_models, schemas, security
 from ...database import get_db
-from ...dependencies import send_agent_message, get_current_active_user
+from ...dependencies import oauth2_scheme, send_agent_messages, get_current_active_user
 from ...redis_client import get_redis
-from ...core.config import settings
+from ...services import token_registry, user_principals
+from ...services.password_hasher import LoginThrottle, PasswordHasherBusy, password_hasher
 import redis
 
 router = APIRouter()
 
 
+def _hasher_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Authentication is busy. Try again shortly.",
+        headers={"Retry-After": "1"},
+    )
+
+
 @router.post("/register", response_model=schemas.UserResponse, status_code=status.HTTP_201_CREATED)
 async def register(
     user: schemas.UserCreate,
@@ -40,61 +49,79 @@ async def register(
             detail="Password must be at least 8 characters long"
         )
     
-    # Create user
-    new_user = crud.create_user(db=db, user=user)
-    
-    # Send user_signup event to Analytics Agent (non-blocking)
-    try:
-        send_agent_message(
-            recipient_id="analytics_agent",
-            sender_id="mcp",
-            message_content={
-                "action": "record_event",
-                "event_type": "user_signup",
-                "user_id": str(new_user.id),
-                "payload": {"email": new_user.email},
-            },
-            r=r,
-        )
-    except Exception as e:
-        print(f"Analytics agent message failed: {e}")
-        # Don't fail registration if agent communication fails
-    
-    # Send welcome email to Notification Agent (non-blocking)
+    # Create user; the bcrypt hash runs on the hashing pool, not the event loop
     try:
-        send_agent_message(
-            recipient_id="notification_agent",
-            sender_id="mcp",
-            message_content={
-                "action": "process_notification_request",
-                "notification_type": "welcome",
-                "data": {
-                    "user_email": new_user.email,
-                    "user_name": new_user.full_name or new_user.email.split("@")[0],
+        hashed_password = await password_hasher.hash(user.password)
+    except PasswordHasherBusy:
+        raise _hasher_busy()
+    new_user = crud.create_user(db=db, user=user, hashed_password=hashed_password)
+    
+    # Signup event and welcome email, in one round trip (non-blocking:
+    # registration does not fail if agent communication does)
+    send_agent_messages(
+        [
+            (
+                "analytics_agent",
+                "mcp",
+                {
+                    "action": "record_event",
+                    "event_type": "user_signup",
+                    "user_id": str(new_user.id),
+                    "payload": {"email": new_user.email},
                 },
-            },
-            r=r,
-        )
-    except Exception as e:
-        print(f"Notification agent message failed: {e}")
-        # Don't fail registration if agent communication fails
+            ),
+            (
+                "notification_agent",
+                "mcp",
+                {
+                    "action": "process_notification_request",
+                    "notification_type": "welcome",
+                    "data": {
+                        "user_email": new_user.email,
+                        "user_name": new_user.full_name or new_user.email.split("@")[0],
+                    },
+                },
+            ),
+        ],
+        r=r,
+    )
     
     return new_user
 
 
 @router.post("/login", response_model=schemas.Token)
 async def login(
+    request: Request,
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db),
+    r: redis.Redis = Depends(get_redis),
 ):
     """
-    Authenticate user and return JWT token.
+    Authenticate user and return JWT tokens.
     
-    Uses email as username and returns access token for subsequent API calls.
+    Uses email as username and returns an access token for subsequent API
+    calls, plus a single-use refresh token for POST /refresh. Attempts are
+    limited per client IP, and a password hashed with an outdated bcrypt
+    cost is rehashed on success.
     """
+    client_ip = request.client.host if request.client else "unknown"
+    retry_after = LoginThrottle(r).hit(client_ip)
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts. Try again later.",
+            headers={"Retry-After": str(retry_after)},
+        )
     
     user = crud.get_user_by_email(db, email=form_data.username)
-    if not user or not security.verify_password(form_data.password, user.hashed_password):
+    try:
+        # Unknown emails are checked against a dummy hash, so they take as long
+        valid, new_hash = await password_hasher.verify(
+            form_data.password, user.hashed_password if user else None
+        )
+    except PasswordHasherBusy:
+        raise _hasher_busy()
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -107,12 +134,11 @@ async def login(
             detail="User account is inactive"
         )
     
-    access_token_expires = timedelta(minutes=security.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = security.create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
-    )
+    if new_hash:
+        user.hashed_password = new_hash
+        db.commit()
     
-    return {"access_token": access_token, "token_type": "bearer"}
+    return security.issue_tokens(user.email, r)
 
 
 @router.get("/me", response_model=schemas.UserResponse)
@@ -129,37 +155,63 @@ async def get_current_user(
 
 @router.post("/refresh", response_model=schemas.Token)
 async def refresh_token(
-    current_user: db_models.User = Depends(get_current_active_user),
+    request: schemas.RefreshTokenRequest,
+    db: Session = Depends(get_db),
+    r: redis.Redis = Depends(get_redis),
 ):
     """
-    Refresh JWT token for continued access.
+    Exchange a refresh token for a new access/refresh token pair.
     
-    Requires valid JWT token and returns new token.
+    Each refresh token works once. Presenting one that was already used
+    revokes every token issued from the same login.
     """
-    
-    access_token_expires = timedelta(minutes=security.ACCESS_TOKEN_EXPIRE_MINUTES)
-    new_token = security.create_access_token(
-        data={"sub": current_user.email}, expires_delta=access_token_expires
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
     )
+    token_data = security.decode_refresh_token(request.refresh_token, r=r)
+    if token_data is None or not token_data.jti:
+        raise credentials_exception
+    
+    if token_registry.consume_refresh(r, token_data.jti) is None:
+        # Already rotated: whoever holds the old token is not the client
+        revoked = token_registry.revoke_family(r, token_data.email, token_data.family)
+        print(f"[WARNING] Refresh token reuse for {token_data.email}; revoked {revoked} token(s).")
+        raise credentials_exception
     
-    return {"access_token": new_token, "token_type": "bearer"}
+    user = user_principals.get_principal(db, token_data.email, r=r)
+    if user is None or not user.is_active:
+        raise credentials_exception
+    
+    return security.issue_tokens(user.email, r, family=token_data.family)
 
 
 @router.post("/logout")
 async def logout(
+    body: Optional[schemas.LogoutRequest] = None,
+    token: str = Depends(oauth2_scheme),
     current_user: db_models.User = Depends(get_current_active_user),
     r: redis.Redis = Depends(get_redis),
 ):
     """
-    Logout current user (invalidate token on client side).
+    Logout current user.
     
-    Note: JWT tokens don't have server-side invalidation by default.
-    For true logout, client should discard the token.
-    For security-critical scenarios, add token to blacklist in Redis.
+    Revokes the presented access token and, when given, the refresh token
+    from the same login. With "everywhere": true every token of the user is
+    revoked.
     """
-    
-    # Optional: Add token to blacklist for extra security
-    # token_blacklist_key = f"token_blacklist:{current_user.id}"
-    # r.setex(token_blacklist_key, security.ACCESS_TOKEN_EXPIRE_MINUTES * 60, "true")
+    body = body or schemas.LogoutRequest()
+    if body.everywhere:
+        token_registry.revoke_user(r, current_user.email)
+        return {"message": "Logged out everywhere"}
+    
+    token_data = security.decode_access_token(token, r=r)
+    if token_data and token_data.jti:
+        token_registry.revoke(r, token_data.jti, token_data.expires_at)
+    if body.refresh_token:
+        refresh_data = security.decode_refresh_token(body.refresh_token, r=r)
+        if refresh_data and refresh_data.email == current_user.email and refresh_data.family:
+            token_registry.revoke_family(r, current_user.email, refresh_data.family)
     
     return {"message": "Logged out successfully"}
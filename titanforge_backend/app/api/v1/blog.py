@@ -6,39 +6,50 @@ from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
 
 from app import db_models, schemas
-from app.database import get_db
+from app.database import get_async_db, get_db
 from app.dependencies import get_current_active_user
 
 router = APIRouter(prefix="/blog", tags=["blog"])
 
 
+# Reads go through the async session; writes still use the sync session,
+# since they share it with get_current_active_user.
+
+def _published_post(*criteria):
+    """A published post with its author loaded up front (no lazy loads when async)."""
+    return (
+        select(db_models.BlogPost)
+        .options(selectinload(db_models.BlogPost.author))
+        .where(db_models.BlogPost.published == True, *criteria)
+    )
+
+
 @router.get("", response_model=List[schemas.BlogPostResponse])
 async def list_blog_posts(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
     published_only: bool = Query(True),
 ):
     """List blog posts with pagination. By default, shows only published posts."""
-    query = db.query(db_models.BlogPost)
+    query = select(db_models.BlogPost)
     
     if published_only:
-        query = query.filter(db_models.BlogPost.published == True)
+        query = query.where(db_models.BlogPost.published == True)
     
-    posts = query.order_by(db_models.BlogPost.created_at.desc()).offset(skip).limit(limit).all()
-    return posts
+    query = query.order_by(db_models.BlogPost.created_at.desc()).offset(skip).limit(limit)
+    return (await db.scalars(query)).all()
 
 
 @router.get("/slug/{slug}", response_model=schemas.BlogPostDetailResponse)
-async def get_post_by_slug(slug: str, db: Session = Depends(get_db)):
+async def get_post_by_slug(slug: str, db: AsyncSession = Depends(get_async_db)):
     """Get a single blog post by slug."""
-    post = db.query(db_models.BlogPost).filter(
-        db_models.BlogPost.slug == slug,
-        db_models.BlogPost.published == True
-    ).first()
+    post = await db.scalar(_published_post(db_models.BlogPost.slug == slug))
     
     if not post:
         raise HTTPException(status_code=404, detail="Blog post not found")
@@ -47,12 +58,9 @@ async def get_post_by_slug(slug: str, db: Session = Depends(get_db)):
 
 
 @router.get("/{post_id}", response_model=schemas.BlogPostDetailResponse)
-async def get_post(post_id: UUID, db: Session = Depends(get_db)):
+async def get_post(post_id: UUID, db: AsyncSession = Depends(get_async_db)):
     """Get a single blog post by ID."""
-    post = db.query(db_models.BlogPost).filter(
-        db_models.BlogPost.id == post_id,
-        db_models.BlogPost.published == True
-    ).first()
+    post = await db.scalar(_published_post(db_models.BlogPost.id == post_id))
     
     if not post:
         raise HTTPException(status_code=404, detail="Blog post not found")
@@ -161,16 +169,17 @@ async def delete_blog_post(
 
 
 @router.get("/tags/list", response_model=List[str])
-async def list_tags(db: Session = Depends(get_db)):
+async def list_tags(db: AsyncSession = Depends(get_async_db)):
     """Get all unique tags used across published posts."""
-    posts = db.query(db_models.BlogPost).filter(
-        db_models.BlogPost.published == True
-    ).all()
+    # Only the tags column is read, not every post body
+    rows = await db.scalars(
+        select(db_models.BlogPost.tags).where(db_models.BlogPost.published == True)
+    )
     
     tags_set = set()
-    for post in posts:
-        if post.tags:
-            tags_set.update(post.tags)
+    for tags in rows:
+        if tags:
+            tags_set.update(tags)
     
     return sorted(list(tags_set))
 
@@ -178,17 +187,19 @@ async def list_tags(db: Session = Depends(get_db)):
 @router.get("/tags/{tag}", response_model=List[schemas.BlogPostResponse])
 async def get_posts_by_tag(
     tag: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
 ):
     """Get all blog posts with a specific tag."""
-    posts = db.query(db_models.BlogPost).filter(
-        db_models.BlogPost.published == True,
-        db_models.BlogPost.tags.contains([tag])
-    ).order_by(db_models.BlogPost.created_at.desc()).offset(skip).limit(limit).all()
+    posts = await db.scalars(
+        select(db_models.BlogPost).where(
+            db_models.BlogPost.published == True,
+            db_models.BlogPost.tags.contains([tag])
+        ).order_by(db_models.BlogPost.created_at.desc()).offset(skip).limit(limit)
+    )
     
-    return posts
+    return posts.all()
 
 
 # Blog auto-publishing configuration
@@ -1,14 +1,19 @@
 """Dashboard endpoint - serves real-time metrics HTML and JSON."""
 
-from fastapi import APIRouter, Depends
-from fastapi.responses import HTMLResponse
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+import asyncio
+import json
+
+import redis.asyncio as aioredis
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import HTMLResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
 from pydantic import BaseModel
 
-from ...database import get_db
-from ... import db_models
+from ...database import get_async_read_db
+from ...redis_client import get_async_redis
+from ...services import dashboard_metrics
+from ...services.dashboard_stream import metrics_broadcaster
 
 router = APIRouter(tags=["dashboard"])
 
@@ -20,33 +25,26 @@ class DashboardStats(BaseModel):
     mrr: float
     projected_annual: float
     conversion_rate: float
+    leads_last_7_days: int = 0
+    signups_last_7_days: int = 0
     timestamp: str
 
 
 @router.get("/api/v1/dashboard/stats", response_model=DashboardStats)
-async def get_dashboard_stats(db: Session = Depends(get_db)):
+async def get_dashboard_stats(
+    db: AsyncSession = Depends(get_async_read_db),
+    r: aioredis.Redis = Depends(get_async_redis),
+):
     """JSON API endpoint - returns real-time metrics as JSON."""
     try:
-        # Query real database data
-        leads_count = db.query(db_models.Lead).filter(
-            db_models.Lead.status != 'converted'
-        ).count() or 0
-        
-        customers_count = db.query(db_models.User).filter(
-            db_models.User.is_active == True
-        ).count() or 0
-        
-        # MRR calculation
-        mrr_result = db.query(func.sum(db_models.Product.unit_amount)).join(
-            db_models.Subscription
-        ).filter(
-            db_models.Subscription.status == 'active'
-        ).scalar() or 0
-        
-        mrr = mrr_result / 100
-        projected_annual = mrr * 12
-        
-        conversion_rate = (customers_count / leads_count * 100) if leads_count > 0 else 0
+        metrics = await dashboard_metrics.get_metrics_async(db, r)
+        leads_count = metrics["leads_count"]
+        customers_count = metrics["customers_count"]
+        mrr = metrics["mrr"]
+        projected_annual = metrics["projected_annual"]
+        conversion_rate = metrics["conversion_rate"]
+        leads_last_7_days = metrics["leads_last_7_days"]
+        signups_last_7_days = metrics["signups_last_7_days"]
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         
     except Exception as e:
@@ -56,6 +54,8 @@ async def get_dashboard_stats(db: Session = Depends(get_db)):
         mrr = 0
         projected_annual = 0
         conversion_rate = 0
+        leads_last_7_days = 0
+        signups_last_7_days = 0
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     
     return DashboardStats(
@@ -64,34 +64,54 @@ async def get_dashboard_stats(db: Session = Depends(get_db)):
         mrr=mrr,
         projected_annual=projected_annual,
         conversion_rate=conversion_rate,
+        leads_last_7_days=leads_last_7_days,
+        signups_last_7_days=signups_last_7_days,
         timestamp=timestamp
     )
 
 
+@router.get("/api/v1/dashboard/stream")
+async def stream_dashboard_metrics(request: Request):
+    """
+    Server-sent events with the dashboard metrics: a full snapshot first,
+    then only the fields that changed whenever leads, signups or
+    subscriptions are written.
+    """
+    queue = await metrics_broadcaster.subscribe()
+
+    async def event_stream():
+        try:
+            while not await request.is_disconnected():
+                try:
+                    kind, data = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    # Keeps proxies from closing an idle connection
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: {kind}\ndata: {json.dumps(data, default=str)}\n\n"
+        finally:
+            metrics_broadcaster.unsubscribe(queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+    )
+
+
 @router.get("/dashboard", response_class=HTMLResponse)
-async def get_dashboard_html(db: Session = Depends(get_db)):
+async def get_dashboard_html(
+    db: AsyncSession = Depends(get_async_read_db),
+    r: aioredis.Redis = Depends(get_async_redis),
+):
     """Visual sales dashboard with real database data."""
     try:
-        # Query real database data
-        leads_count = db.query(db_models.Lead).filter(
-            db_models.Lead.status != 'converted'
-        ).count() or 0
-        
-        customers_count = db.query(db_models.User).filter(
-            db_models.User.is_active == True
-        ).count() or 0
-        
-        # MRR calculation
-        mrr_result = db.query(func.sum(db_models.Product.unit_amount)).join(
-            db_models.Subscription
-        ).filter(
-            db_models.Subscription.status == 'active'
-        ).scalar() or 0
-        
-        mrr = mrr_result / 100
-        projected_annual = mrr * 12
-        
-        conversion_rate = (customers_count / leads_count * 100) if leads_count > 0 else 0
+        metrics = await dashboard_metrics.get_metrics_async(db, r)
+        leads_count = metrics["leads_count"]
+        customers_count = metrics["customers_count"]
+        mrr = metrics["mrr"]
+        projected_annual = metrics["projected_annual"]
+        conversion_rate = metrics["conversion_rate"]
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     
     except Exception as e:
@@ -210,31 +230,31 @@ async def get_dashboard_html(db: Session = Depends(get_db)):
         <div class="container">
             <header>
                 <h1>TitanForge Sales Dashboard</h1>
-                <p class="subtitle">Real-time metrics • Last updated: {timestamp} UTC</p>
+                <p class="subtitle">Real-time metrics • Last updated: <span id="updated-at">{timestamp}</span> UTC</p>
             </header>
             
             <div class="metrics-grid">
                 <div class="metric-card">
                     <div class="metric-label">Total Leads</div>
-                    <div class="metric-value">{leads_count}</div>
+                    <div class="metric-value" id="leads-count">{leads_count}</div>
                     <div class="metric-desc">Downloaded ROI calculator</div>
                 </div>
                 
                 <div class="metric-card">
                     <div class="metric-label">Customers</div>
-                    <div class="metric-value">{customers_count}</div>
+                    <div class="metric-value" id="customers-count">{customers_count}</div>
                     <div class="metric-desc">Active subscriptions</div>
                 </div>
                 
                 <div class="metric-card">
                     <div class="metric-label">Monthly Recurring Revenue</div>
-                    <div class="metric-value">${mrr:,.0f}</div>
-                    <div class="metric-desc">Projected annual: ${projected_annual:,.0f}</div>
+                    <div class="metric-value" id="mrr">${mrr:,.0f}</div>
+                    <div class="metric-desc">Projected annual: <span id="projected-annual">${projected_annual:,.0f}</span></div>
                 </div>
                 
                 <div class="metric-card">
                     <div class="metric-label">Conversion Rate</div>
-                    <div class="metric-value">{conversion_rate:.1f}%</div>
+                    <div class="metric-value" id="conversion-rate">{conversion_rate:.1f}%</div>
                     <div class="metric-desc">Lead to customer</div>
                 </div>
             </div>
@@ -242,7 +262,7 @@ async def get_dashboard_html(db: Session = Depends(get_db)):
             <div class="funnel-section">
                 <div class="funnel-title">Sales Funnel</div>
                 <p style="color: #666; font-size: 13px;">
-                    <strong>Week 1 Projection:</strong> 1,250 impressions → {leads_count} leads → 12 demos → 8 trials → {customers_count} customers (6.4% conversion)
+                    <strong>Week 1 Projection:</strong> 1,250 impressions → <span id="funnel-leads">{leads_count}</span> leads → 12 demos → 8 trials → <span id="funnel-customers">{customers_count}</span> customers (6.4% conversion)
                 </p>
             </div>
             
@@ -250,6 +270,34 @@ async def get_dashboard_html(db: Session = Depends(get_db)):
                 <p>Dashboard • Real-time data from PostgreSQL database</p>
             </div>
         </div>
+        <script>
+            // Numbers update in place from /api/v1/dashboard/stream
+            const money = (value) => "$" + Math.round(value).toLocaleString("en-US");
+            const fields = {{
+                leads_count: (v) => {{
+                    document.getElementById("leads-count").textContent = v;
+                    document.getElementById("funnel-leads").textContent = v;
+                }},
+                customers_count: (v) => {{
+                    document.getElementById("customers-count").textContent = v;
+                    document.getElementById("funnel-customers").textContent = v;
+                }},
+                mrr: (v) => {{ document.getElementById("mrr").textContent = money(v); }},
+                projected_annual: (v) => {{ document.getElementById("projected-annual").textContent = money(v); }},
+                conversion_rate: (v) => {{ document.getElementById("conversion-rate").textContent = v.toFixed(1) + "%"; }},
+            }};
+            function apply(event) {{
+                const metrics = JSON.parse(event.data);
+                for (const [key, value] of Object.entries(metrics)) {{
+                    if (fields[key]) fields[key](value);
+                }}
+                document.getElementById("updated-at").textContent =
+                    new Date().toISOString().replace("T", " ").slice(0, 19);
+            }}
+            const stream = new EventSource("/api/v1/dashboard/stream");
+            stream.addEventListener("snapshot", apply);
+            stream.addEventListener("delta", apply);
+        </script>
     </body>
     </html>
     """
@@ -1,101 +1,238 @@
+import csv
+import io
+import json
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import undefer
 
 from ... import db_models
-from ...database import get_db
+from ...database import AsyncReadSessionLocal, get_async_read_db
+from ...dependencies import get_current_active_user
+from ...pagination import decode_cursor, encode_cursor, set_next_cursor
 
 router = APIRouter()
 
 
+TRANSACTION_LIST_FIELDS = (
+    "id", "stripe_event_id", "payment_intent_id", "customer_id",
+    "amount", "currency", "status", "created_at",
+)
+EXPORT_FORMATS = ("csv", "ndjson")
+EXPORT_BATCH_SIZE = 5000
+
+
+def _filter_dates(query, start_date: Optional[datetime], end_date: Optional[datetime]):
+    if start_date:
+        query = query.filter(db_models.StripeTransaction.created_at >= start_date)
+    if end_date:
+        # Ensure end_date includes the entire day
+        end_date_with_time = end_date.replace(hour=23, minute=59, second=59, microsecond=999999)
+        query = query.filter(db_models.StripeTransaction.created_at <= end_date_with_time)
+    return query
+
+
+def _transactions_query(
+    status_filter: Optional[str],
+    customer_id: Optional[str],
+    start_date: Optional[datetime],
+    end_date: Optional[datetime],
+    after: Optional[Tuple[datetime, Any]] = None,
+):
+    """The list columns only, newest first; raw_event is never read."""
+    t = db_models.StripeTransaction
+    query = select(*(getattr(t, c) for c in TRANSACTION_LIST_FIELDS))
+    if status_filter:
+        query = query.filter(t.status == status_filter)
+    if customer_id:
+        query = query.filter(t.customer_id == customer_id)
+    query = _filter_dates(query, start_date, end_date)
+    if after:
+        query = query.filter(tuple_(t.created_at, t.id) < after)
+    return query.order_by(t.created_at.desc(), t.id.desc())
+
+
+def _serialize_transaction(row) -> Dict[str, Any]:
+    item = dict(row._mapping)
+    item["id"] = str(item["id"])
+    item["created_at"] = item["created_at"].isoformat()
+    return item
+
+
+async def _export_batches(filters: Dict[str, Any]) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Walks every matching row in keyset batches. Uses its own session, since
+    the response is still streaming after the request's session is closed.
+    """
+    async with AsyncReadSessionLocal() as db:
+        after = None
+        while True:
+            query = _transactions_query(after=after, **filters).limit(EXPORT_BATCH_SIZE)
+            rows = (await db.execute(query)).all()
+            if rows:
+                yield [_serialize_transaction(row) for row in rows]
+            if len(rows) < EXPORT_BATCH_SIZE:
+                return
+            after = (rows[-1].created_at, rows[-1].id)
+
+
+async def _export_csv(filters: Dict[str, Any]) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=TRANSACTION_LIST_FIELDS)
+    writer.writeheader()
+    yield buffer.getvalue()
+    async for batch in _export_batches(filters):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(batch)
+        yield buffer.getvalue()
+
+
+async def _export_ndjson(filters: Dict[str, Any]) -> AsyncIterator[str]:
+    async for batch in _export_batches(filters):
+        yield "".join(json.dumps(item) + "\n" for item in batch)
+
+
 @router.get("/income/transactions", response_model=List[Dict[str, Any]])
 async def get_all_transactions(
-    db: Session = Depends(get_db), skip: int = 0, limit: int = 100
+    response: Response,
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: db_models.User = Depends(get_current_active_user),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
+    status_filter: Optional[str] = Query(None, alias="status"),
+    customer_id: Optional[str] = None,
+    start_date: Optional[datetime] = Query(None, description="ISO 8601 start date"),
+    end_date: Optional[datetime] = Query(None, description="ISO 8601 end date, inclusive"),
+    export: Optional[str] = Query(
+        None, description="csv or ndjson: stream every matching row instead of a page"
+    ),
 ):
     """
-    Retrieves all recorded Stripe transactions.
+    Retrieves recorded Stripe transactions, newest first.
+
+    Pages are keyed on (created_at, id); pass the X-Next-Cursor response
+    header back as ?cursor= to get the next page. With ?export= all matching
+    rows are streamed for reconciliation, and limit and cursor are ignored;
+    exports are for superusers only.
     """
-    transactions = db.query(db_models.StripeTransaction).offset(skip).limit(limit).all()
-    return [
-        {
-            "id": str(t.id),
-            "stripe_event_id": t.stripe_event_id,
-            "payment_intent_id": t.payment_intent_id,
-            "customer_id": t.customer_id,
-            "amount": t.amount,
-            "currency": t.currency,
-            "status": t.status,
-            "created_at": t.created_at.isoformat(),
-            # "raw_event": t.raw_event # Exclude raw event for brevity in list, can add specific endpoint for detail
-        }
-        for t in transactions
-    ]
+    filters = {
+        "status_filter": status_filter,
+        "customer_id": customer_id,
+        "start_date": start_date,
+        "end_date": end_date,
+    }
+    if export is not None:
+        if not current_user.is_superuser:
+            raise HTTPException(status_code=403, detail="Not authorized to export transactions.")
+        if export not in EXPORT_FORMATS:
+            raise HTTPException(
+                status_code=422, detail=f"export must be one of: {', '.join(EXPORT_FORMATS)}"
+            )
+        if export == "csv":
+            body, media_type = _export_csv(filters), "text/csv"
+        else:
+            body, media_type = _export_ndjson(filters), "application/x-ndjson"
+        return StreamingResponse(
+            body,
+            media_type=media_type,
+            headers={
+                "Content-Disposition": f'attachment; filename="stripe-transactions.{export}"'
+            },
+        )
+
+    after = tuple(decode_cursor(cursor, 2)) if cursor else None
+    query = _transactions_query(after=after, **filters).limit(limit + 1)
+    rows = (await db.execute(query)).all()
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        set_next_cursor(response, encode_cursor(last.created_at, last.id))
+    return [_serialize_transaction(row) for row in rows[:limit]]
+
+
+# Statuses that count as income: the billing agent records "succeeded"
+INCOME_STATUSES = ("succeeded", "completed")
+BUCKETS = ("day", "week", "month")
 
 
 @router.get("/income/summary")
 async def get_income_summary(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
     start_date: Optional[datetime] = Query(
         None, description="Start date for income summary (ISO 8601 format)"
     ),
     end_date: Optional[datetime] = Query(
         None, description="End date for income summary (ISO 8601 format)"
     ),
+    bucket: Optional[str] = Query(
+        None, description="Also break the totals down by day, week or month"
+    ),
 ):
     """
     Provides a summary of income, optionally filtered by date range.
-    Amounts are summed per currency.
+    Amounts are summed per currency, in minor units (cents), by the database.
     """
-    query = db.query(db_models.StripeTransaction).filter(
-        db_models.StripeTransaction.status == "completed"
-    )
-
-    if start_date:
-        query = query.filter(db_models.StripeTransaction.created_at >= start_date)
-    if end_date:
-        # Ensure end_date includes the entire day
-        end_date_with_time = (
-            end_date.replace(hour=23, minute=59, second=59, microsecond=999999)
-            if end_date
-            else None
-        )
-        query = query.filter(
-            db_models.StripeTransaction.created_at <= end_date_with_time
+    if bucket is not None and bucket not in BUCKETS:
+        raise HTTPException(
+            status_code=422, detail=f"bucket must be one of: {', '.join(BUCKETS)}"
         )
 
-    transactions = query.all()
-
-    total_income_by_currency = {}
-    for t in transactions:
-        try:
-            amount = float(t.amount)
-            if t.currency not in total_income_by_currency:
-                total_income_by_currency[t.currency] = 0.0
-            total_income_by_currency[t.currency] += amount
-        except ValueError:
-            print(
-                f"Warning: Could not convert amount '{t.amount}' to float for transaction {t.id}"
+    t = db_models.StripeTransaction
+    columns = [t.currency, func.count(t.id), func.coalesce(func.sum(t.amount), 0)]
+    if bucket:
+        period = func.date_trunc(bucket, t.created_at).label("period")
+        columns.insert(0, period)
+    query = select(*columns).where(t.status.in_(INCOME_STATUSES))
+    query = _filter_dates(query, start_date, end_date)
+
+    if bucket:
+        query = query.group_by(period, t.currency).order_by(period, t.currency)
+        rows = (await db.execute(query)).all()
+    else:
+        rows = [(None, *row) for row in (await db.execute(query.group_by(t.currency))).all()]
+
+    total_transactions = 0
+    total_income_by_currency: Dict[str, int] = {}
+    buckets = []
+    for row_period, currency, count, amount in rows:
+        total_transactions += count
+        total_income_by_currency[currency] = total_income_by_currency.get(currency, 0) + int(amount)
+        if bucket:
+            buckets.append(
+                {
+                    "period": row_period.isoformat(),
+                    "currency": currency,
+                    "transactions": count,
+                    "amount": int(amount),
+                }
             )
 
-    return {
-        "total_transactions": len(transactions),
+    summary = {
+        "total_transactions": total_transactions,
         "total_income_by_currency": total_income_by_currency,
         "start_date": start_date.isoformat() if start_date else "beginning",
         "end_date": end_date.isoformat() if end_date else "now",
     }
+    if bucket:
+        summary["bucket"] = bucket
+        summary["buckets"] = buckets
+    return summary
 
 
 @router.get("/income/transaction/{transaction_id}", response_model=Dict[str, Any])
-async def get_transaction_details(transaction_id: str, db: Session = Depends(get_db)):
+async def get_transaction_details(transaction_id: str, db: AsyncSession = Depends(get_async_read_db)):
     """
     Retrieves detailed information for a specific transaction.
     """
-    transaction = (
-        db.query(db_models.StripeTransaction)
-        .filter(db_models.StripeTransaction.id == transaction_id)
-        .first()
+    # raw_event is deferred on the model; here it is the point of the response
+    transaction = await db.scalar(
+        select(db_models.StripeTransaction)
+        .options(undefer(db_models.StripeTransaction.raw_event))
+        .where(db_models.StripeTransaction.id == transaction_id)
     )
     if not transaction:
         raise HTTPException(status_code=404, detail="Transaction not found.")
@@ -1,11 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 from email_validator import validate_email, EmailNotValidError
 
 from ... import db_models, schemas
-from ...database import get_db
-from ...dependencies import send_agent_message
+from ...database import get_async_db
+from ...pagination import decode_cursor, encode_cursor, parse_fields, set_next_cursor
+from ...dependencies import send_agent_messages
 import redis
 from ...redis_client import get_redis
 
@@ -15,7 +17,7 @@ router = APIRouter()
 @router.post("/leads", response_model=schemas.LeadResponse, status_code=status.HTTP_201_CREATED)
 async def create_lead(
     lead: schemas.LeadCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     r: redis.Redis = Depends(get_redis),
 ):
     """
@@ -36,9 +38,9 @@ async def create_lead(
         )
     
     # Check if lead already exists
-    existing_lead = db.query(db_models.Lead).filter(
-        db_models.Lead.email == email
-    ).first()
+    existing_lead = await db.scalar(
+        select(db_models.Lead.id).where(db_models.Lead.email == email).limit(1)
+    )
     
     if existing_lead:
         raise HTTPException(
@@ -49,7 +51,7 @@ async def create_lead(
     # Create new lead
     db_lead = db_models.Lead(
         email=email,
-        name=lead.name,
+        name=lead.full_name,
         company=lead.company,
         phone=lead.phone,
         message=lead.message,
@@ -58,64 +60,112 @@ async def create_lead(
     )
     
     db.add(db_lead)
-    db.commit()
-    db.refresh(db_lead)
-    
-    # Send lead_captured event to analytics agent
-    send_agent_message(
-        recipient_id="analytics_agent",
-        sender_id="mcp",
-        message_content={
-            "action": "record_event",
-            "event_type": "lead_captured",
-            "payload": {
-                "lead_id": str(db_lead.id),
-                "email": db_lead.email,
-                "source": db_lead.source,
-                "company": db_lead.company
-            },
-        },
-        r=r,
-    )
+    await db.commit()
+    await db.refresh(db_lead)
     
-    # Send welcome message to notification agent
-    send_agent_message(
-        recipient_id="notification_agent",
-        sender_id="mcp",
-        message_content={
-            "action": "process_notification_request",
-            "notification_type": "lead_welcome",
-            "data": {
-                "lead_email": db_lead.email,
-                "lead_name": db_lead.name or db_lead.email.split("@")[0],
-            },
-        },
+    # Notify the analytics and notification agents in one round trip
+    send_agent_messages(
+        [
+            (
+                "analytics_agent",
+                "mcp",
+                {
+                    "action": "record_event",
+                    "event_type": "lead_captured",
+                    "payload": {
+                        "lead_id": str(db_lead.id),
+                        "email": db_lead.email,
+                        "source": db_lead.source,
+                        "company": db_lead.company
+                    },
+                },
+            ),
+            (
+                "notification_agent",
+                "mcp",
+                {
+                    "action": "process_notification_request",
+                    "notification_type": "lead_welcome",
+                    "data": {
+                        "lead_email": db_lead.email,
+                        "lead_name": db_lead.name or db_lead.email.split("@")[0],
+                    },
+                },
+            ),
+        ],
         r=r,
     )
     
     return db_lead
 
 
-@router.get("/leads", response_model=List[schemas.LeadResponse])
+LEAD_LIST_FIELDS = (
+    "id", "email", "name", "company", "phone", "message",
+    "source", "status", "created_at", "updated_at",
+)
+
+
+@router.get(
+    "/leads",
+    response_model=List[schemas.LeadListItem],
+    response_model_exclude_unset=True,
+)
 async def list_leads(
-    db: Session = Depends(get_db),
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
+    status_filter: Optional[str] = Query(None, alias="status"),
+    source: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma separated columns to return"),
 ):
     """
-    Get all captured leads (public endpoint for now, but should require admin auth).
+    Get captured leads, newest first (public endpoint for now, but should require admin auth).
+
+    Pages are keyed on (created_at, id); pass the X-Next-Cursor response
+    header back as ?cursor= to get the next page. Only the selected columns
+    are read, so list views never hydrate full ORM objects.
     """
-    leads = db.query(db_models.Lead).order_by(db_models.Lead.created_at.desc()).all()
-    return leads
+    returned = parse_fields(fields, LEAD_LIST_FIELDS, required=())
+    columns = parse_fields(fields, LEAD_LIST_FIELDS, required=("id", "created_at"))
+    query = select(*(getattr(db_models.Lead, c) for c in columns))
+
+    if status_filter:
+        query = query.where(db_models.Lead.status == status_filter)
+    if source:
+        query = query.where(db_models.Lead.source == source)
+    if cursor:
+        created_at, lead_id = decode_cursor(cursor, 2)
+        query = query.where(
+            tuple_(db_models.Lead.created_at, db_models.Lead.id) < (created_at, lead_id)
+        )
+
+    rows = (
+        await db.execute(
+            query.order_by(db_models.Lead.created_at.desc(), db_models.Lead.id.desc())
+            .limit(limit + 1)
+        )
+    ).all()
+    page = [dict(row._mapping) for row in rows[:limit]]
+    if len(rows) > limit:
+        last = page[-1]
+        set_next_cursor(response, encode_cursor(last["created_at"], last["id"]))
+
+    if len(returned) < len(columns):
+        # Cursor columns are read but only returned when asked for
+        page = [{k: row[k] for k in returned} for row in page]
+    return page
 
 
 @router.get("/leads/{lead_id}", response_model=schemas.LeadResponse)
 async def get_lead(
     lead_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Get a specific lead by ID.
     """
-    lead = db.query(db_models.Lead).filter(db_models.Lead.id == lead_id).first()
+    lead = await db.scalar(select(db_models.Lead).where(db_models.Lead.id == lead_id))
     if not lead:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
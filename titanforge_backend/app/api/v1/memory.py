@@ -1,3 +1,5 @@
+from typing import Any, Dict
+
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 import redis
@@ -5,6 +7,7 @@ import redis
 from ... import db_models
 from ...dependencies import get_current_active_user
 from ...redis_client import get_redis
+from ...services import long_term_memory
 
 router = APIRouter()
 
@@ -34,3 +37,30 @@ async def get_from_short_term_memory(
             status_code=404, detail="Agent not found in short-term memory."
         )
     return {"memory": memory}
+
+class LongTermMemoryAdd(BaseModel):
+    agent_id: str
+    document: str
+    metadata: Dict[str, Any] = {}
+
+class LongTermMemoryQuery(BaseModel):
+    agent_id: str
+    query_text: str
+    n_results: int = 3
+
+@router.post("/long_term/add")
+async def add_to_long_term_memory(
+    item: LongTermMemoryAdd,
+    r: redis.Redis = Depends(get_redis),
+    current_user: db_models.User = Depends(get_current_active_user),
+):
+    long_term_memory.add(r, item.agent_id, item.document, item.metadata)
+    return {"message": "Document added to long-term memory."}
+
+@router.post("/long_term/query")
+async def query_long_term_memory(
+    item: LongTermMemoryQuery,
+    r: redis.Redis = Depends(get_redis),
+    current_user: db_models.User = Depends(get_current_active_user),
+):
+    return {"results": long_term_memory.query(r, item.agent_id, item.query_text, item.n_results)}
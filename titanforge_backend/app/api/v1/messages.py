@@ -1,9 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
-import json
 import redis
 
-from ... import db_models
+from ... import agent_bus, db_models
 from ...dependencies import get_current_active_user
 from ...redis_client import get_redis
 
@@ -49,14 +48,13 @@ async def send_message(
             status_code=404, detail=f"Recipient agent '{item.recipient_id}' not found."
         )
 
-    message_content = json.dumps(
-        {
-            "sender_id": item.sender_id,
-            "message": item.message,
-            "user_id": str(current_user.id),
-        }
+    agent_bus.publish(
+        r,
+        item.recipient_id,
+        item.sender_id,
+        item.message,
+        user_id=str(current_user.id),
     )
-    r.rpush(item.recipient_id, message_content)
 
     return {"message": f"Message queued for agent '{item.recipient_id}'."}
 
@@ -69,11 +67,7 @@ async def receive_message(
     if agent_id not in agent_registry:
         raise HTTPException(status_code=404, detail=f"Agent '{agent_id}' not found.")
 
-    message = r.lpop(agent_id)
-    if message:
-        return {"message": json.loads(message)}
-
-    return {"message": None}
+    return {"message": agent_bus.pop(r, agent_id)}
 
 class SpeakRequest(BaseModel):
     text: str
@@ -7,10 +7,16 @@ import os
 import json
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
+import redis.asyncio as aioredis
 from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, EmailStr
 
+from ...database import get_async_read_db
+from ...redis_client import get_async_redis
+from ...services import dashboard_metrics
+
 router = APIRouter(prefix="/sales", tags=["sales"])
 
 # ============================================================
@@ -164,139 +170,91 @@ async def record_customer(
 # ============================================================
 
 @router.get("/funnel/pipeline")
-async def get_sales_pipeline(db: Session = Depends(lambda: None)):
-    """Real-time sales pipeline status from database."""
-    from ...database import get_db, SessionLocal
-    from ... import db_models
-    from sqlalchemy import func
-    
-    # Get database session
-    db = SessionLocal()
+async def get_sales_pipeline(
+    db: AsyncSession = Depends(get_async_read_db),
+    r: aioredis.Redis = Depends(get_async_redis),
+):
+    """Real-time sales pipeline status from the shared metrics cache."""
+    metrics = await dashboard_metrics.get_metrics_async(db, r)
+    leads_count = metrics["leads_count"]
+    customers_count = metrics["customers_count"]
+    mrr = metrics["mrr"]
+
+    # Avoid division by zero
+    demo_requests = max(1, leads_count // 4)
+    trials_started = max(1, customers_count)
     
-    try:
-        # Query real database data
-        leads_count = db.query(db_models.Lead).filter(
-            db_models.Lead.status != 'converted'
-        ).count()
-        
-        customers_count = db.query(db_models.User).filter(
-            db_models.User.is_active == True
-        ).count()
-        
-        # Calculate MRR from subscriptions
-        mrr_result = db.query(func.sum(db_models.Product.unit_amount)).join(
-            db_models.Subscription
-        ).filter(
-            db_models.Subscription.status == 'active'
-        ).scalar()
+    if leads_count > 0 and demo_requests > 0:
+        lead_to_demo_rate = (demo_requests / leads_count) * 100
+    else:
+        lead_to_demo_rate = 0
         
-        mrr = (mrr_result or 0) / 100  # Convert cents to dollars
-        projected_annual = mrr * 12
-        
-        # Avoid division by zero
-        demo_requests = max(1, leads_count // 4)
-        trials_started = max(1, customers_count)
-        
-        if leads_count > 0 and demo_requests > 0:
-            lead_to_demo_rate = (demo_requests / leads_count) * 100
-        else:
-            lead_to_demo_rate = 0
-            
-        if demo_requests > 0 and trials_started > 0:
-            demo_to_trial_rate = (trials_started / demo_requests) * 100
-        else:
-            demo_to_trial_rate = 0
-        
-        pipeline = {
-            "timestamp": datetime.utcnow().isoformat(),
-            "funnel_stages": {
-                "leads": leads_count,
-                "demo_requests": demo_requests,
-                "trials_started": trials_started,
-                "customers": customers_count,
-            },
-            "conversion_rates": {
-                "lead_to_demo": f"{lead_to_demo_rate:.1f}%",
-                "demo_to_trial": f"{demo_to_trial_rate:.1f}%",
-                "trial_to_customer": f"{(customers_count / max(trials_started, 1)) * 100:.1f}%",
-            },
-            "mrr_pipeline": {
-                "customer_stage": f"${mrr:,.2f}",
-                "projected_monthly": f"${mrr:,.2f}",
-            },
-            "sales_health": {
-                "status": "ACTIVE" if leads_count > 0 else "PENDING",
-                "leads": leads_count,
-                "customers": customers_count,
-                "mrr": f"${mrr:,.2f}",
-            }
-        }
-        
-        return pipeline
+    if demo_requests > 0 and trials_started > 0:
+        demo_to_trial_rate = (trials_started / demo_requests) * 100
+    else:
+        demo_to_trial_rate = 0
     
-    finally:
-        db.close()
+    return {
+        "timestamp": datetime.utcnow().isoformat(),
+        "funnel_stages": {
+            "leads": leads_count,
+            "demo_requests": demo_requests,
+            "trials_started": trials_started,
+            "customers": customers_count,
+        },
+        "conversion_rates": {
+            "lead_to_demo": f"{lead_to_demo_rate:.1f}%",
+            "demo_to_trial": f"{demo_to_trial_rate:.1f}%",
+            "trial_to_customer": f"{(customers_count / max(trials_started, 1)) * 100:.1f}%",
+        },
+        "mrr_pipeline": {
+            "customer_stage": f"${mrr:,.2f}",
+            "projected_monthly": f"${mrr:,.2f}",
+        },
+        "sales_health": {
+            "status": "ACTIVE" if leads_count > 0 else "PENDING",
+            "leads": leads_count,
+            "customers": customers_count,
+            "mrr": f"${mrr:,.2f}",
+        }
+    }
 
 
 @router.get("/funnel/dashboard")
-async def get_dashboard(db: Session = Depends(lambda: None)):
-    """Executive dashboard for sales metrics from real database."""
-    from ...database import SessionLocal
-    from ... import db_models
-    from sqlalchemy import func
-    
-    db = SessionLocal()
-    
-    try:
-        # Query real data
-        leads_count = db.query(db_models.Lead).filter(
-            db_models.Lead.status != 'converted'
-        ).count()
-        
-        customers_count = db.query(db_models.User).filter(
-            db_models.User.is_active == True
-        ).count()
-        
-        # Calculate MRR
-        mrr_result = db.query(func.sum(db_models.Product.unit_amount)).join(
-            db_models.Subscription
-        ).filter(
-            db_models.Subscription.status == 'active'
-        ).scalar()
-        
-        mrr = (mrr_result or 0) / 100
-        projected_annual = mrr * 12
-        
-        # Calculate conversion rate
-        if leads_count > 0:
-            conversion_rate = (customers_count / leads_count) * 100
-        else:
-            conversion_rate = 0
-        
-        return {
-            "period": datetime.now().strftime("%Y-%m-%d"),
-            "key_metrics": {
-                "total_leads": leads_count,
-                "customers": customers_count,
-                "mrr": f"${mrr:,.2f}",
-                "projected_annual": f"${projected_annual:,.2f}",
-            },
-            "weekly_trend": {
-                "leads_generated": f"+{leads_count} leads",
-                "conversion_rate": f"{conversion_rate:.1f}%",
-                "customers": customers_count,
-                "mrr": f"${mrr:,.2f}",
-            },
-            "sales_health": {
-                "status": "ACTIVE" if leads_count > 0 or customers_count > 0 else "PENDING",
-                "leads": leads_count,
-                "customers": customers_count,
-                "mrr": f"${mrr:,.2f}",
-            },
-        }
+async def get_dashboard(
+    db: AsyncSession = Depends(get_async_read_db),
+    r: aioredis.Redis = Depends(get_async_redis),
+):
+    """Executive dashboard for sales metrics from the shared metrics cache."""
+    metrics = await dashboard_metrics.get_metrics_async(db, r)
+    leads_count = metrics["leads_count"]
+    customers_count = metrics["customers_count"]
+    mrr = metrics["mrr"]
+    projected_annual = metrics["projected_annual"]
+    conversion_rate = metrics["conversion_rate"]
     
-    finally:
-        db.close()
+    return {
+        "period": datetime.now().strftime("%Y-%m-%d"),
+        "key_metrics": {
+            "total_leads": leads_count,
+            "customers": customers_count,
+            "mrr": f"${mrr:,.2f}",
+            "projected_annual": f"${projected_annual:,.2f}",
+        },
+        "weekly_trend": {
+            "leads_generated": f"+{metrics['leads_last_7_days']} leads",
+            "daily": metrics["daily"],
+            "conversion_rate": f"{conversion_rate:.1f}%",
+            "customers": customers_count,
+            "mrr": f"${mrr:,.2f}",
+        },
+        "sales_health": {
+            "status": "ACTIVE" if leads_count > 0 or customers_count > 0 else "PENDING",
+            "leads": leads_count,
+            "customers": customers_count,
+            "mrr": f"${mrr:,.2f}",
+        },
+    }
 
 
 # ============================================================
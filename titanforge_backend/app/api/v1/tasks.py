@@ -1,19 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import Any, Dict, List, Literal
 from pydantic import BaseModel
 from datetime import datetime
+import asyncio
+import json
 import redis
 
 from ... import crud, db_models, schemas, security
-from ...database import get_db
+from ...database import SessionLocal, get_db
 from ...dependencies import get_current_active_user, send_agent_message
 from ...redis_client import get_redis
-from swarm.departments.executive_board.ceo import CEO
-from ...core.config import settings
+from ...services.goal_dispatcher import enqueue_goal, serialize_task, task_events_channel
 
 router = APIRouter()
 
+TERMINAL_STATUSES = {"completed", "failed"}
+
 class Goal(BaseModel):
     description: str
 
@@ -21,13 +25,19 @@ class TaskUpdate(BaseModel):
     status: Literal["in_progress", "completed", "failed"]
     agent_id: str
 
-@router.post("/goals")
+@router.post("/goals", status_code=status.HTTP_202_ACCEPTED)
 async def submit_goal(
     goal: Goal,
     db: Session = Depends(get_db),
     current_user: db_models.User = Depends(get_current_active_user),
     r: redis.Redis = Depends(get_redis),
 ):
+    """
+    Persists a goal and queues it for the background CEO dispatch workers.
+
+    Returns immediately with the task id; the CEO's routing result is
+    available from GET /tasks/{task_id} or streamed from /tasks/{task_id}/events.
+    """
     print(f"MCP Received new goal from user {current_user.email}: {goal.description}")
     try:
         new_task = db_models.Task(
@@ -41,6 +51,8 @@ async def submit_goal(
         db.refresh(new_task)
         task_id = str(new_task.id)
 
+        enqueue_goal(task_id, goal.description, str(current_user.id), r)
+
         send_agent_message(
             recipient_id="analytics_agent",
             sender_id="mcp",
@@ -53,14 +65,10 @@ async def submit_goal(
             r=r,
         )
 
-        ceo_agent = CEO(model_name=settings.LLM_MODEL_NAME)
-        task_description_with_id = f"Task ID: {task_id}. Goal: {goal.description}"
-        result = ceo_agent.execute_task(task_description_with_id)
-
         return {
-            "message": "Goal received and task created.",
+            "message": "Goal received and queued for the CEO.",
             "task_id": task_id,
-            "ceo_response": result,
+            "status": new_task.status,
         }
     except Exception as e:
         db.rollback()
@@ -84,37 +92,73 @@ async def get_all_tasks(
     current_user: db_models.User = Depends(get_current_active_user),
 ):
     tasks = db.query(db_models.Task).all()
-    return [
-        {
-            "id": str(task.id),
-            "description": task.description,
-            "status": task.status,
-            "created_at": task.created_at,
-            "history": task.history,
-        }
-        for task in tasks
-    ]
+    return [serialize_task(task) for task in tasks]
 
-@router.put("/tasks/{task_id}")
-async def update_task_status(
+@router.get("/tasks/{task_id}", response_model=Dict[str, Any])
+async def get_task(
     task_id: str,
-    update: TaskUpdate,
     db: Session = Depends(get_db),
     current_user: db_models.User = Depends(get_current_active_user),
 ):
     task = db.query(db_models.Task).filter(db_models.Task.id == task_id).first()
     if not task:
         raise HTTPException(status_code=404, detail="Task not found.")
+    return serialize_task(task)
 
-    task.status = update.status
-    new_history = task.history + [
-        {
-            "status": update.status,
-            "agent_id": update.agent_id,
-            "timestamp": datetime.utcnow().isoformat(),
-        }
-    ]
-    task.history = new_history
+@router.get("/tasks/{task_id}/events")
+async def stream_task_events(
+    task_id: str,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: db_models.User = Depends(get_current_active_user),
+    r: redis.Redis = Depends(get_redis),
+):
+    """
+    Server-sent events for a task: the current state first, then every
+    status change published by the dispatcher until the task finishes.
+    """
+    if not db.query(db_models.Task.id).filter(db_models.Task.id == task_id).first():
+        raise HTTPException(status_code=404, detail="Task not found.")
+
+    def load_task() -> Dict[str, Any] | None:
+        session = SessionLocal()
+        try:
+            task = session.query(db_models.Task).filter(db_models.Task.id == task_id).first()
+            return serialize_task(task) if task else None
+        finally:
+            session.close()
+
+    async def event_stream():
+        pubsub = r.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(task_events_channel(task_id))
+        try:
+            # Read the state only after subscribing so no transition is missed
+            current = await asyncio.to_thread(load_task)
+            if current is None:
+                return
+            yield f"data: {json.dumps(current, default=str)}\n\n"
+            if current["status"] in TERMINAL_STATUSES:
+                return
+            while not await request.is_disconnected():
+                message = await asyncio.to_thread(pubsub.get_message, timeout=1.0)
+                if message is None:
+                    continue
+                yield f"data: {message['data']}\n\n"
+                if json.loads(message["data"]).get("status") in TERMINAL_STATUSES:
+                    return
+        finally:
+            pubsub.close()
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
 
-    db.commit()
+@router.put("/tasks/{task_id}")
+async def update_task_status(
+    task_id: str,
+    update: TaskUpdate,
+    db: Session = Depends(get_db),
+    current_user: db_models.User = Depends(get_current_active_user),
+):
+    task = crud.update_task_status(db, task_id, update.status, update.agent_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found.")
     return {"message": f"Task {task_id} status updated to {update.status}"}
@@ -1,3 +1,4 @@
+from datetime import datetime
 from typing import Optional
 from uuid import UUID
 
@@ -15,8 +16,12 @@ def get_user_by_email(db: Session, email: str) -> Optional[db_models.User]:
     return db.query(db_models.User).filter(db_models.User.email == email).first()
 
 
-def create_user(db: Session, user: schemas.UserCreate) -> db_models.User:
-    hashed_password = get_password_hash(user.password)
+def create_user(
+    db: Session, user: schemas.UserCreate, hashed_password: Optional[str] = None
+) -> db_models.User:
+    """Creates a user; async callers pass a hash made off the event loop."""
+    if hashed_password is None:
+        hashed_password = get_password_hash(user.password)
     db_user = db_models.User(
         email=user.email, hashed_password=hashed_password, full_name=user.full_name
     )
@@ -24,3 +29,21 @@ def create_user(db: Session, user: schemas.UserCreate) -> db_models.User:
     db.commit()
     db.refresh(db_user)
     return db_user
+
+
+def update_task_status(
+    db: Session, task_id: str, status: str, agent_id: str
+) -> Optional[db_models.Task]:
+    task = db.query(db_models.Task).filter(db_models.Task.id == task_id).first()
+    if not task:
+        return None
+    task.status = status
+    task.history = (task.history or []) + [
+        {
+            "status": status,
+            "agent_id": agent_id,
+            "timestamp": datetime.utcnow().isoformat(),
+        }
+    ]
+    db.commit()
+    return task
@@ -1,13 +1,88 @@
+from contextlib import contextmanager
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 
 from .core.config import settings
+from .services import pool_monitor
+from .services.pool_monitor import TimedAsyncQueuePool, TimedQueuePool
+
+# Async drivers for the sync URL schemes this app is configured with
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+}
+
+
+def async_database_url(url: str) -> str:
+    """The async-driver form of a sync database URL."""
+    parsed = make_url(url)
+    drivername = ASYNC_DRIVERS.get(parsed.drivername, parsed.drivername)
+    return parsed.set(drivername=drivername).render_as_string(hide_password=False)
+
+
+def pool_options() -> dict:
+    """Pool settings shared by every engine; each engine gets its own pool."""
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
 
-engine = create_engine(settings.DATABASE_URL)
+def _engine(name: str, url: str):
+    engine = create_engine(url, poolclass=TimedQueuePool, **pool_options())
+    pool_monitor.watch(name, engine)
+    return engine
+
+
+def _async_engine(name: str, url: str):
+    if settings.ASYNC_DATABASE_NULL_POOL:
+        return create_async_engine(url, poolclass=NullPool)
+    engine = create_async_engine(url, poolclass=TimedAsyncQueuePool, **pool_options())
+    pool_monitor.watch(name, engine)
+    return engine
+
+
+engine = _engine("primary", settings.DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# Async handlers use these, so a query awaits its connection instead of
+# blocking the event loop. Objects stay readable after commit, as handlers
+# return them to be serialized once the session is closed.
+async_engine = _async_engine(
+    "primary_async",
+    settings.ASYNC_DATABASE_URL or async_database_url(settings.DATABASE_URL),
+)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
+# Reporting reads (dashboard, analytics, income) go to the replica when one
+# is configured. It may lag the primary by a moment, so nothing that reads
+# its own writes belongs here.
+if settings.DATABASE_REPLICA_URL:
+    replica_engine = _engine("replica", settings.DATABASE_REPLICA_URL)
+    async_replica_engine = _async_engine(
+        "replica_async",
+        settings.ASYNC_DATABASE_REPLICA_URL or async_database_url(settings.DATABASE_REPLICA_URL),
+    )
+else:
+    replica_engine, async_replica_engine = engine, async_engine
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=replica_engine)
+AsyncReadSessionLocal = async_sessionmaker(
+    async_replica_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
 
 def get_db():
     """FastAPI dependency to get a DB session."""
@@ -18,6 +93,34 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    """FastAPI dependency to get an async DB session."""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_async_read_db():
+    """FastAPI dependency to get an async session on the read replica (or primary)."""
+    async with AsyncReadSessionLocal() as db:
+        yield db
+
+
+async def dispose_engines() -> None:
+    await async_engine.dispose()
+    if async_replica_engine is not async_engine:
+        await async_replica_engine.dispose()
+
+
+@contextmanager
+def agent_session():
+    """A DB session for agents that is closed on every path, including errors."""
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
 def get_db_session_from_agent():
     """Utility function for agents to get a DB session."""
     db = SessionLocal()
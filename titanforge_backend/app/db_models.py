@@ -1,9 +1,9 @@
 import uuid
 
-from sqlalchemy import (JSON, Boolean, Column, DateTime, ForeignKey, Integer,
-                        String)
+from sqlalchemy import (JSON, BigInteger, Boolean, Column, Date, DateTime,
+                        ForeignKey, Index, Integer, String, UniqueConstraint)
 from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import deferred, relationship
 from sqlalchemy.sql import func
 
 from .database import Base
@@ -98,6 +98,91 @@ class Event(Base):
     user = relationship("User", back_populates="events")
 
 
+class DailyMetric(Base):
+    """Per-day rollup of events and business snapshots (see app/services/metrics_rollup.py)."""
+
+    __tablename__ = "daily_metrics"
+    __table_args__ = (
+        UniqueConstraint("day", "event_type", "source", name="uq_daily_metrics_day_type_source"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    day = Column(Date, nullable=False, index=True)
+    event_type = Column(String, nullable=False)  # event type, or "snapshot:<name>"
+    source = Column(String, nullable=False, default="")  # payload source / utm_source
+    count = Column(Integer, nullable=False, default=0)
+    amount = Column(Integer, nullable=True)  # In cents, for money snapshots such as MRR
+    computed_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class MetricsWatermark(Base):
+    """Last fully aggregated day for an incremental rollup."""
+
+    __tablename__ = "metrics_watermarks"
+
+    name = Column(String, primary_key=True)
+    last_day = Column(Date, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class ImportJob(Base):
+    """A background contact import; progress is committed with each chunk."""
+
+    __tablename__ = "import_jobs"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    kind = Column(String, nullable=False, default="alumni")
+    filename = Column(String, nullable=True)
+    file_path = Column(String, nullable=False)  # Spooled upload under IMPORT_DIR
+    status = Column(String, nullable=False, default="queued", index=True)  # queued, running, completed, failed
+    created_by = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=True)
+    rows_processed = Column(Integer, nullable=False, default=0)
+    imported_count = Column(Integer, nullable=False, default=0)
+    skipped_count = Column(Integer, nullable=False, default=0)
+    error_count = Column(Integer, nullable=False, default=0)
+    chunks_committed = Column(Integer, nullable=False, default=0)
+    last_row = Column(Integer, nullable=False, default=0)  # Resume point
+    attempts = Column(Integer, nullable=False, default=0)
+    error = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class OutreachBatch(Base):
+    """Outreach for all leads created by one import, fanned out in chunks."""
+
+    __tablename__ = "outreach_batches"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    import_id = Column(String, unique=True, index=True, nullable=False)
+    created_by = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=True)
+    status = Column(String, nullable=False, default="staging", index=True)  # staging, ready, queued, completed
+    total = Column(Integer, nullable=False, default=0)
+    queued_count = Column(Integer, nullable=False, default=0)
+    sent_count = Column(Integer, nullable=False, default=0)
+    failed_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class OutreachRecipient(Base):
+    """Compact per-lead outreach status within a batch."""
+
+    __tablename__ = "outreach_recipients"
+    __table_args__ = (
+        # Fan-out counts and pages pending recipients per mail domain
+        Index("ix_outreach_recipients_batch_status_domain", "batch_id", "status", "domain"),
+    )
+
+    batch_id = Column(UUID(as_uuid=True), ForeignKey("outreach_batches.id"), primary_key=True)
+    lead_id = Column(UUID(as_uuid=True), ForeignKey("leads.id"), primary_key=True)
+    domain = Column(String, nullable=False)
+    status = Column(String(16), nullable=False, default="pending")  # pending, queued, sent, failed
+    queued_at = Column(DateTime(timezone=True), nullable=True)  # When fan-out last handed it to the agent
+
+
 class Task(Base):
     __tablename__ = "tasks"
 
@@ -106,26 +191,47 @@ class Task(Base):
     status = Column(String, default="pending")
     created_at = Column(DateTime)
     history = Column(JSON)
+    result = Column(JSON, nullable=True)  # CEO routing outcome, set by the dispatcher
 
 
 
 class StripeTransaction(Base):
     __tablename__ = "stripe_transactions"
+    __table_args__ = (
+        # Income summary: SUM(amount) GROUP BY currency answered from the index
+        Index(
+            "ix_stripe_transactions_status_created_at",
+            "status",
+            "created_at",
+            postgresql_include=["currency", "amount"],
+        ),
+        # Keyset pagination for GET /income/transactions
+        Index("ix_stripe_transactions_created_at_id", "created_at", "id"),
+        Index("ix_stripe_transactions_customer_created_at_id", "customer_id", "created_at", "id"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     stripe_event_id = Column(String, unique=True, index=True, nullable=False)
     payment_intent_id = Column(String, index=True, nullable=True)
     customer_id = Column(String, index=True, nullable=True)
-    amount = Column(String, nullable=False)
+    amount = Column(BigInteger, nullable=True)  # In minor units (cents); None until known
     currency = Column(String, nullable=False)
     status = Column(String, nullable=False)
     created_at = Column(DateTime, nullable=False)
-    raw_event = Column(JSON, nullable=False)
+    # Large; loaded only when accessed (or undefer()ed)
+    raw_event = deferred(Column(JSON, nullable=False))
 
 
 class Lead(Base):
     """Represents a lead captured from landing page or other sources."""
     __tablename__ = "leads"
+    __table_args__ = (
+        # Keyset pagination for GET /leads: one index per filter shape, each
+        # ending in (created_at, id) so pages come straight off the index
+        Index("ix_leads_created_at_id", "created_at", "id"),
+        Index("ix_leads_status_created_at_id", "status", "created_at", "id"),
+        Index("ix_leads_source_created_at_id", "source", "created_at", "id"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     email = Column(String, unique=True, index=True, nullable=False)
@@ -135,7 +241,7 @@ class Lead(Base):
     message = Column(String, nullable=True)
     source = Column(String, default="landing_page", nullable=False)  # where lead came from
     status = Column(String, default="new", nullable=False)  # new, contacted, converted, lost
-    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     converted_user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=True)  # if converted to user
 
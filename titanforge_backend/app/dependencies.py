@@ -1,30 +1,33 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
-import json
 import redis
-from typing import Any, Dict
+from typing import Any, Dict, List, Tuple
 
-from . import crud, db_models, security
+from . import agent_bus, db_models, security
 from .database import get_db
 from .redis_client import get_redis
+from .services import user_principals
 
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 
 async def get_current_user(
-    db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)
+    db: Session = Depends(get_db),
+    token: str = Depends(oauth2_scheme),
+    r: redis.Redis = Depends(get_redis),
 ) -> db_models.User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    token_data = security.decode_access_token(token)
+    token_data = security.decode_access_token(token, r=r)
     if token_data is None:
         raise credentials_exception
-    user = crud.get_user_by_email(db, email=token_data.email)
+    # Cached for a few seconds; see app/services/user_principals.py
+    user = user_principals.get_principal(db, token_data.email, r=r)
     if user is None:
         raise credentials_exception
     return user
@@ -44,10 +47,20 @@ def send_agent_message(
     recipient_id: str, sender_id: str, message_content: Dict[str, Any], r: redis.Redis
 ) -> None:
     try:
-        message_json = json.dumps({"sender_id": sender_id, "message": message_content})
-        r.rpush(recipient_id, message_json)
+        agent_bus.publish(r, recipient_id, sender_id, message_content)
     except Exception as e:
         # Log but don't fail - agent messaging is optional
         print(f"[WARNING] Failed to send agent message: {e}")
         pass
 
+
+def send_agent_messages(
+    messages: List[Tuple[str, str, Dict[str, Any]]], r: redis.Redis
+) -> None:
+    """send_agent_message for several (recipient_id, sender_id, content) at once, in one round trip."""
+    try:
+        agent_bus.publish_many(r, messages)
+    except Exception as e:
+        # Log but don't fail - agent messaging is optional
+        print(f"[WARNING] Failed to send agent messages: {e}")
+
@@ -11,6 +11,7 @@ from sqlalchemy.orm import Session
 
 from swarm.agents.base_agent import \
     BaseAgent  # Import BaseAgent for type checking in dynamic loading
+from swarm.agents.transport import InProcessTransport, set_default_transport
 
 from . import db_models, schemas
 from .api.v1.admin import router as admin_router
@@ -21,7 +22,7 @@ from .api.v1.leads import router as leads_router
 from .api.v1.pricing import router as pricing_router
 from .api.v1.sales_funnel import router as sales_funnel_router
 from .api.v1.roi_calculator import router as roi_calculator_router
-from .api.v1.alumni_import import router as alumni_router
+from .api.v1.alumni_import import router as alumni_router, jobs_router as alumni_jobs_router
 from .api.v1.dashboard import router as dashboard_router
 from .api.v1.landing import router as landing_router
 from .api.v1.income_reporting import router as income_reporting_router
@@ -36,9 +37,15 @@ from .api.v1.analytics import router as analytics_router
 from .api.v1.scheduler import router as scheduler_router
 
 from .core.config import settings
-from .database import engine, get_db
-from .redis_client import get_redis
+from .database import dispose_engines, engine, get_db
+from .redis_client import close_async_redis, get_redis
 from .scheduler import start_scheduler
+from .services import token_registry, user_principals
+from .services.dashboard_metrics import register_invalidation_hooks
+from .services.event_sink import stop_event_sink
+from .services.import_jobs import start_import_jobs, stop_import_jobs
+from .services.goal_dispatcher import start_goal_dispatcher, stop_goal_dispatcher
+from .services.password_hasher import start_password_hasher, stop_password_hasher
 
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -67,13 +74,33 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 @app.on_event("startup")
 async def startup_event():
+    # Agents running inside the MCP skip the HTTP round-trip back into it
+    set_default_transport(InProcessTransport())
+    register_invalidation_hooks()
+    user_principals.register_invalidation_hooks()
+    token_registry.start_revocation_listener()
     start_scheduler()
+    start_goal_dispatcher()
+    start_import_jobs()
+    start_password_hasher()
     load_new_agents()
 
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    stop_goal_dispatcher()
+    stop_import_jobs()
+    token_registry.stop_revocation_listener()
+    stop_password_hasher()
+    stop_event_sink()
+    await dispose_engines()
+    await close_async_redis()
+
 # --- Root Endpoint ---
 @app.get("/")
 async def root():
@@ -94,6 +121,7 @@ app.include_router(pricing_router, prefix="/api/v1")
 app.include_router(sales_funnel_router, prefix="/api/v1")
 app.include_router(roi_calculator_router, prefix="/api/v1")
 app.include_router(alumni_router, prefix="/api/v1")
+app.include_router(alumni_jobs_router, prefix="/api/v1")
 app.include_router(dashboard_router)
 app.include_router(landing_router)
 app.include_router(tasks_router, prefix="/api/v1")
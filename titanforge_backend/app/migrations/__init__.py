@@ -0,0 +1,7 @@
+"""
+One-off schema migrations for existing databases.
+
+New tables come from the models; changes to tables that already hold data
+are made by the modules here. Each one is idempotent and is run once per
+environment, e.g. `python -m app.migrations.stripe_amount_minor_units`.
+"""
@@ -0,0 +1,38 @@
+"""
+Adds the keyset pagination indexes for GET /leads, and drops the
+single-column created_at index that (created_at, id) makes redundant.
+
+Built and dropped CONCURRENTLY, so lead capture carries on meanwhile.
+
+Usage:
+    python -m app.migrations.lead_list_indexes
+"""
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from ..database import engine as default_engine
+
+INDEXES = (
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_leads_created_at_id"
+    " ON leads (created_at, id)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_leads_status_created_at_id"
+    " ON leads (status, created_at, id)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_leads_source_created_at_id"
+    " ON leads (source, created_at, id)",
+)
+
+# Covered by ix_leads_created_at_id, which is built first
+REDUNDANT_INDEXES = ("DROP INDEX CONCURRENTLY IF EXISTS ix_leads_created_at",)
+
+
+def upgrade(engine: Engine = default_engine) -> None:
+    # CREATE/DROP INDEX CONCURRENTLY cannot run inside a transaction
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for statement in INDEXES + REDUNDANT_INDEXES:
+            conn.execute(text(statement))
+
+
+if __name__ == "__main__":
+    upgrade()
+    print("Lead list indexes are in place.")
@@ -0,0 +1,29 @@
+"""
+Adds outreach_recipients.queued_at, which the fan-out pass uses to find
+recipients whose chunk was never delivered. Recipients already queued are
+stamped with the migration time, so they are returned to pending once
+OUTREACH_QUEUED_TIMEOUT_SECONDS has passed.
+
+Usage:
+    python -m app.migrations.outreach_queued_at
+"""
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from ..database import engine as default_engine
+
+ADD_COLUMN = "ALTER TABLE outreach_recipients ADD COLUMN IF NOT EXISTS queued_at TIMESTAMP WITH TIME ZONE"
+
+STAMP_QUEUED = "UPDATE outreach_recipients SET queued_at = now() WHERE status = 'queued' AND queued_at IS NULL"
+
+
+def upgrade(engine: Engine = default_engine) -> None:
+    with engine.begin() as conn:
+        conn.execute(text(ADD_COLUMN))
+        conn.execute(text(STAMP_QUEUED))
+
+
+if __name__ == "__main__":
+    upgrade()
+    print("outreach_recipients.queued_at is in place.")
@@ -0,0 +1,85 @@
+"""
+Converts stripe_transactions.amount from text to integer minor units.
+
+Amounts were stored as strings of cents, or "N/A" for events that carry
+no amount. Numeric strings are converted in place. The others become NULL
+and are then backfilled from raw_event where the event has an amount.
+Finally the index behind the income summary is created.
+
+Usage:
+    python -m app.migrations.stripe_amount_minor_units
+"""
+
+from typing import Any, Optional
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+from ..database import engine as default_engine
+from ..services.stripe_events import event_amount
+
+CONVERT_COLUMN = """
+ALTER TABLE stripe_transactions
+    ALTER COLUMN amount DROP NOT NULL,
+    ALTER COLUMN amount TYPE BIGINT
+        USING CASE WHEN amount ~ '^-?[0-9]+$' THEN amount::bigint END
+"""
+
+CREATE_INDEX = """
+CREATE INDEX IF NOT EXISTS ix_stripe_transactions_status_created_at
+    ON stripe_transactions (status, created_at) INCLUDE (currency, amount)
+"""
+
+
+def amount_is_integer(engine: Engine) -> bool:
+    columns = {c["name"]: c for c in inspect(engine).get_columns("stripe_transactions")}
+    return columns["amount"]["type"].python_type is int
+
+
+def backfill_amounts(engine: Engine, batch_size: int = 1000) -> int:
+    """Fills NULL amounts from raw_event; returns the number of rows updated."""
+    first_batch = text(
+        "SELECT id, raw_event FROM stripe_transactions"
+        " WHERE amount IS NULL ORDER BY id LIMIT :limit"
+    )
+    next_batch = text(
+        "SELECT id, raw_event FROM stripe_transactions"
+        " WHERE amount IS NULL AND id > :after ORDER BY id LIMIT :limit"
+    )
+    update = text("UPDATE stripe_transactions SET amount = :amount WHERE id = :id")
+
+    updated = 0
+    after: Optional[Any] = None
+    while True:
+        # One transaction per batch, so a large table is not locked throughout
+        with engine.begin() as conn:
+            if after is None:
+                rows = conn.execute(first_batch, {"limit": batch_size}).all()
+            else:
+                rows = conn.execute(next_batch, {"after": after, "limit": batch_size}).all()
+            if not rows:
+                return updated
+            changes = []
+            for row_id, raw_event in rows:
+                amount = event_amount(raw_event) if isinstance(raw_event, dict) else None
+                if amount is not None:
+                    changes.append({"id": row_id, "amount": amount})
+            if changes:
+                conn.execute(update, changes)
+            updated += len(changes)
+            # Rows without an amount stay NULL; keyset past them
+            after = rows[-1][0]
+
+
+def upgrade(engine: Engine = default_engine) -> int:
+    if not amount_is_integer(engine):
+        with engine.begin() as conn:
+            conn.execute(text(CONVERT_COLUMN))
+    updated = backfill_amounts(engine)
+    with engine.begin() as conn:
+        conn.execute(text(CREATE_INDEX))
+    return updated
+
+
+if __name__ == "__main__":
+    print(f"Backfilled {upgrade()} stripe transaction amount(s) from raw_event.")
@@ -0,0 +1,32 @@
+"""
+Adds the keyset pagination indexes for GET /income/transactions.
+
+Built CONCURRENTLY, so writes to stripe_transactions carry on meanwhile.
+
+Usage:
+    python -m app.migrations.stripe_transaction_list_indexes
+"""
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from ..database import engine as default_engine
+
+INDEXES = (
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_stripe_transactions_created_at_id"
+    " ON stripe_transactions (created_at, id)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_stripe_transactions_customer_created_at_id"
+    " ON stripe_transactions (customer_id, created_at, id)",
+)
+
+
+def upgrade(engine: Engine = default_engine) -> None:
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for statement in INDEXES:
+            conn.execute(text(statement))
+
+
+if __name__ == "__main__":
+    upgrade()
+    print("Stripe transaction list indexes are in place.")
@@ -0,0 +1,23 @@
+"""
+Adds tasks.result, where the goal dispatcher stores the CEO's routing outcome.
+
+Usage:
+    python -m app.migrations.task_result
+"""
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from ..database import engine as default_engine
+
+ADD_COLUMN = "ALTER TABLE tasks ADD COLUMN IF NOT EXISTS result JSON"
+
+
+def upgrade(engine: Engine = default_engine) -> None:
+    with engine.begin() as conn:
+        conn.execute(text(ADD_COLUMN))
+
+
+if __name__ == "__main__":
+    upgrade()
+    print("tasks.result is in place.")
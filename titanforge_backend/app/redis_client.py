@@ -1,10 +1,90 @@
+"""
+Shared Redis connection pools for the API, the scheduler and agent workers.
+
+Every client in a process is built on a pool from connection_pool(), one
+per (URL, decode_responses) pair, so the API, the scheduler jobs and the
+worker's consumers share sockets instead of each opening their own. Pools
+are blocking pools of at most REDIS_MAX_CONNECTIONS. When all connections
+are busy, a caller waits up to REDIS_POOL_TIMEOUT seconds for one rather
+than opening more. Idle connections are health-checked every
+REDIS_HEALTH_CHECK_INTERVAL seconds before reuse.
+
+Async routes use get_async_redis(), the same settings on redis.asyncio.
+Async connections belong to the event loop that opened them, so there is
+one async pool per loop.
+"""
+
+import asyncio
+import threading
+import weakref
+from typing import Dict, Optional, Tuple
+
 import redis
+import redis.asyncio as aioredis
 
 from .core.config import settings
 
-redis_client = redis.from_url(settings.REDIS_URL, decode_responses=True)
+_pools: Dict[Tuple[str, bool], redis.BlockingConnectionPool] = {}
+_async_pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aioredis.Redis]" = (
+    weakref.WeakKeyDictionary()
+)
+_pools_lock = threading.Lock()
+
+
+def pool_options() -> dict:
+    return {
+        "max_connections": settings.REDIS_MAX_CONNECTIONS,
+        "timeout": settings.REDIS_POOL_TIMEOUT,
+        "health_check_interval": settings.REDIS_HEALTH_CHECK_INTERVAL,
+        "socket_connect_timeout": settings.REDIS_CONNECT_TIMEOUT,
+        "socket_keepalive": True,
+    }
+
+
+def connection_pool(
+    url: Optional[str] = None, decode_responses: bool = True
+) -> redis.BlockingConnectionPool:
+    """Returns the process-wide pool for this URL (REDIS_URL by default)."""
+    url = url or settings.REDIS_URL
+    key = (url, decode_responses)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = redis.BlockingConnectionPool.from_url(
+                url, decode_responses=decode_responses, **pool_options()
+            )
+        return pool
+
+
+def get_redis_client(url: Optional[str] = None, decode_responses: bool = True) -> redis.Redis:
+    """A client on the shared pool; cheap, so callers need not keep it."""
+    return redis.Redis(connection_pool=connection_pool(url, decode_responses))
+
+
+redis_client = get_redis_client()
 
 
 def get_redis():
     """FastAPI dependency to get a Redis client."""
     return redis_client
+
+
+async def get_async_redis() -> aioredis.Redis:
+    """FastAPI dependency to get an asyncio Redis client for the running loop."""
+    loop = asyncio.get_running_loop()
+    with _pools_lock:
+        client = _async_pools.get(loop)
+        if client is None:
+            pool = aioredis.BlockingConnectionPool.from_url(
+                settings.REDIS_URL, decode_responses=True, **pool_options()
+            )
+            client = _async_pools[loop] = aioredis.Redis(connection_pool=pool)
+        return client
+
+
+async def close_async_redis() -> None:
+    """Closes the running loop's async pool, e.g. on shutdown."""
+    with _pools_lock:
+        client = _async_pools.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.connection_pool.disconnect()
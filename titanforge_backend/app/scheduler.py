@@ -1,31 +1,21 @@
-import json
 from datetime import datetime
 from typing import Any, Dict
 
 import redis
 from apscheduler.schedulers.background import BackgroundScheduler
 
+from . import agent_bus
 from .core.config import settings
+from .redis_client import redis_client
 from swarm.departments.executive_board.ceo import CEO
 
 # from swarm.departments.marketing.lead_generation import LeadGeneration # Removed top-level import
 
 
-def get_redis_client():
-    """Helper to get a Redis client for scheduler tasks."""
-    r = redis.Redis(
-        host=settings.REDIS_URL.split("://")[1].split(":")[0],
-        port=int(settings.REDIS_URL.split(":")[-1].split("/")[0]),
-        db=int(settings.REDIS_URL.split("/")[-1]),
-    )
-    return r
-
-
 def send_agent_message(
     recipient_id: str, sender_id: str, message_content: Dict[str, Any], r: redis.Redis
 ) -> None:
-    message_json = json.dumps({"sender_id": sender_id, "message": message_content})
-    r.rpush(recipient_id, message_json)
+    agent_bus.publish(r, recipient_id, sender_id, message_content)
 
 
 def process_backlog_task():
@@ -55,21 +45,34 @@ def customer_acquisition_task():
 
 
 def aggregate_analytics_task():
-    """Function to be executed by the scheduler to aggregate daily analytics."""
+    """Function to be executed by the scheduler to bring the daily metrics rollup up to date."""
     print(
-        f"--- SCHEDULER: Triggering Analytics Agent to aggregate daily metrics for {datetime.utcnow().date()}. ---"
+        f"--- SCHEDULER: Triggering Analytics Agent to refresh daily metrics at {datetime.utcnow().isoformat()}. ---"
     )
-    r = get_redis_client()
     send_agent_message(
         recipient_id="analytics_agent",
         sender_id="scheduler",
-        message_content={
-            "action": "aggregate_daily_metrics",
-            "date": datetime.utcnow().strftime("%Y-%m-%d"),
-        },
-        r=r,
+        message_content={"action": "refresh_daily_metrics"},
+        r=redis_client,
     )
-    print("--- SCHEDULER: Analytics Agent notified for daily aggregation. ---")
+    print("--- SCHEDULER: Analytics Agent notified for metrics refresh. ---")
+
+
+def outreach_fanout_task():
+    """Function to be executed by the scheduler to queue outreach that waited on domain rate limits."""
+    from .database import SessionLocal
+    from .services import outreach_fanout
+
+    db = SessionLocal()
+    try:
+        queued = outreach_fanout.fan_out_pending(db)
+        if queued:
+            print(f"--- SCHEDULER: Queued outreach for {queued} leads. ---")
+    except Exception as e:
+        db.rollback()
+        print(f"--- SCHEDULER ERROR (Outreach Fan-out): {e} ---")
+    finally:
+        db.close()
 
 
 scheduler = BackgroundScheduler()
@@ -78,8 +81,17 @@ scheduler.add_job(
     customer_acquisition_task, "interval", hours=4, id="customer_acquisition"
 )
 scheduler.add_job(
-    aggregate_analytics_task, "cron", hour=2, minute=0, id="daily_analytics_aggregation"
-)  # Run daily at 2 AM UTC
+    aggregate_analytics_task,
+    "interval",
+    minutes=settings.METRICS_ROLLUP_INTERVAL_MINUTES,
+    id="daily_analytics_aggregation",
+)  # Incremental, so today's numbers stay fresh
+scheduler.add_job(
+    outreach_fanout_task,
+    "interval",
+    seconds=settings.OUTREACH_FANOUT_INTERVAL_SECONDS,
+    id="outreach_fanout",
+)
 
 
 def start_scheduler():
@@ -30,9 +30,20 @@ class UserResponse(UserBase):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
 
 class TokenData(BaseModel):
     email: Optional[str] = None
+    jti: Optional[str] = None
+    expires_at: Optional[int] = None
+    family: Optional[str] = None
+
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
+
+class LogoutRequest(BaseModel):
+    refresh_token: Optional[str] = None
+    everywhere: bool = False
 
 class AuthTokens(BaseModel):
     access_token: str
@@ -217,11 +228,24 @@ class LeadResponse(LeadBase):
     source: str
     status: str
     created_at: datetime
-    updated_at: datetime
+    updated_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
 
+class LeadListItem(BaseModel):
+    """A lead in GET /leads; only the projected fields are present."""
+    id: Optional[UUID] = None
+    email: Optional[str] = None
+    name: Optional[str] = None
+    company: Optional[str] = None
+    phone: Optional[str] = None
+    message: Optional[str] = None
+    source: Optional[str] = None
+    status: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
 # ============================================================
 # Blog Schemas
 # ============================================================
@@ -1,14 +1,25 @@
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Dict, Optional, Tuple
 
+import redis
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 
 from .core.config import settings
+from .redis_client import redis_client
 from .schemas import TokenData
+from .services import token_registry
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing. Hashes made with any other cost count as outdated and
+# are replaced on the next successful login (see verify_and_update_password).
+BCRYPT_ROUNDS = settings.BCRYPT_ROUNDS
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -17,6 +28,14 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def verify_and_update_password(
+    plain_password: str, hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    """Checks a password; also returns a new hash if the stored one is outdated."""
+    plain_password = plain_password[:72]
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
 def get_password_hash(password: str) -> str:
     # Bcrypt has a 72-byte limit, truncate if necessary
     password = password[:72]
@@ -27,6 +46,7 @@ def get_password_hash(password: str) -> str:
 SECRET_KEY = settings.SECRET_KEY
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+REFRESH_TOKEN_EXPIRE_DAYS = settings.REFRESH_TOKEN_EXPIRE_DAYS
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -37,18 +57,57 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
         expire = datetime.now(timezone.utc) + timedelta(
             minutes=ACCESS_TOKEN_EXPIRE_MINUTES
         )
+    to_encode.setdefault("jti", token_registry.new_jti())
+    to_encode.setdefault("type", "access")
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
-def decode_access_token(token: str) -> Optional[TokenData]:
+def issue_tokens(subject: str, r: redis.Redis, family: Optional[str] = None) -> Dict[str, str]:
+    """
+    Mints an access/refresh token pair and records both in the token
+    registry. A refresh keeps the family of the login it descends from.
+    """
+    family = family or token_registry.new_jti()
+    now = datetime.now(timezone.utc)
+    tokens = {"token_type": "bearer"}
+    for token_type, lifetime in (
+        ("access", timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)),
+        ("refresh", timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)),
+    ):
+        jti = token_registry.new_jti()
+        expire = now + lifetime
+        tokens[f"{token_type}_token"] = jwt.encode(
+            {"sub": subject, "exp": expire, "jti": jti, "type": token_type, "fam": family},
+            SECRET_KEY,
+            algorithm=ALGORITHM,
+        )
+        token_registry.register(r, subject, jti, int(expire.timestamp()), family, token_type)
+    return tokens
+
+
+def _decode(token: str, token_type: str, r: redis.Redis) -> Optional[TokenData]:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            return None
-        token_data = TokenData(email=email)
-        return token_data
     except JWTError:
         return None
+    email: str = payload.get("sub")
+    # Tokens minted before typed tokens existed are access tokens
+    if email is None or payload.get("type", "access") != token_type:
+        return None
+    jti = payload.get("jti")
+    # Checked in memory; Redis is only asked about likely revocations
+    if jti and token_registry.is_revoked(jti, r=r):
+        return None
+    return TokenData(
+        email=email, jti=jti, expires_at=payload.get("exp"), family=payload.get("fam")
+    )
+
+
+def decode_access_token(token: str, r: redis.Redis = redis_client) -> Optional[TokenData]:
+    return _decode(token, "access", r)
+
+
+def decode_refresh_token(token: str, r: redis.Redis = redis_client) -> Optional[TokenData]:
+    return _decode(token, "refresh", r)
@@ -0,0 +1,232 @@
+"""
+Streaming importer for alumni contact CSVs.
+
+The upload is parsed row by row from its spooled file and never loaded
+into memory whole. Rows are validated and written in chunks of
+ALUMNI_IMPORT_CHUNK_SIZE. Each chunk is one multi-row
+INSERT ... ON CONFLICT (email) DO NOTHING plus one INSERT staging the new
+leads for outreach (see outreach_fanout), and each chunk commits on its
+own. An import therefore holds a
+transaction for one chunk at most, and duplicates cost no per-row lookups.
+Rejected rows go to a CSV error report that can be downloaded afterwards.
+"""
+
+import csv
+import io
+import os
+import re
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from .. import db_models
+from ..core.config import settings
+from . import outreach_fanout
+
+ALUMNI_SOURCE = "devry_alumni_import"
+REQUIRED_COLUMNS = {"name", "email"}
+# Error messages echoed back in the HTTP response; the full list is in the report
+MAX_INLINE_ERRORS = 100
+
+EMAIL_PATTERN = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+
+
+def validate_email(email: str) -> bool:
+    """Validate email format."""
+    return EMAIL_PATTERN.match(email) is not None
+
+
+class ImportFormatError(ValueError):
+    """The file is not a usable alumni CSV (empty, missing columns, bad encoding)."""
+
+
+@dataclass
+class ImportResult:
+    import_id: str
+    rows_processed: int = 0
+    imported_count: int = 0
+    skipped_count: int = 0
+    error_count: int = 0
+    chunks_committed: int = 0
+    # Last CSV row covered by a committed chunk; a resumed import starts after it
+    last_row: int = 0
+    errors: List[str] = field(default_factory=list)
+
+    def as_progress(self) -> Dict[str, Any]:
+        return {
+            "rows_processed": self.rows_processed,
+            "imported_count": self.imported_count,
+            "skipped_count": self.skipped_count,
+            "error_count": self.error_count,
+            "chunks_committed": self.chunks_committed,
+            "last_row": self.last_row,
+        }
+
+
+def error_report_path(import_id: str) -> str:
+    return os.path.join(settings.IMPORT_DIR, f"{import_id}.errors.csv")
+
+
+def iter_csv_rows(fileobj: BinaryIO) -> Iterator[Tuple[int, Dict[str, str]]]:
+    """Yields (row number, row) from a binary CSV stream, decoding as it goes."""
+    text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+    try:
+        reader = csv.DictReader(text)
+        if not reader.fieldnames:
+            raise ImportFormatError("CSV file is empty")
+        columns = {name.strip() for name in reader.fieldnames}
+        if not REQUIRED_COLUMNS.issubset(columns):
+            raise ImportFormatError(
+                f"CSV must contain columns: {', '.join(sorted(REQUIRED_COLUMNS))}"
+            )
+        reader.fieldnames = [name.strip() for name in reader.fieldnames]
+        for row_num, row in enumerate(reader, start=2):  # Header is row 1
+            yield row_num, row
+    except UnicodeDecodeError as e:
+        raise ImportFormatError(f"CSV file must be UTF-8 encoded: {e}")
+    finally:
+        # Leave the underlying upload open for the caller
+        text.detach()
+
+
+class AlumniImporter:
+    """Imports alumni rows into leads in bounded, independently committed chunks."""
+
+    def __init__(
+        self,
+        db: Session,
+        user_id: Any,
+        import_id: Optional[str] = None,
+        chunk_size: int = settings.ALUMNI_IMPORT_CHUNK_SIZE,
+        on_progress: Optional[Callable[[ImportResult], None]] = None,
+        resume_from: Optional[ImportResult] = None,
+    ):
+        """
+        :param on_progress: Called after each chunk is written but before it
+            commits, so anything it writes through the same session (such as
+            job progress) commits atomically with the chunk.
+        :param resume_from: Counters of an interrupted import; rows up to its
+            last_row are skipped.
+        """
+        self.db = db
+        self.user_id = user_id
+        self.chunk_size = max(1, chunk_size)
+        self.on_progress = on_progress
+        self.result = resume_from or ImportResult(import_id=import_id or str(uuid.uuid4()))
+        self._report = None
+        self._report_writer = None
+
+    def run(self, rows: Iterable[Tuple[int, Dict[str, str]]]) -> ImportResult:
+        try:
+            chunk: List[Tuple[int, Dict[str, str]]] = []
+            for item in rows:
+                if item[0] <= self.result.last_row:
+                    continue  # Already committed before the import was interrupted
+                chunk.append(item)
+                if len(chunk) >= self.chunk_size:
+                    self._process_chunk(chunk)
+                    chunk = []
+            if chunk:
+                self._process_chunk(chunk)
+            outreach_fanout.seal_batch(self.db, self.result.import_id)
+        finally:
+            if self._report is not None:
+                self._report.close()
+        return self.result
+
+    def _process_chunk(self, chunk: List[Tuple[int, Dict[str, str]]]) -> None:
+        leads: Dict[str, Dict[str, Any]] = {}
+        rejected: List[Tuple[int, str, str]] = []
+        skipped = 0
+        for row_num, row in chunk:
+            name = (row.get("name") or "").strip()
+            email = (row.get("email") or "").strip()
+            if not name:
+                rejected.append((row_num, email, "Name is required"))
+            elif not email:
+                rejected.append((row_num, email, "Email is required"))
+            elif not validate_email(email):
+                rejected.append((row_num, email, f"Invalid email format: {email}"))
+            elif email in leads:
+                # Repeated within the same chunk: same outcome as an existing lead
+                skipped += 1
+            else:
+                leads[email] = self._lead_values(row, name, email)
+
+        inserted = self._insert_leads(list(leads.values())) if leads else []
+        outreach_fanout.stage_recipients(
+            self.db,
+            self.result.import_id,
+            self.user_id,
+            ((leads[email]["id"], email) for email in inserted),
+        )
+
+        result = self.result
+        result.rows_processed += len(chunk)
+        result.imported_count += len(inserted)
+        result.skipped_count += skipped + len(rejected) + len(leads) - len(inserted)
+        result.error_count += len(rejected)
+        result.chunks_committed += 1
+        result.last_row = chunk[-1][0]
+        if self.on_progress:
+            self.on_progress(result)
+        self.db.commit()
+
+        for row_num, email, reason in rejected:
+            self._report_error(row_num, email, reason)
+
+    def _lead_values(self, row: Dict[str, str], name: str, email: str) -> Dict[str, Any]:
+        company = (row.get("company") or "").strip()
+        title = (row.get("title") or "").strip()
+        return {
+            "id": uuid.uuid4(),
+            "email": email,
+            "name": name,
+            "company": company or "DeVry Alumni",
+            "source": ALUMNI_SOURCE,
+            "status": "new",
+            "phone": None,
+            "message": f"Title: {title}" if title else None,
+        }
+
+    def _insert_leads(self, leads: List[Dict[str, Any]]) -> List[str]:
+        """Inserts the chunk, skipping emails that already exist. Returns inserted emails."""
+        table = db_models.Lead.__table__
+        values = leads
+        if self.db.bind.dialect.name == "postgresql":
+            statement = (
+                pg_insert(table)
+                .values(values)
+                .on_conflict_do_nothing(index_elements=["email"])
+                .returning(table.c.email)
+            )
+            return [email for (email,) in self.db.execute(statement)]
+
+        # Other databases: one batched lookup for the whole chunk
+        existing = set(
+            self.db.execute(
+                select(table.c.email).where(table.c.email.in_([v["email"] for v in values]))
+            ).scalars()
+        )
+        fresh = [v for v in values if v["email"] not in existing]
+        if fresh:
+            self.db.execute(table.insert(), fresh)
+        return [v["email"] for v in fresh]
+
+    def _report_error(self, row_num: int, email: str, reason: str) -> None:
+        if len(self.result.errors) < MAX_INLINE_ERRORS:
+            self.result.errors.append(f"Row {row_num}: {reason}")
+        if self._report_writer is None:
+            os.makedirs(settings.IMPORT_DIR, exist_ok=True)
+            path = error_report_path(self.result.import_id)
+            # Appended to, so a resumed import keeps the rows reported before
+            is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+            self._report = open(path, "a", newline="", encoding="utf-8")
+            self._report_writer = csv.writer(self._report)
+            if is_new:
+                self._report_writer.writerow(["row", "email", "error"])
+        self._report_writer.writerow([row_num, email, reason])
@@ -0,0 +1,232 @@
+"""
+Shared sales metrics for the dashboard and funnel endpoints.
+
+The numbers are computed with one query and cached in Redis, so every
+uvicorn worker and every open dashboard tab reads the same entry. Entries
+are fresh for DASHBOARD_METRICS_TTL seconds. After that, one caller (the
+holder of a short Redis lock) recomputes while the others keep serving the
+stale entry, so an expiry never lets every tab hit the database at once.
+Commits that touch leads, users, subscriptions or products drop the entry
+through SQLAlchemy session hooks and announce the change on
+CHANGES_CHANNEL. The next read recomputes the entry.
+"""
+
+import asyncio
+import json
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+import redis
+import redis.asyncio as aioredis
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .. import db_models
+from ..core.config import settings
+from ..database import ReadSessionLocal
+from ..redis_client import redis_client
+from . import metrics_rollup
+
+CACHE_KEY = "dashboard_metrics"
+LOCK_KEY = "dashboard_metrics:lock"
+# Notified on every invalidation; live dashboards listen here
+CHANGES_CHANNEL = "dashboard_metrics:changed"
+
+# Writes to these tables change the dashboard numbers
+WATCHED_MODELS = (
+    db_models.Lead,
+    db_models.User,
+    db_models.Subscription,
+    db_models.Product,
+)
+
+TREND_EVENTS = ["lead_captured", "user_signup"]
+
+
+def compute_metrics(db: Session) -> Dict[str, Any]:
+    """Reads the dashboard numbers straight from the database."""
+    subscriptions = (
+        select(
+            func.coalesce(func.sum(metrics_rollup.monthly_amount_cents()), 0).label(
+                "mrr_cents"
+            ),
+        )
+        .join(db_models.Product, db_models.Subscription.product_id == db_models.Product.id)
+        .where(db_models.Subscription.status == "active")
+        .subquery()
+    )
+    counts = db.execute(
+        select(
+            select(func.count(db_models.Lead.id))
+            .where(db_models.Lead.status != "converted")
+            .scalar_subquery()
+            .label("leads_count"),
+            select(func.count(db_models.User.id))
+            .where(db_models.User.is_active == True)
+            .scalar_subquery()
+            .label("customers_count"),
+            subscriptions.c.mrr_cents,
+        )
+    ).one()
+
+    leads_count = counts.leads_count or 0
+    customers_count = counts.customers_count or 0
+    mrr = float(counts.mrr_cents or 0) / 100
+
+    week_start = datetime.utcnow().date() - timedelta(days=6)
+    week = metrics_rollup.event_totals(db, TREND_EVENTS, since=week_start)
+
+    return {
+        "leads_count": leads_count,
+        "customers_count": customers_count,
+        "mrr": mrr,
+        "projected_annual": mrr * 12,
+        "conversion_rate": (customers_count / leads_count * 100) if leads_count > 0 else 0,
+        "leads_last_7_days": week["lead_captured"],
+        "signups_last_7_days": week["user_signup"],
+        "daily": metrics_rollup.daily_series(db, TREND_EVENTS, days=7),
+        "computed_at": datetime.utcnow().isoformat(),
+    }
+
+
+def _compute(db: Optional[Session]) -> Dict[str, Any]:
+    if db is not None:
+        return compute_metrics(db)
+    db = ReadSessionLocal()
+    try:
+        return compute_metrics(db)
+    finally:
+        db.close()
+
+
+def _decode(raw: Optional[str]) -> Optional[Dict[str, Any]]:
+    return json.loads(raw) if raw else None
+
+
+def _encode(metrics: Dict[str, Any]) -> str:
+    entry = {"metrics": metrics, "fresh_until": time.time() + settings.DASHBOARD_METRICS_TTL}
+    return json.dumps(entry)
+
+
+# Kept well past freshness so stale reads can be served during a refresh
+def _entry_ttl() -> int:
+    return settings.DASHBOARD_METRICS_TTL * 10
+
+
+def _read(r: redis.Redis) -> Optional[Dict[str, Any]]:
+    return _decode(r.get(CACHE_KEY))
+
+
+def _store(r: redis.Redis, metrics: Dict[str, Any]) -> None:
+    r.set(CACHE_KEY, _encode(metrics), ex=_entry_ttl())
+
+
+def _refresh(r: redis.Redis, db: Optional[Session]) -> Optional[Dict[str, Any]]:
+    """Recomputes under the lock; returns None if another caller holds it."""
+    token = str(uuid.uuid4())
+    if not r.set(LOCK_KEY, token, nx=True, ex=settings.DASHBOARD_METRICS_LOCK_TIMEOUT):
+        return None
+    try:
+        metrics = _compute(db)
+        _store(r, metrics)
+        return metrics
+    finally:
+        if r.get(LOCK_KEY) == token:
+            r.delete(LOCK_KEY)
+
+
+def get_metrics(db: Optional[Session] = None, r: redis.Redis = redis_client) -> Dict[str, Any]:
+    """
+    Returns the cached dashboard metrics, recomputing them at most once per
+    TTL across all workers. Falls back to a direct query if Redis is down.
+    """
+    try:
+        entry = _read(r)
+        if entry and time.time() < entry["fresh_until"]:
+            return entry["metrics"]
+
+        metrics = _refresh(r, db)
+        if metrics is not None:
+            return metrics
+        if entry:
+            return entry["metrics"]
+
+        # Cold cache and someone else is computing: wait for their result
+        deadline = time.monotonic() + settings.DASHBOARD_METRICS_LOCK_TIMEOUT
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            entry = _read(r)
+            if entry:
+                return entry["metrics"]
+    except redis.RedisError as e:
+        print(f"[WARNING] Dashboard metrics cache unavailable: {e}")
+    return _compute(db)
+
+
+async def get_metrics_async(db: AsyncSession, r: aioredis.Redis) -> Dict[str, Any]:
+    """
+    get_metrics for async handlers: Redis and the query are awaited, and
+    waiting for another worker's refresh sleeps without holding the loop.
+    """
+    try:
+        entry = _decode(await r.get(CACHE_KEY))
+        if entry and time.time() < entry["fresh_until"]:
+            return entry["metrics"]
+
+        token = str(uuid.uuid4())
+        if await r.set(LOCK_KEY, token, nx=True, ex=settings.DASHBOARD_METRICS_LOCK_TIMEOUT):
+            try:
+                metrics = await db.run_sync(compute_metrics)
+                await r.set(CACHE_KEY, _encode(metrics), ex=_entry_ttl())
+                return metrics
+            finally:
+                if await r.get(LOCK_KEY) == token:
+                    await r.delete(LOCK_KEY)
+        if entry:
+            return entry["metrics"]
+
+        deadline = time.monotonic() + settings.DASHBOARD_METRICS_LOCK_TIMEOUT
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+            entry = _decode(await r.get(CACHE_KEY))
+            if entry:
+                return entry["metrics"]
+    except redis.RedisError as e:
+        print(f"[WARNING] Dashboard metrics cache unavailable: {e}")
+    return await db.run_sync(compute_metrics)
+
+
+def invalidate(r: redis.Redis = redis_client) -> None:
+    try:
+        r.delete(CACHE_KEY)
+        r.publish(CHANGES_CHANNEL, "invalidated")
+    except redis.RedisError as e:
+        print(f"[WARNING] Could not invalidate dashboard metrics: {e}")
+
+
+def _track_changes(session: Session, flush_context, instances) -> None:
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, WATCHED_MODELS):
+            session.info["dashboard_metrics_dirty"] = True
+            return
+
+
+def _invalidate_after_commit(session: Session) -> None:
+    if session.info.pop("dashboard_metrics_dirty", False):
+        invalidate()
+
+
+def _reset_after_rollback(session: Session) -> None:
+    session.info.pop("dashboard_metrics_dirty", None)
+
+
+def register_invalidation_hooks() -> None:
+    """Drops the cached metrics whenever a commit writes a watched model."""
+    if event.contains(Session, "before_flush", _track_changes):
+        return
+    event.listen(Session, "before_flush", _track_changes)
+    event.listen(Session, "after_commit", _invalidate_after_commit)
+    event.listen(Session, "after_rollback", _reset_after_rollback)
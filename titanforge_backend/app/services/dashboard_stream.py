@@ -0,0 +1,118 @@
+"""
+Live fan-out of dashboard metrics for /api/v1/dashboard/stream.
+
+Each uvicorn worker runs at most one broadcaster task, started by the first
+viewer and stopped after the last one leaves. The task listens on the
+Redis channel that dashboard_metrics.invalidate() publishes to. After a
+change it re-reads the shared metrics cache once and pushes only the
+fields that changed to every connected viewer. Viewers never query the
+database themselves, and the cache lock keeps the recomputation to one
+per change across all workers.
+"""
+
+import asyncio
+import time
+from typing import Any, Dict, Optional, Set, Tuple
+
+import redis
+
+from ..core.config import settings
+from ..redis_client import redis_client
+from . import dashboard_metrics
+
+StreamEvent = Tuple[str, Dict[str, Any]]
+
+# Bookkeeping fields that change on every recomputation
+IGNORED_FIELDS = {"computed_at"}
+
+
+def metrics_delta(
+    previous: Optional[Dict[str, Any]], current: Dict[str, Any]
+) -> Dict[str, Any]:
+    if previous is None:
+        return dict(current)
+    return {
+        key: value
+        for key, value in current.items()
+        if key not in IGNORED_FIELDS and previous.get(key) != value
+    }
+
+
+class MetricsBroadcaster:
+    """Shares one metrics subscription among all viewers in this process."""
+
+    def __init__(
+        self,
+        r: redis.Redis = redis_client,
+        debounce: float = 0.5,
+        refresh_interval: float = settings.DASHBOARD_METRICS_TTL,
+        queue_size: int = 16,
+    ):
+        self.r = r
+        self.debounce = debounce
+        self.refresh_interval = refresh_interval
+        self.queue_size = queue_size
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._latest: Optional[Dict[str, Any]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    async def subscribe(self) -> "asyncio.Queue[StreamEvent]":
+        """Registers a viewer. The queue starts with a full snapshot."""
+        queue: "asyncio.Queue[StreamEvent]" = asyncio.Queue(maxsize=self.queue_size)
+        async with self._lock:
+            if self._task is None or self._task.done():
+                self._latest = await asyncio.to_thread(dashboard_metrics.get_metrics)
+                self._task = asyncio.create_task(self._run())
+            self._subscribers.add(queue)
+            queue.put_nowait(("snapshot", self._latest))
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self._subscribers.discard(queue)
+        if not self._subscribers and self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def _publish(self, kind: str, data: Dict[str, Any]) -> None:
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait((kind, data))
+            except asyncio.QueueFull:
+                # A slow viewer missed deltas; resync it with a full snapshot
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(("snapshot", self._latest))
+
+    async def _run(self) -> None:
+        pubsub = self.r.pubsub(ignore_subscribe_messages=True)
+        try:
+            await asyncio.to_thread(pubsub.subscribe, dashboard_metrics.CHANGES_CHANNEL)
+            last_refresh = time.monotonic()
+            while self._subscribers:
+                try:
+                    message = await asyncio.to_thread(pubsub.get_message, timeout=1.0)
+                    refresh_due = time.monotonic() - last_refresh >= self.refresh_interval
+                    if message is None and not refresh_due:
+                        continue
+                    if message is not None:
+                        # Coalesce a burst of writes (e.g. a bulk import) into one update
+                        await asyncio.sleep(self.debounce)
+                        while await asyncio.to_thread(pubsub.get_message, timeout=0):
+                            pass
+                    last_refresh = time.monotonic()
+                    metrics = await asyncio.to_thread(dashboard_metrics.get_metrics)
+                except redis.RedisError as e:
+                    print(f"[WARNING] Dashboard stream lost Redis: {e}")
+                    await asyncio.sleep(1.0)
+                    continue
+
+                delta = metrics_delta(self._latest, metrics)
+                self._latest = metrics
+                if delta:
+                    self._publish("delta", delta)
+        finally:
+            await asyncio.to_thread(pubsub.close)
+
+
+metrics_broadcaster = MetricsBroadcaster()
@@ -0,0 +1,221 @@
+"""
+Batched writer for the events table.
+
+Events from the analytics queue are written by AnalyticsEventConsumer
+(swarm/departments/data_intelligence/event_consumer.py). It passes each
+batch it reads to write(), one multi-row INSERT, and acknowledges the
+stream entries only once that has committed. If the database is down,
+the entries stay pending and are redelivered. Rows the database rejects
+are reported back, so their entries can be dead-lettered.
+
+AnalyticsAgent.record_event, when called directly rather than from the
+queue, hands events to a buffer instead. A background thread flushes it
+whenever EVENT_SINK_BATCH_SIZE events are waiting or
+EVENT_SINK_FLUSH_INTERVAL seconds have passed, whichever comes first. The
+buffer is bounded: when the database falls behind, submit() blocks for up
+to EVENT_SINK_PUT_TIMEOUT seconds and then raises EventBufferFull.
+"""
+
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from .. import db_models
+from ..core.config import settings
+from ..database import SessionLocal
+
+
+class EventBufferFull(Exception):
+    """Raised when an event cannot be buffered before the put timeout."""
+
+
+def event_row(
+    event_type: str,
+    user_id: Optional[str] = None,
+    payload: Optional[Dict[str, Any]] = None,
+    timestamp: Optional[datetime] = None,
+) -> Dict[str, Any]:
+    """An events table row; raises ValueError for a malformed user_id."""
+    return {
+        "id": uuid.uuid4(),
+        "event_type": event_type,
+        "user_id": uuid.UUID(str(user_id)) if user_id else None,
+        "payload": payload,
+        "timestamp": timestamp or datetime.utcnow(),
+    }
+
+
+class EventSink:
+    """Collects events and writes them to the database in batches."""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        batch_size: int = settings.EVENT_SINK_BATCH_SIZE,
+        flush_interval: float = settings.EVENT_SINK_FLUSH_INTERVAL,
+        max_buffer: int = settings.EVENT_SINK_MAX_BUFFER,
+        put_timeout: float = settings.EVENT_SINK_PUT_TIMEOUT,
+        autostart: bool = True,
+    ):
+        self.session_factory = session_factory
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.autostart = autostart
+        self._buffer: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=max_buffer)
+        # Rows from a batch that failed on a connection error, retried first
+        self._retry: List[Dict[str, Any]] = []
+        self._write_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(
+        self,
+        event_type: str,
+        user_id: Optional[str] = None,
+        payload: Optional[Dict[str, Any]] = None,
+        timestamp: Optional[datetime] = None,
+    ) -> None:
+        row = event_row(event_type, user_id, payload, timestamp)
+        if self.autostart:
+            self.start()
+        try:
+            self._buffer.put(row, timeout=self.put_timeout)
+        except queue.Full:
+            raise EventBufferFull(
+                f"Event buffer is full ({self._buffer.maxsize} events pending)"
+            )
+
+    def start(self) -> None:
+        with self._start_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="event-sink", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Stops the flusher thread and writes whatever is still buffered."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+        self.flush()
+
+    def flush(self) -> int:
+        """Synchronously writes all buffered events. Returns the number written."""
+        written = 0
+        while True:
+            batch = self._drain(self.batch_size)
+            if not batch and not self._retry:
+                return written
+            written += self._write(batch)
+            if self._retry:
+                # The database is unreachable; leave the rest buffered
+                return written
+
+    @property
+    def pending(self) -> int:
+        return self._buffer.qsize() + len(self._retry)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            batch = self._collect()
+            if batch or self._retry:
+                self._write(batch)
+            if self._retry:
+                self._stop.wait(self.flush_interval)
+
+    def _collect(self) -> List[Dict[str, Any]]:
+        """Waits until a full batch is buffered or the flush interval runs out."""
+        batch: List[Dict[str, Any]] = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size and not self._stop.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._buffer.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _drain(self, limit: int) -> List[Dict[str, Any]]:
+        batch: List[Dict[str, Any]] = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._buffer.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def write(self, rows: List[Dict[str, Any]]) -> List[Tuple[int, Exception]]:
+        """
+        Writes rows now, bypassing the buffer, and returns (index, error) for
+        each row the database rejected; all others are committed. Raises
+        OperationalError, with nothing written, if the database is unreachable.
+        """
+        if not rows:
+            return []
+        db = self.session_factory()
+        try:
+            try:
+                db.execute(db_models.Event.__table__.insert(), rows)
+                db.commit()
+                return []
+            except OperationalError:
+                db.rollback()
+                raise
+            except Exception as e:
+                db.rollback()
+                print(f"[WARNING] Event batch insert failed, writing {len(rows)} event(s) one by one: {e}")
+                return self._write_each(db, rows)
+        finally:
+            db.close()
+
+    def _write(self, batch: List[Dict[str, Any]]) -> int:
+        with self._write_lock:
+            rows, self._retry = self._retry + batch, []
+            if not rows:
+                return 0
+            try:
+                rejected = self.write(rows)
+            except OperationalError as e:
+                print(f"[WARNING] Event sink could not reach the database, will retry {len(rows)} event(s): {e}")
+                self._retry = rows
+                return 0
+            # Buffered events have no queue message left to redeliver
+            for index, error in rejected:
+                print(f"[WARNING] Dropping event '{rows[index]['event_type']}': {error}")
+            return len(rows) - len(rejected)
+
+    def _write_each(self, db: Session, rows: List[Dict[str, Any]]) -> List[Tuple[int, Exception]]:
+        """Salvages a rejected batch so one bad row does not take its neighbours with it."""
+        rejected = []
+        for index, row in enumerate(rows):
+            try:
+                db.execute(db_models.Event.__table__.insert(), [row])
+                db.commit()
+            except OperationalError:
+                db.rollback()
+                raise
+            except Exception as e:
+                db.rollback()
+                rejected.append((index, e))
+        return rejected
+
+
+event_sink = EventSink()
+
+
+def stop_event_sink() -> None:
+    event_sink.stop()
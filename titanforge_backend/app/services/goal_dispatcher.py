@@ -0,0 +1,188 @@
+"""
+Background CEO dispatch for goals submitted through POST /goals.
+
+Goals are persisted as Task rows and pushed onto a Redis list by the API.
+A pool of dispatcher threads pops them off, lets the CEO route them and
+writes the outcome back onto the task so clients can poll or subscribe.
+"""
+
+import json
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import redis
+
+from .. import db_models
+from ..core.config import settings
+from ..database import SessionLocal
+from ..dependencies import send_agent_message
+from ..redis_client import redis_client
+
+GOAL_QUEUE = "ceo_goal_queue"
+TASK_EVENTS_CHANNEL = "task_events:{task_id}"
+
+
+def task_events_channel(task_id: str) -> str:
+    """Pub/sub channel on which status changes for a task are published."""
+    return TASK_EVENTS_CHANNEL.format(task_id=task_id)
+
+
+def enqueue_goal(task_id: str, description: str, user_id: str, r: redis.Redis) -> None:
+    """Queues a persisted goal for the CEO dispatch workers."""
+    job = {
+        "task_id": task_id,
+        "description": description,
+        "user_id": user_id,
+        "queued_at": datetime.utcnow().isoformat(),
+    }
+    r.rpush(GOAL_QUEUE, json.dumps(job))
+
+
+def serialize_task(task: db_models.Task) -> Dict[str, Any]:
+    return {
+        "id": str(task.id),
+        "description": task.description,
+        "status": task.status,
+        "created_at": task.created_at,
+        "history": task.history,
+        "result": task.result,
+    }
+
+
+class GoalDispatcher:
+    """
+    A pool of worker threads that drain the goal queue and run the CEO.
+
+    Each worker keeps its own CEO instance so the backlog file is read once
+    per worker instead of once per goal.
+    """
+
+    def __init__(
+        self,
+        workers: int = settings.CEO_DISPATCH_WORKERS,
+        r: redis.Redis = redis_client,
+        poll_timeout: int = 1,
+    ):
+        self.workers = max(1, workers)
+        self.r = r
+        self.poll_timeout = poll_timeout
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> None:
+        if self._threads:
+            return
+        self._stop.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(
+                target=self._run, name=f"ceo-dispatch-{i}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+        print(f"Started {self.workers} CEO dispatch worker(s).")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = []
+
+    def _run(self) -> None:
+        # Imported here to avoid a circular import with the API routers
+        from swarm.departments.executive_board.ceo import CEO
+
+        ceo = CEO(model_name=settings.LLM_MODEL_NAME)
+        while not self._stop.is_set():
+            try:
+                item = self.r.blpop(GOAL_QUEUE, timeout=self.poll_timeout)
+            except redis.RedisError as e:
+                print(f"[WARNING] CEO dispatcher could not read goal queue: {e}")
+                self._stop.wait(self.poll_timeout)
+                continue
+            if item is None:
+                continue
+            _, raw_job = item
+            try:
+                job = json.loads(raw_job)
+            except (TypeError, ValueError):
+                print(f"[WARNING] Dropping malformed goal job: {raw_job!r}")
+                continue
+            self.dispatch(ceo, job)
+
+    def dispatch(self, ceo: Any, job: Dict[str, Any]) -> None:
+        """Runs a single queued goal through the CEO and records the outcome."""
+        task_id = job["task_id"]
+        self._set_status(task_id, "in_progress", agent_id=ceo.agent_id)
+        try:
+            result = ceo.execute_task(
+                f"Task ID: {task_id}. Goal: {job['description']}"
+            )
+        except Exception as e:
+            print(f"--- CEO DISPATCH ERROR (Task {task_id}): {e} ---")
+            self._set_status(task_id, "failed", agent_id=ceo.agent_id, error=str(e))
+            self._notify_failure(task_id, e)
+            return
+        self._set_status(task_id, "completed", agent_id=ceo.agent_id, result=result)
+
+    def _set_status(
+        self,
+        task_id: str,
+        status: str,
+        agent_id: str,
+        result: Optional[str] = None,
+        error: Optional[str] = None,
+    ) -> None:
+        db = SessionLocal()
+        try:
+            task = db.query(db_models.Task).filter(db_models.Task.id == task_id).first()
+            if not task:
+                print(f"[WARNING] CEO dispatcher could not find task {task_id}")
+                return
+            entry = {
+                "status": status,
+                "agent_id": agent_id,
+                "timestamp": datetime.utcnow().isoformat(),
+            }
+            if error:
+                entry["error"] = error
+            task.status = status
+            task.history = (task.history or []) + [entry]
+            if result is not None or error is not None:
+                task.result = {"ceo_response": result, "error": error}
+            db.commit()
+            event = serialize_task(task)
+        except Exception as e:
+            db.rollback()
+            print(f"[WARNING] Failed to update task {task_id} to {status}: {e}")
+            return
+        finally:
+            db.close()
+
+        try:
+            self.r.publish(task_events_channel(task_id), json.dumps(event, default=str))
+        except redis.RedisError as e:
+            print(f"[WARNING] Failed to publish task event for {task_id}: {e}")
+
+    def _notify_failure(self, task_id: str, error: Exception) -> None:
+        send_agent_message(
+            recipient_id="notification_agent",
+            sender_id="mcp",
+            message_content={
+                "action": "process_notification_request",
+                "notification_type": "internal_error",
+                "data": {"error_message": f"Failed to process goal {task_id}: {error}"},
+            },
+            r=self.r,
+        )
+
+
+goal_dispatcher = GoalDispatcher()
+
+
+def start_goal_dispatcher() -> None:
+    goal_dispatcher.start()
+
+
+def stop_goal_dispatcher() -> None:
+    goal_dispatcher.stop()
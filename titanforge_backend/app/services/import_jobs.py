@@ -0,0 +1,244 @@
+"""
+Background contact import jobs.
+
+The upload endpoint spools the CSV to IMPORT_DIR, records an ImportJob row
+and pushes the job id onto a Redis list. A pool of runner threads pops job
+ids, claims each job with a conditional UPDATE (so a duplicate push never
+runs a job twice) and streams the file through AlumniImporter. Job
+counters are written in the same transaction as every chunk. A job that
+dies mid-way (a crash or redeploy) stops refreshing its updated_at. After
+IMPORT_JOB_STALE_SECONDS the runners requeue it, and it resumes after the
+last committed row. A job is retried at most IMPORT_JOB_MAX_ATTEMPTS
+times.
+"""
+
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+import redis
+
+from .. import db_models
+from ..core.config import settings
+from ..database import SessionLocal
+from ..redis_client import redis_client
+from . import dashboard_metrics, outreach_fanout
+from .alumni_importer import AlumniImporter, ImportFormatError, ImportResult, iter_csv_rows
+
+IMPORT_JOB_QUEUE = "import_job_queue"
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+def spool_path(job_id: str) -> str:
+    return os.path.join(settings.IMPORT_DIR, f"{job_id}.csv")
+
+
+def enqueue_import_job(job_id: str, r: redis.Redis = redis_client) -> None:
+    r.rpush(IMPORT_JOB_QUEUE, job_id)
+
+
+def serialize_job(job: db_models.ImportJob) -> Dict[str, Any]:
+    return {
+        "job_id": str(job.id),
+        "status": job.status,
+        "filename": job.filename,
+        "rows_processed": job.rows_processed,
+        "inserted": job.imported_count,
+        "skipped": job.skipped_count,
+        "error_count": job.error_count,
+        "error": job.error,
+        "error_report_url": (
+            f"/api/v1/leads/import-alumni/{job.id}/errors" if job.error_count else None
+        ),
+        "created_at": job.created_at,
+        "updated_at": job.updated_at,
+        "finished_at": job.finished_at,
+    }
+
+
+class ImportJobRunner:
+    """Worker threads that drain the import job queue."""
+
+    def __init__(
+        self,
+        workers: int = settings.IMPORT_JOB_WORKERS,
+        r: redis.Redis = redis_client,
+        poll_timeout: int = 1,
+        stale_after: int = settings.IMPORT_JOB_STALE_SECONDS,
+    ):
+        self.workers = max(1, workers)
+        self.r = r
+        self.poll_timeout = poll_timeout
+        self.stale_after = stale_after
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._last_recovery = 0.0
+
+    def start(self) -> None:
+        if self._threads:
+            return
+        self._stop.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"import-job-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        print(f"Started {self.workers} import job worker(s).")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = []
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            if time.monotonic() - self._last_recovery >= self.stale_after / 2:
+                self._last_recovery = time.monotonic()
+                self.recover_stale_jobs()
+            try:
+                item = self.r.blpop(IMPORT_JOB_QUEUE, timeout=self.poll_timeout)
+            except redis.RedisError as e:
+                print(f"[WARNING] Import job runner could not read queue: {e}")
+                self._stop.wait(self.poll_timeout)
+                continue
+            if item is None:
+                continue
+            _, job_id = item
+            try:
+                self.run_job(job_id)
+            except Exception as e:
+                print(f"--- IMPORT JOB ERROR (Job {job_id}): {e} ---")
+
+    def _claim(self, db, job_id: str) -> Optional[db_models.ImportJob]:
+        claimed = (
+            db.query(db_models.ImportJob)
+            .filter(db_models.ImportJob.id == job_id, db_models.ImportJob.status == "queued")
+            .update(
+                {
+                    "status": "running",
+                    "attempts": db_models.ImportJob.attempts + 1,
+                    "updated_at": datetime.utcnow(),
+                },
+                synchronize_session=False,
+            )
+        )
+        db.commit()
+        if not claimed:
+            return None
+        return db.get(db_models.ImportJob, job_id)
+
+    def run_job(self, job_id: str) -> None:
+        """Runs (or resumes) one queued job to completion."""
+        db = SessionLocal()
+        try:
+            job = self._claim(db, job_id)
+            if job is None:
+                return  # Already taken by another runner, finished, or unknown
+
+            resume = ImportResult(
+                import_id=str(job.id),
+                rows_processed=job.rows_processed,
+                imported_count=job.imported_count,
+                skipped_count=job.skipped_count,
+                error_count=job.error_count,
+                chunks_committed=job.chunks_committed,
+                last_row=job.last_row,
+            )
+
+            def record_progress(result: ImportResult) -> None:
+                # Runs inside the chunk's transaction
+                job.rows_processed = result.rows_processed
+                job.imported_count = result.imported_count
+                job.skipped_count = result.skipped_count
+                job.error_count = result.error_count
+                job.chunks_committed = result.chunks_committed
+                job.last_row = result.last_row
+                job.updated_at = datetime.utcnow()
+
+            importer = AlumniImporter(
+                db, user_id=job.created_by, on_progress=record_progress, resume_from=resume
+            )
+            try:
+                with open(job.file_path, "rb") as upload:
+                    importer.run(iter_csv_rows(upload))
+            except (ImportFormatError, OSError) as e:
+                db.rollback()
+                self._finish(db, job, "failed", error=str(e))
+                return
+            except Exception as e:
+                # Left "running": the stale-job sweep retries it from last_row
+                db.rollback()
+                print(f"--- IMPORT JOB ERROR (Job {job_id}) after row {job.last_row}: {e} ---")
+                return
+            finally:
+                if importer.result.imported_count:
+                    dashboard_metrics.invalidate(self.r)
+
+            self._finish(db, job, "completed")
+            try:
+                os.remove(job.file_path)
+            except OSError:
+                pass
+            # Start outreach now instead of waiting for the scheduled pass
+            try:
+                outreach_fanout.fan_out_pending(db, r=self.r)
+            except Exception as e:
+                db.rollback()
+                print(f"[WARNING] Outreach fan-out after import job {job_id} failed: {e}")
+        finally:
+            db.close()
+
+    def _finish(self, db, job: db_models.ImportJob, status: str, error: Optional[str] = None) -> None:
+        job.status = status
+        job.error = error
+        job.finished_at = datetime.utcnow()
+        db.commit()
+
+    def recover_stale_jobs(self) -> int:
+        """Requeues jobs whose runner stopped reporting progress."""
+        cutoff = datetime.utcnow() - timedelta(seconds=self.stale_after)
+        db = SessionLocal()
+        try:
+            stale = (
+                db.query(db_models.ImportJob)
+                .filter(
+                    db_models.ImportJob.status.in_(ACTIVE_STATUSES),
+                    db_models.ImportJob.updated_at < cutoff,
+                )
+                .all()
+            )
+            requeued = []
+            for job in stale:
+                if job.attempts >= settings.IMPORT_JOB_MAX_ATTEMPTS:
+                    job.status = "failed"
+                    job.error = f"Gave up after {job.attempts} attempts"
+                    job.finished_at = datetime.utcnow()
+                else:
+                    job.status = "queued"
+                    job.updated_at = datetime.utcnow()
+                    requeued.append(job)
+            db.commit()
+            for job in requeued:
+                print(f"[WARNING] Requeueing stalled import job {job.id} from row {job.last_row}")
+                enqueue_import_job(str(job.id), self.r)
+            return len(requeued)
+        except Exception as e:
+            db.rollback()
+            print(f"[WARNING] Could not recover stale import jobs: {e}")
+            return 0
+        finally:
+            db.close()
+
+
+import_job_runner = ImportJobRunner()
+
+
+def start_import_jobs() -> None:
+    import_job_runner.start()
+
+
+def stop_import_jobs() -> None:
+    import_job_runner.stop()
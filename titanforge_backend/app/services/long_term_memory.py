@@ -0,0 +1,60 @@
+"""
+Long-term memory for agents, kept in Redis.
+
+Each agent has a list of documents with their metadata, newest first,
+capped at LONG_TERM_MEMORY_MAX_DOCUMENTS. A query ranks an agent's
+documents by how many of the query's words they contain, so recall is by
+keyword rather than by embedding. The API routes and the Redis and
+in-process transports all go through this module, so agents see the same
+memories whichever way they connect.
+"""
+
+import json
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+import redis
+
+from ..core.config import settings
+
+MEMORY_KEY = "long_term_memory:{agent_id}"
+_WORD = re.compile(r"\w+")
+
+
+def _words(text: str) -> set:
+    return set(_WORD.findall(text.lower()))
+
+
+def add(
+    r: redis.Redis,
+    agent_id: str,
+    document: str,
+    metadata: Optional[Dict[str, Any]] = None,
+    max_documents: int = settings.LONG_TERM_MEMORY_MAX_DOCUMENTS,
+) -> None:
+    key = MEMORY_KEY.format(agent_id=agent_id)
+    entry = {"document": document, "metadata": metadata or {}, "created_at": time.time()}
+    pipe = r.pipeline()
+    pipe.lpush(key, json.dumps(entry, default=str))
+    pipe.ltrim(key, 0, max(1, max_documents) - 1)
+    pipe.execute()
+
+
+def query(r: redis.Redis, agent_id: str, query_text: str, n_results: int = 3) -> List[Dict[str, Any]]:
+    """The agent's documents sharing the most words with the query, best first."""
+    wanted = _words(query_text)
+    if not wanted or n_results <= 0:
+        return []
+    scored = []
+    for position, raw in enumerate(r.lrange(MEMORY_KEY.format(agent_id=agent_id), 0, -1)):
+        entry = json.loads(raw)
+        score = len(wanted & _words(entry["document"]))
+        if score:
+            # Newer documents win ties
+            scored.append((-score, position, entry))
+    scored.sort(key=lambda item: item[:2])
+    return [
+        {"document": entry["document"], "metadata": entry["metadata"], "score": -score}
+        for score, _, entry in scored[:n_results]
+    ]
@@ -0,0 +1,286 @@
+"""
+Daily metrics rollup.
+
+Raw events are folded into the daily_metrics table, one row per
+(day, event_type, source). Each day also gets snapshot rows for MRR, active
+subscriptions, open leads and active customers as of the end of that day.
+The incremental job picks up from a watermark (the last day that is fully
+aggregated) and recomputes every day after it, including today. Today
+stays open and is recomputed on every run. Reads combine rollup rows up to
+the watermark with the events after it. That tail is at most about a day
+of events, so reads stay exact without scanning the whole events table.
+"""
+
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import case, func, or_, select
+from sqlalchemy.orm import Session
+
+from .. import db_models
+from ..core.config import settings
+
+WATERMARK_NAME = "daily_metrics"
+
+SNAPSHOT_MRR = "snapshot:mrr"
+SNAPSHOT_OPEN_LEADS = "snapshot:open_leads"
+SNAPSHOT_ACTIVE_CUSTOMERS = "snapshot:active_customers"
+
+EventCounts = Dict[str, int]
+
+
+def _day_bounds(day: date):
+    start = datetime.combine(day, time.min)
+    return start, start + timedelta(days=1)
+
+
+def _days(start: date, end: date) -> Iterable[date]:
+    day = start
+    while day <= end:
+        yield day
+        day += timedelta(days=1)
+
+
+def _event_source():
+    payload = db_models.Event.payload
+    return func.coalesce(
+        payload["source"].as_string(), payload["utm_source"].as_string(), ""
+    )
+
+
+def get_watermark(db: Session) -> Optional[date]:
+    row = db.get(db_models.MetricsWatermark, WATERMARK_NAME)
+    return row.last_day if row else None
+
+
+def _set_watermark(db: Session, day: date) -> None:
+    row = db.get(db_models.MetricsWatermark, WATERMARK_NAME)
+    if row is None:
+        db.add(db_models.MetricsWatermark(name=WATERMARK_NAME, last_day=day))
+    elif day > row.last_day:
+        row.last_day = day
+
+
+def monthly_amount_cents():
+    """
+    Per-subscription monthly price in cents, for use in an aggregate over a
+    Subscription-Product join. Yearly plans are normalised to monthly and
+    anything that is not a recurring product counts as zero.
+    """
+    return case(
+        (
+            (db_models.Product.type == "subscription")
+            & (db_models.Product.interval == "year"),
+            db_models.Product.unit_amount / 12.0,
+        ),
+        (
+            (db_models.Product.type == "subscription")
+            & (db_models.Product.interval == "month"),
+            db_models.Product.unit_amount,
+        ),
+        else_=0,
+    )
+
+
+def event_total(event_type: str):
+    """
+    Scalar SQL expression for the all-time count of one event type: rollup
+    rows up to the watermark plus raw events after it. Lets callers fold the
+    total into a larger single-statement query.
+    """
+    watermark = (
+        select(db_models.MetricsWatermark.last_day)
+        .where(db_models.MetricsWatermark.name == WATERMARK_NAME)
+        .scalar_subquery()
+    )
+    rolled_up = (
+        select(func.coalesce(func.sum(db_models.DailyMetric.count), 0))
+        .where(
+            db_models.DailyMetric.event_type == event_type,
+            db_models.DailyMetric.day <= watermark,
+        )
+        .scalar_subquery()
+    )
+    tail = (
+        select(func.count(db_models.Event.id))
+        .where(
+            db_models.Event.event_type == event_type,
+            or_(watermark.is_(None), db_models.Event.timestamp >= watermark + 1),
+        )
+        .scalar_subquery()
+    )
+    return rolled_up + tail
+
+
+def compute_mrr_cents(db: Session, as_of: Optional[datetime] = None):
+    """Returns (mrr_cents, active_subscriptions), with yearly plans normalised to monthly."""
+    query = (
+        db.query(
+            func.coalesce(func.sum(monthly_amount_cents()), 0),
+            func.count(db_models.Subscription.id),
+        )
+        .join(db_models.Product, db_models.Subscription.product_id == db_models.Product.id)
+        .filter(db_models.Subscription.status == "active")
+    )
+    if as_of is not None:
+        query = query.filter(db_models.Subscription.created_at < as_of)
+    mrr, active = query.one()
+    return int(round(mrr or 0)), active or 0
+
+
+def _snapshot_rows(db: Session, day: date) -> List[db_models.DailyMetric]:
+    # Snapshots are taken "as of" the end of the day. Historical days can only
+    # be approximated on backfill, since status changes are not versioned.
+    _, end = _day_bounds(day)
+    mrr_cents, active_subscriptions = compute_mrr_cents(db, as_of=end)
+    open_leads = (
+        db.query(func.count(db_models.Lead.id))
+        .filter(db_models.Lead.status != "converted", db_models.Lead.created_at < end)
+        .scalar()
+    )
+    active_customers = (
+        db.query(func.count(db_models.User.id))
+        .filter(db_models.User.is_active == True, db_models.User.created_at < end)
+        .scalar()
+    )
+    return [
+        db_models.DailyMetric(
+            day=day, event_type=SNAPSHOT_MRR, source="",
+            count=active_subscriptions, amount=mrr_cents,
+        ),
+        db_models.DailyMetric(
+            day=day, event_type=SNAPSHOT_OPEN_LEADS, source="", count=open_leads or 0
+        ),
+        db_models.DailyMetric(
+            day=day, event_type=SNAPSHOT_ACTIVE_CUSTOMERS, source="", count=active_customers or 0
+        ),
+    ]
+
+
+def rollup_day(db: Session, day: date) -> List[db_models.DailyMetric]:
+    """Recomputes all rollup rows for one day. Does not commit."""
+    start, end = _day_bounds(day)
+    source = _event_source()
+    counts = (
+        db.query(db_models.Event.event_type, source, func.count(db_models.Event.id))
+        .filter(db_models.Event.timestamp >= start, db_models.Event.timestamp < end)
+        .group_by(db_models.Event.event_type, source)
+        .all()
+    )
+    rows = [
+        db_models.DailyMetric(day=day, event_type=event_type, source=src, count=count)
+        for event_type, src, count in counts
+    ]
+    rows.extend(_snapshot_rows(db, day))
+
+    db.query(db_models.DailyMetric).filter(db_models.DailyMetric.day == day).delete(
+        synchronize_session=False
+    )
+    db.add_all(rows)
+    return rows
+
+
+def refresh(db: Session, now: Optional[datetime] = None) -> Dict[str, object]:
+    """
+    Aggregates every day after the watermark up to today and advances the
+    watermark to the last day that is closed. A day counts as closed once
+    METRICS_ROLLUP_GRACE_MINUTES have passed since midnight, so buffered
+    events can land first.
+    """
+    now = now or datetime.utcnow()
+    today = now.date()
+    closed_through = (now - timedelta(minutes=settings.METRICS_ROLLUP_GRACE_MINUTES)).date() - timedelta(days=1)
+
+    watermark = get_watermark(db)
+    if watermark is not None:
+        start = watermark + timedelta(days=1)
+    else:
+        first_event = db.query(func.min(db_models.Event.timestamp)).scalar()
+        start = first_event.date() if first_event else today
+
+    days = 0
+    for day in _days(start, today):
+        rollup_day(db, day)
+        if day <= closed_through:
+            _set_watermark(db, day)
+        # Commit per day so a long catch-up keeps its progress
+        db.commit()
+        days += 1
+    return {"from": start.isoformat(), "to": today.isoformat(), "days": days}
+
+
+def backfill(db: Session, start: date, end: date) -> int:
+    """Recomputes an arbitrary date range. The watermark is left untouched."""
+    days = 0
+    for day in _days(start, end):
+        rollup_day(db, day)
+        db.commit()
+        days += 1
+    return days
+
+
+def event_totals(
+    db: Session, event_types: Iterable[str], since: Optional[date] = None
+) -> EventCounts:
+    """
+    Total events per type, optionally from `since` onwards: rollup rows up to
+    the watermark plus raw events after it.
+    """
+    event_types = list(event_types)
+    totals = {event_type: 0 for event_type in event_types}
+    watermark = get_watermark(db)
+
+    if watermark is not None:
+        query = db.query(
+            db_models.DailyMetric.event_type, func.sum(db_models.DailyMetric.count)
+        ).filter(
+            db_models.DailyMetric.event_type.in_(event_types),
+            db_models.DailyMetric.day <= watermark,
+        )
+        if since is not None:
+            query = query.filter(db_models.DailyMetric.day >= since)
+        for event_type, count in query.group_by(db_models.DailyMetric.event_type):
+            totals[event_type] += int(count or 0)
+
+    tail_start = None
+    if watermark is not None:
+        tail_start = datetime.combine(watermark + timedelta(days=1), time.min)
+    if since is not None:
+        since_start = datetime.combine(since, time.min)
+        tail_start = max(tail_start, since_start) if tail_start else since_start
+
+    query = db.query(db_models.Event.event_type, func.count(db_models.Event.id)).filter(
+        db_models.Event.event_type.in_(event_types)
+    )
+    if tail_start is not None:
+        query = query.filter(db_models.Event.timestamp >= tail_start)
+    for event_type, count in query.group_by(db_models.Event.event_type):
+        totals[event_type] += count
+    return totals
+
+
+def daily_series(
+    db: Session, event_types: Iterable[str], days: int = 7
+) -> Dict[str, Dict[str, int]]:
+    """Per-day counts from the rollup for the last `days` days (today included)."""
+    event_types = list(event_types)
+    start = datetime.utcnow().date() - timedelta(days=days - 1)
+    series = {
+        day.isoformat(): {event_type: 0 for event_type in event_types}
+        for day in _days(start, start + timedelta(days=days - 1))
+    }
+    rows = (
+        db.query(
+            db_models.DailyMetric.day,
+            db_models.DailyMetric.event_type,
+            func.sum(db_models.DailyMetric.count),
+        )
+        .filter(
+            db_models.DailyMetric.event_type.in_(event_types),
+            db_models.DailyMetric.day >= start,
+        )
+        .group_by(db_models.DailyMetric.day, db_models.DailyMetric.event_type)
+    )
+    for day, event_type, count in rows:
+        series[day.isoformat()][event_type] = int(count or 0)
+    return series
@@ -0,0 +1,365 @@
+"""
+Bulk outreach fan-out for imported leads.
+
+An import stages one compact outreach_recipients row per new lead, in the
+same transaction as the chunk that created the lead. When the import
+finishes, its batch is sealed and a single batch-level event is recorded.
+
+The fan-out pass then hands recipients to the notification agent in
+messages of up to OUTREACH_CHUNK_SIZE recipients. It sends at most
+OUTREACH_DOMAIN_RATE_PER_MINUTE recipients per mail domain per minute.
+Recipients over a domain's budget stay pending for the next pass, which
+the scheduler runs every OUTREACH_FANOUT_INTERVAL_SECONDS. A 100k-lead
+import therefore costs one event row and about 1k bus messages rather
+than 100k of each.
+
+A chunk the notification agent never records, e.g. because its message
+was dead-lettered, would leave its recipients queued and the batch open
+for good. Each pass therefore first returns recipients that have been
+queued for longer than OUTREACH_QUEUED_TIMEOUT_SECONDS to pending.
+"""
+
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import redis
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+from .. import agent_bus, db_models
+from ..core.config import settings
+from ..redis_client import redis_client
+from . import dashboard_metrics
+
+NOTIFICATION_AGENT = "notification_agent"
+RATE_KEY = "outreach_rate:{domain}:{window}"
+RATE_WINDOW_SECONDS = 60
+
+
+def email_domain(email: str) -> str:
+    return email.rsplit("@", 1)[-1].strip().lower()
+
+
+class DomainRateLimiter:
+    """Fixed one-minute windows of send budget per mail domain, kept in Redis."""
+
+    def __init__(
+        self,
+        r: redis.Redis = redis_client,
+        per_minute: int = settings.OUTREACH_DOMAIN_RATE_PER_MINUTE,
+    ):
+        self.r = r
+        self.per_minute = max(1, per_minute)
+        # domain -> window of its last reservation, so unused sends go back to it
+        self._windows: Dict[str, int] = {}
+
+    def acquire(self, domain: str, wanted: int) -> int:
+        """Reserves up to `wanted` sends for the domain; returns how many were granted."""
+        if wanted <= 0:
+            return 0
+        window = int(time.time() // RATE_WINDOW_SECONDS)
+        self._windows[domain] = window
+        key = RATE_KEY.format(domain=domain, window=window)
+        pipe = self.r.pipeline()
+        pipe.incrby(key, wanted)
+        pipe.expire(key, RATE_WINDOW_SECONDS * 2)
+        used, _ = pipe.execute()
+        over = min(wanted, int(used) - self.per_minute)
+        if over > 0:
+            self.r.decrby(key, over)  # Hand back what the window cannot take
+            return wanted - over
+        return wanted
+
+    def release(self, domain: str, unused: int) -> None:
+        """Hands back reserved sends that were not used, e.g. because fewer rows were claimed."""
+        window = self._windows.get(domain)
+        if unused <= 0 or window is None:
+            return
+        self.r.decrby(RATE_KEY.format(domain=domain, window=window), unused)
+
+
+def _get_batch(db: Session, import_id: str) -> Optional[db_models.OutreachBatch]:
+    return (
+        db.query(db_models.OutreachBatch)
+        .filter(db_models.OutreachBatch.import_id == import_id)
+        .first()
+    )
+
+
+def stage_recipients(
+    db: Session, import_id: str, user_id: Any, leads: Iterable[Tuple[Any, str]]
+) -> int:
+    """
+    Stages (lead id, email) pairs for outreach under the import's batch.
+    Does not commit; the caller commits with the leads themselves.
+    """
+    leads = list(leads)
+    if not leads:
+        return 0
+    batch = _get_batch(db, import_id)
+    if batch is None:
+        batch = db_models.OutreachBatch(
+            id=uuid.uuid4(), import_id=import_id, created_by=user_id, status="staging", total=0
+        )
+        db.add(batch)
+        db.flush()
+    db.execute(
+        db_models.OutreachRecipient.__table__.insert(),
+        [
+            {"batch_id": batch.id, "lead_id": lead_id, "domain": email_domain(email), "status": "pending"}
+            for lead_id, email in leads
+        ],
+    )
+    batch.total += len(leads)
+    return len(leads)
+
+
+def seal_batch(db: Session, import_id: str) -> Optional[db_models.OutreachBatch]:
+    """
+    Marks the import's batch ready for fan-out and records the one
+    batch-level event. Commits. Sealing twice is a no-op.
+    """
+    batch = _get_batch(db, import_id)
+    if batch is None or batch.status != "staging":
+        return batch
+    domains = (
+        db.query(func.count(func.distinct(db_models.OutreachRecipient.domain)))
+        .filter(db_models.OutreachRecipient.batch_id == batch.id)
+        .scalar()
+    )
+    batch.status = "ready"
+    db.add(
+        db_models.Event(
+            user_id=batch.created_by,
+            event_type="alumni_outreach_batch_created",
+            timestamp=datetime.utcnow(),
+            payload={
+                "batch_id": str(batch.id),
+                "import_id": import_id,
+                "recipients": batch.total,
+                "domains": domains,
+            },
+        )
+    )
+    db.commit()
+    return batch
+
+
+def _pending_by_domain(db: Session, batch_id) -> List[Tuple[str, int]]:
+    recipient = db_models.OutreachRecipient
+    return (
+        db.query(recipient.domain, func.count())
+        .filter(recipient.batch_id == batch_id, recipient.status == "pending")
+        .group_by(recipient.domain)
+        .all()
+    )
+
+
+def _claim_recipients(db: Session, batch_id, domain: str, limit: int) -> List[Dict[str, Any]]:
+    """Moves up to `limit` pending recipients of a domain to queued and returns them."""
+    recipient = db_models.OutreachRecipient
+    lead = db_models.Lead
+    rows = (
+        db.query(recipient.lead_id, lead.email, lead.name, lead.company)
+        .join(lead, lead.id == recipient.lead_id)
+        .filter(
+            recipient.batch_id == batch_id,
+            recipient.status == "pending",
+            recipient.domain == domain,
+        )
+        .limit(limit)
+        .all()
+    )
+    if not rows:
+        return []
+    claimed = (
+        db.query(recipient)
+        .filter(
+            recipient.batch_id == batch_id,
+            recipient.lead_id.in_([row.lead_id for row in rows]),
+            recipient.status == "pending",
+        )
+        .update({"status": "queued", "queued_at": func.now()}, synchronize_session=False)
+    )
+    if claimed != len(rows):
+        # Another fan-out pass got to some of them first; let it have the lot
+        db.rollback()
+        return []
+    return [
+        {
+            "lead_id": str(row.lead_id),
+            "email": row.email,
+            "name": row.name or row.email.split("@")[0],
+            "company": row.company,
+        }
+        for row in rows
+    ]
+
+
+def _release(db: Session, batch_id, recipients: List[Dict[str, Any]]) -> None:
+    recipient = db_models.OutreachRecipient
+    db.query(recipient).filter(
+        recipient.batch_id == batch_id,
+        recipient.lead_id.in_([uuid.UUID(item["lead_id"]) for item in recipients]),
+        recipient.status == "queued",
+    ).update({"status": "pending", "queued_at": None}, synchronize_session=False)
+    db.commit()
+
+
+def requeue_stale(db: Session, timeout: int = settings.OUTREACH_QUEUED_TIMEOUT_SECONDS) -> int:
+    """
+    Returns recipients queued more than `timeout` seconds ago without a
+    recorded delivery to pending, and reopens their batches. Commits.
+    """
+    recipient = db_models.OutreachRecipient
+    outreach = db_models.OutreachBatch
+    stale = (
+        recipient.status == "queued",
+        recipient.queued_at < func.now() - timedelta(seconds=timeout),
+    )
+    counts = db.query(recipient.batch_id, func.count()).filter(*stale).group_by(recipient.batch_id).all()
+    if not counts:
+        return 0
+    db.query(recipient).filter(*stale).update(
+        {"status": "pending", "queued_at": None}, synchronize_session=False
+    )
+    for batch_id, count in counts:
+        db.query(outreach).filter(outreach.id == batch_id).update(
+            {
+                "queued_count": outreach.queued_count - count,
+                # Fan-out only picks up ready batches
+                "status": case((outreach.status == "queued", "ready"), else_=outreach.status),
+            },
+            synchronize_session=False,
+        )
+    db.commit()
+    return sum(count for _, count in counts)
+
+
+def _complete_if_done(db: Session, batch_id) -> None:
+    outreach = db_models.OutreachBatch
+    db.query(outreach).filter(
+        outreach.id == batch_id,
+        outreach.status == "queued",
+        outreach.sent_count + outreach.failed_count >= outreach.total,
+    ).update(
+        {"status": "completed", "finished_at": datetime.utcnow()},
+        synchronize_session=False,
+    )
+
+
+def _return_budget(limiter: DomainRateLimiter, domain: str, unused: int) -> None:
+    try:
+        limiter.release(domain, unused)
+    except redis.RedisError as e:
+        # The window expires within two minutes anyway
+        print(f"[WARNING] Could not return {unused} outreach send(s) for {domain}: {e}")
+
+
+def fan_out_batch(
+    db: Session,
+    batch: db_models.OutreachBatch,
+    r: redis.Redis = redis_client,
+    limiter: Optional[DomainRateLimiter] = None,
+    chunk_size: int = settings.OUTREACH_CHUNK_SIZE,
+) -> int:
+    """Queues as much of a ready batch as the domain budgets allow right now."""
+    limiter = limiter or DomainRateLimiter(r)
+    chunk_size = max(1, chunk_size)
+    queued = 0
+    for domain, pending in _pending_by_domain(db, batch.id):
+        budget = limiter.acquire(domain, pending)
+        while budget > 0:
+            recipients = _claim_recipients(db, batch.id, domain, min(chunk_size, budget))
+            if not recipients:
+                break
+            batch.queued_count = db_models.OutreachBatch.queued_count + len(recipients)
+            db.commit()
+            try:
+                agent_bus.publish(
+                    r,
+                    NOTIFICATION_AGENT,
+                    "outreach_fanout",
+                    {
+                        "action": "send_outreach_batch",
+                        "batch_id": str(batch.id),
+                        "recipients": recipients,
+                    },
+                )
+            except redis.RedisError as e:
+                print(f"[WARNING] Could not queue outreach for batch {batch.id}: {e}")
+                batch.queued_count = db_models.OutreachBatch.queued_count - len(recipients)
+                _release(db, batch.id, recipients)
+                _return_budget(limiter, domain, budget)
+                return queued
+            queued += len(recipients)
+            budget -= len(recipients)
+        # Another pass may have claimed some of the rows counted as pending
+        _return_budget(limiter, domain, budget)
+
+    if not _pending_by_domain(db, batch.id):
+        batch.status = "queued"
+        db.flush()
+        # Deliveries may all have been recorded before the batch left "ready"
+        _complete_if_done(db, batch.id)
+        db.commit()
+    return queued
+
+
+def fan_out_pending(
+    db: Session,
+    r: redis.Redis = redis_client,
+    limiter: Optional[DomainRateLimiter] = None,
+) -> int:
+    """One fan-out pass over every ready batch, oldest first."""
+    limiter = limiter or DomainRateLimiter(r)
+    requeued = requeue_stale(db)
+    if requeued:
+        print(f"[WARNING] Returned {requeued} outreach recipient(s) queued without a delivery to pending")
+    batches = (
+        db.query(db_models.OutreachBatch)
+        .filter(db_models.OutreachBatch.status == "ready")
+        .order_by(db_models.OutreachBatch.created_at.asc())
+        .all()
+    )
+    return sum(fan_out_batch(db, batch, r=r, limiter=limiter) for batch in batches)
+
+
+def record_delivery(db: Session, batch_id: str, sent: List[str], failed: List[str]) -> None:
+    """Stores the outcome of one outreach message and closes the batch when done. Commits."""
+    recipient = db_models.OutreachRecipient
+    batch_uuid = uuid.UUID(str(batch_id))
+    # Only queued recipients are settled, so a redelivered message, or one
+    # whose recipients were requeued meanwhile, is not counted twice
+    updated = {"sent": 0, "failed": 0}
+    for status, lead_ids in (("sent", sent), ("failed", failed)):
+        if lead_ids:
+            updated[status] = (
+                db.query(recipient)
+                .filter(
+                    recipient.batch_id == batch_uuid,
+                    recipient.lead_id.in_([uuid.UUID(str(i)) for i in lead_ids]),
+                    recipient.status == "queued",
+                )
+                .update({"status": status, "queued_at": None}, synchronize_session=False)
+            )
+    if updated["sent"]:
+        db.query(db_models.Lead).filter(
+            db_models.Lead.id.in_([uuid.UUID(str(i)) for i in sent]),
+            db_models.Lead.status == "new",
+        ).update({"status": "contacted"}, synchronize_session=False)
+
+    outreach = db_models.OutreachBatch
+    db.query(outreach).filter(outreach.id == batch_uuid).update(
+        {
+            "sent_count": outreach.sent_count + updated["sent"],
+            "failed_count": outreach.failed_count + updated["failed"],
+        },
+        synchronize_session=False,
+    )
+    _complete_if_done(db, batch_uuid)
+    db.commit()
+    if updated["sent"]:
+        dashboard_metrics.invalidate()
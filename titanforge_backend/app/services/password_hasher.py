@@ -0,0 +1,151 @@
+"""
+Password hashing off the event loop, and per-IP login throttling.
+
+A bcrypt hash or check takes a few hundred milliseconds of CPU. register
+and login used to run it inline in their async endpoints, so a handful of
+concurrent logins stalled every other request on the worker. Hashing now
+runs on a dedicated pool of PASSWORD_HASH_WORKERS threads; bcrypt releases
+the GIL while it works, so the event loop keeps serving. At most
+PASSWORD_HASH_MAX_PENDING calls may wait for the pool. Beyond that,
+callers get PasswordHasherBusy straight away, which the endpoints turn
+into a 503. A login burst therefore waits in front of the pool instead of
+in front of the whole API.
+
+Logins for unknown emails are checked against a fixed dummy hash of the
+same cost, so they take as long as a wrong password for a real account
+and response times do not reveal which emails are registered.
+
+Login attempts are also capped per client IP, in fixed one-minute windows
+kept in Redis, before any hashing is done.
+"""
+
+import asyncio
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Callable, Optional, Tuple
+
+import redis
+
+from .. import security
+from ..core.config import settings
+from ..redis_client import redis_client
+
+LOGIN_RATE_KEY = "login_attempts:{ip}:{window}"
+RATE_WINDOW_SECONDS = 60
+
+
+@lru_cache(maxsize=1)
+def _dummy_hash() -> str:
+    """A hash no password matches, at the current cost; built on first use."""
+    return security.get_password_hash(secrets.token_urlsafe(32))
+
+
+def _verify_against_dummy(password: str) -> Tuple[bool, Optional[str]]:
+    security.verify_password(password, _dummy_hash())
+    return False, None
+
+
+class PasswordHasherBusy(Exception):
+    """Too many hashes are already waiting for the pool."""
+
+
+class PasswordHasher:
+    """Bounded thread pool for bcrypt, awaitable from async endpoints."""
+
+    def __init__(
+        self,
+        workers: int = settings.PASSWORD_HASH_WORKERS,
+        max_pending: int = settings.PASSWORD_HASH_MAX_PENDING,
+    ):
+        self.workers = max(1, workers)
+        self.max_pending = max(1, max_pending)
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    def _executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="password-hash"
+                )
+            return self._pool
+
+    async def _run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise PasswordHasherBusy()
+            self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor(), fn, *args)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(security.get_password_hash, password)
+
+    async def verify(
+        self, password: str, hashed_password: Optional[str]
+    ) -> Tuple[bool, Optional[str]]:
+        """
+        (valid, new hash or None); see security.verify_and_update_password.
+        Without a hash, e.g. for an unknown user, the password is checked
+        against a dummy hash so the call costs the same, and is never valid.
+        """
+        if hashed_password is None:
+            return await self._run(_verify_against_dummy, password)
+        return await self._run(security.verify_and_update_password, password, hashed_password)
+
+    def warm_up(self) -> None:
+        """Builds the dummy hash now, so the first unknown login is not slower."""
+        self._executor().submit(_dummy_hash)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False)
+
+
+class LoginThrottle:
+    """Fixed one-minute windows of login attempts per client IP, kept in Redis."""
+
+    def __init__(
+        self,
+        r: redis.Redis = redis_client,
+        per_minute: Optional[int] = None,
+    ):
+        self.r = r
+        self.per_minute = max(1, per_minute or settings.LOGIN_ATTEMPTS_PER_MINUTE)
+
+    def hit(self, ip: str) -> int:
+        """Counts an attempt; returns 0 if allowed, else seconds until the next window."""
+        now = time.time()
+        window = int(now // RATE_WINDOW_SECONDS)
+        key = LOGIN_RATE_KEY.format(ip=ip, window=window)
+        try:
+            pipe = self.r.pipeline()
+            pipe.incr(key)
+            pipe.expire(key, RATE_WINDOW_SECONDS * 2)
+            attempts, _ = pipe.execute()
+        except redis.RedisError as e:
+            print(f"[WARNING] Login throttle unavailable: {e}")
+            return 0
+        if int(attempts) <= self.per_minute:
+            return 0
+        return max(1, int((window + 1) * RATE_WINDOW_SECONDS - now))
+
+
+password_hasher = PasswordHasher()
+
+
+def start_password_hasher() -> None:
+    password_hasher.warm_up()
+
+
+def stop_password_hasher() -> None:
+    password_hasher.shutdown()
@@ -0,0 +1,167 @@
+"""
+Connection pool metrics and leak detection for the database engines.
+
+Each engine in app/database.py uses a pool class from here. These pools
+time how long every checkout waits for a free connection. Pool events
+record who holds each connection and since when. A connection returned
+after more than DB_SESSION_LEAK_SECONDS is reported with the code that
+checked it out. This is typically a session opened with
+next(get_db_session_from_agent()) and closed late, or never closed on
+some path. Connections that are still out past the limit are listed by
+long_held() and in the admin pool endpoint, so a leak shows up before the
+pool runs dry.
+"""
+
+import os
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import sqlalchemy
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from ..core.config import settings
+
+# Frames from these are skipped when naming who checked a connection out
+_INTERNAL_PATHS = (os.path.dirname(sqlalchemy.__file__), __file__)
+
+
+def _caller() -> str:
+    """file:line (function) of the first frame outside SQLAlchemy and this module."""
+    frame = sys._getframe(1)
+    while frame is not None:
+        path = frame.f_code.co_filename
+        if not path.startswith(_INTERNAL_PATHS):
+            return f"{path}:{frame.f_lineno} ({frame.f_code.co_name})"
+        frame = frame.f_back
+    return "unknown"
+
+
+class PoolMonitor:
+    """Checkout counters, wait times and held connections for one engine."""
+
+    def __init__(self, name: str, leak_seconds: float = settings.DB_SESSION_LEAK_SECONDS):
+        self.name = name
+        self.leak_seconds = leak_seconds
+        self.checkouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.timeouts = 0
+        self.leaks_reported = 0
+        self._held: Dict[int, Tuple[float, str]] = {}
+        self._lock = threading.Lock()
+
+    def record_wait(self, seconds: float, ok: bool) -> None:
+        with self._lock:
+            if not ok:
+                self.timeouts += 1
+                return
+            self.checkouts += 1
+            self.wait_seconds += seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+
+    def on_checkout(self, dbapi_connection, connection_record, connection_proxy) -> None:
+        with self._lock:
+            self._held[id(connection_record)] = (time.monotonic(), _caller())
+
+    def on_checkin(self, dbapi_connection, connection_record) -> None:
+        with self._lock:
+            since, caller = self._held.pop(id(connection_record), (None, None))
+        if since is None or self.leak_seconds <= 0:
+            return
+        held = time.monotonic() - since
+        if held > self.leak_seconds:
+            self.leaks_reported += 1
+            print(
+                f"[WARNING] {self.name} database connection held for {held:.1f}s "
+                f"(limit {self.leak_seconds:g}s), checked out at {caller}"
+            )
+
+    def long_held(self, older_than: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Connections still checked out for longer than the leak limit."""
+        limit = self.leak_seconds if older_than is None else older_than
+        now = time.monotonic()
+        with self._lock:
+            held = list(self._held.values())
+        return sorted(
+            (
+                {"held_seconds": round(now - since, 1), "checked_out_at": caller}
+                for since, caller in held
+                if now - since > limit
+            ),
+            key=lambda c: -c["held_seconds"],
+        )
+
+    def snapshot(self, pool) -> Dict[str, Any]:
+        with self._lock:
+            checkouts, wait = self.checkouts, self.wait_seconds
+            stats = {
+                "checkouts": checkouts,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(wait / checkouts * 1000, 2) if checkouts else 0.0,
+                "max_wait_ms": round(self.max_wait_seconds * 1000, 2),
+                "leaks_reported": self.leaks_reported,
+            }
+        if isinstance(pool, QueuePool):
+            stats.update(
+                size=pool.size(),
+                checked_out=pool.checkedout(),
+                overflow=pool.overflow(),
+                idle=pool.checkedin(),
+            )
+        stats["long_held"] = self.long_held()
+        return stats
+
+
+class _TimedPoolMixin:
+    # Set by watch()
+    monitor: Optional[PoolMonitor] = None
+
+    def _do_get(self):
+        started = time.perf_counter()
+        ok = False
+        try:
+            connection = super()._do_get()
+            ok = True
+            return connection
+        finally:
+            if self.monitor is not None:
+                self.monitor.record_wait(time.perf_counter() - started, ok)
+
+    def recreate(self):
+        # Pools are recreated on dispose() and after a fork; keep the counters
+        pool = super().recreate()
+        pool.monitor = self.monitor
+        return pool
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    """QueuePool that records how long each checkout waited."""
+
+
+class TimedAsyncQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that records how long each checkout waited."""
+
+
+monitors: Dict[str, Tuple[PoolMonitor, Any]] = {}
+
+
+def watch(name: str, engine) -> PoolMonitor:
+    """Attaches a monitor to an engine using one of the timed pools (sync or async)."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    monitor = PoolMonitor(name)
+    sync_engine.pool.monitor = monitor
+    event.listen(sync_engine, "checkout", monitor.on_checkout)
+    event.listen(sync_engine, "checkin", monitor.on_checkin)
+    monitors[name] = (monitor, sync_engine)
+    return monitor
+
+
+def snapshot() -> Dict[str, Dict[str, Any]]:
+    """Metrics for every watched engine, keyed by name."""
+    return {
+        name: monitor.snapshot(sync_engine.pool)
+        for name, (monitor, sync_engine) in monitors.items()
+    }
@@ -0,0 +1,93 @@
+"""
+Idempotency and routing for Stripe webhook events.
+
+Stripe delivers each event at least once and retries for up to three
+days. The webhook claims an event id in Redis with SET NX before
+enqueueing it, so a retry of an event already accepted costs one Redis
+round trip. The billing agent's check against stripe_transactions covers
+the case where Redis lost the key.
+
+Events are queued on one of BILLING_PARTITIONS streams
+(agent_stream:billing_manager:p<n>), chosen by a stable hash of the Stripe
+customer id. All events of one customer therefore share a stream, and the
+billing worker keeps each stream ordered (see
+swarm/departments/finance/billing_consumer.py).
+"""
+
+import zlib
+from typing import Any, Dict, Optional
+
+import redis
+from sqlalchemy.orm import Session
+
+from .. import agent_bus, db_models
+from ..core.config import settings
+
+DEDUPE_KEY = "stripe_event:{event_id}"
+BILLING_AGENT_ID = "billing_manager"
+
+
+def claim_event(r: redis.Redis, event_id: str) -> bool:
+    """Marks the event as accepted; False if it already was."""
+    return bool(
+        r.set(DEDUPE_KEY.format(event_id=event_id), "queued", nx=True, ex=settings.STRIPE_EVENT_DEDUPE_TTL)
+    )
+
+
+def release_event(r: redis.Redis, event_id: str) -> None:
+    """Drops a claim so a retry of the event is accepted again."""
+    r.delete(DEDUPE_KEY.format(event_id=event_id))
+
+
+def is_recorded(db: Session, event_id: str) -> bool:
+    return (
+        db.query(db_models.StripeTransaction.id)
+        .filter(db_models.StripeTransaction.stripe_event_id == event_id)
+        .first()
+        is not None
+    )
+
+
+def event_customer_id(event: Dict[str, Any]) -> Optional[str]:
+    """The Stripe customer an event belongs to, if any."""
+    obj = (event.get("data") or {}).get("object") or {}
+    if obj.get("object") == "customer":
+        return obj.get("id")
+    customer = obj.get("customer")
+    if isinstance(customer, dict):  # Expanded customer object
+        customer = customer.get("id")
+    return customer
+
+
+def event_amount(event: Dict[str, Any]) -> Optional[int]:
+    """
+    The amount an event moved, in minor units. Accepts a whole event or, as
+    in rows recorded before raw_event held the whole event, its object.
+    """
+    is_event = event.get("object") == "event" or "data" in event
+    obj = ((event.get("data") or {}).get("object") or {}) if is_event else event
+    for field in ("amount_paid", "amount_received", "amount_total", "amount"):
+        value = obj.get(field)
+        if isinstance(value, int):
+            return value
+    return None
+
+
+def partition_for(key: str, partitions: int = settings.BILLING_PARTITIONS) -> int:
+    # crc32 rather than hash(), which is salted per process
+    return zlib.crc32(key.encode()) % partitions
+
+
+def partition_agent_id(partition: int) -> str:
+    return f"{BILLING_AGENT_ID}:p{partition}"
+
+
+def enqueue_event(
+    r: redis.Redis, event: Dict[str, Any], sender_id: str, replay: bool = False
+) -> str:
+    """Queues a parsed event on its customer's partition; returns the entry id."""
+    key = event_customer_id(event) or event["id"]
+    message = {"action": "handle_webhook_event", "event": event, "dedupe_key": event["id"]}
+    if replay:
+        message["replay"] = True
+    return agent_bus.publish(r, partition_agent_id(partition_for(key)), sender_id, message)
@@ -0,0 +1,259 @@
+"""
+Registry of issued tokens and the set of revoked ones.
+
+Access tokens stay stateless JWTs, but every token now carries a jti
+claim. Revoking a token records its jti in Redis until the token would
+have expired anyway, both as an exact key and in a sorted set scored by
+expiry. Each API process keeps a Bloom filter of the revoked ids. The
+filter is loaded from the sorted set and kept current over
+REVOCATIONS_CHANNEL, so checking a valid token costs no network call at
+all. Only when the filter answers "maybe" is the exact key read. Until
+the filter is loaded, or while Redis is unreachable, every check goes to
+the exact key.
+
+Refresh tokens are stateful. Each one is stored under its jti until it is
+used. Using it deletes it and issues a new pair in the same family.
+Presenting a refresh token that was already used revokes the whole
+family, since the token must have leaked.
+
+Issued tokens are also indexed per user, so logout everywhere and
+deactivation revoke all of a user's tokens at once.
+"""
+
+import hashlib
+import json
+import math
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+import redis
+
+from ..core.config import settings
+from ..redis_client import redis_client
+
+REVOKED_KEY = "revoked_token:{jti}"
+REVOKED_SET = "revoked_tokens"
+REVOCATIONS_CHANNEL = "revoked_tokens:new"
+REFRESH_KEY = "refresh_token:{jti}"
+# Hash of jti -> {"exp", "family", "type"} for every live token of a user
+USER_TOKENS_KEY = "user_tokens:{subject}"
+# Expired entries are pruned from a user's index once it grows past this
+USER_TOKENS_PRUNE_AT = 200
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings; no false negatives."""
+
+    def __init__(self, capacity: int, error_rate: float):
+        capacity = max(1, capacity)
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(item))
+
+
+class RevocationIndex:
+    """This process's Bloom filter of revoked token ids, fed from Redis."""
+
+    def __init__(
+        self,
+        r: redis.Redis = redis_client,
+        capacity: int = settings.TOKEN_REVOCATION_CAPACITY,
+        error_rate: float = settings.TOKEN_REVOCATION_ERROR_RATE,
+        rebuild_interval: float = 300.0,
+    ):
+        self.r = r
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.rebuild_interval = rebuild_interval
+        # None until loaded: every check then goes to the exact key
+        self._bloom: Optional[BloomFilter] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="token-revocations", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+        self._bloom = None
+
+    def add(self, jti: str) -> None:
+        with self._lock:
+            if self._bloom is not None:
+                self._bloom.add(jti)
+
+    def might_contain(self, jti: str) -> bool:
+        bloom = self._bloom
+        return bloom is None or jti in bloom
+
+    def load(self) -> None:
+        """Rebuilds the filter from the revocations that have not expired yet."""
+        now = time.time()
+        self.r.zremrangebyscore(REVOKED_SET, "-inf", now)
+        revoked = self.r.zrange(REVOKED_SET, 0, -1)
+        # Sized for growth, so a burst of revocations keeps the error rate
+        bloom = BloomFilter(max(self.capacity, len(revoked) * 2), self.error_rate)
+        for jti in revoked:
+            bloom.add(jti)
+        with self._lock:
+            self._bloom = bloom
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            pubsub = self.r.pubsub(ignore_subscribe_messages=True)
+            try:
+                # Subscribed before loading, so nothing revoked in between is missed
+                pubsub.subscribe(REVOCATIONS_CHANNEL)
+                self.load()
+                loaded = time.monotonic()
+                while not self._stop.is_set():
+                    message = pubsub.get_message(timeout=1.0)
+                    if message is not None:
+                        self.add(message["data"])
+                    if time.monotonic() - loaded >= self.rebuild_interval:
+                        # Drops expired revocations from the filter
+                        self.load()
+                        loaded = time.monotonic()
+            except redis.RedisError as e:
+                print(f"[WARNING] Token revocation listener lost Redis: {e}")
+                self._bloom = None
+                self._stop.wait(1.0)
+            finally:
+                pubsub.close()
+
+
+revocation_index = RevocationIndex()
+
+
+def start_revocation_listener() -> None:
+    revocation_index.start()
+
+
+def stop_revocation_listener() -> None:
+    revocation_index.stop()
+
+
+def new_jti() -> str:
+    return uuid.uuid4().hex
+
+
+def register(
+    r: redis.Redis,
+    subject: str,
+    jti: str,
+    expires_at: int,
+    family: str,
+    token_type: str,
+) -> None:
+    """Records an issued token; refresh tokens also become redeemable."""
+    ttl = max(1, expires_at - int(time.time()))
+    key = USER_TOKENS_KEY.format(subject=subject)
+    pipe = r.pipeline()
+    pipe.hset(key, jti, json.dumps({"exp": expires_at, "family": family, "type": token_type}))
+    pipe.expire(key, settings.REFRESH_TOKEN_EXPIRE_DAYS * 86400)
+    if token_type == "refresh":
+        pipe.set(
+            REFRESH_KEY.format(jti=jti),
+            json.dumps({"sub": subject, "family": family}),
+            ex=ttl,
+        )
+    pipe.hlen(key)
+    if pipe.execute()[-1] > USER_TOKENS_PRUNE_AT:
+        _prune(r, key)
+
+
+def _prune(r: redis.Redis, key: str) -> None:
+    now = time.time()
+    expired = [
+        jti for jti, raw in r.hgetall(key).items() if json.loads(raw)["exp"] <= now
+    ]
+    if expired:
+        r.hdel(key, *expired)
+
+
+def consume_refresh(r: redis.Redis, jti: str) -> Optional[Dict[str, Any]]:
+    """Redeems a refresh token once; None if it was used or never issued."""
+    pipe = r.pipeline(transaction=True)
+    pipe.get(REFRESH_KEY.format(jti=jti))
+    pipe.delete(REFRESH_KEY.format(jti=jti))
+    raw, deleted = pipe.execute()
+    return json.loads(raw) if raw and deleted else None
+
+
+def revoke(r: redis.Redis, jti: str, expires_at: int) -> None:
+    _revoke_many(r, {jti: expires_at})
+
+
+def _revoke_many(r: redis.Redis, tokens: Dict[str, int]) -> None:
+    now = int(time.time())
+    live = {jti: exp for jti, exp in tokens.items() if exp > now}  # Expired ones need nothing
+    if not live:
+        return
+    pipe = r.pipeline()
+    for jti, expires_at in live.items():
+        pipe.set(REVOKED_KEY.format(jti=jti), "1", ex=expires_at - now)
+        pipe.delete(REFRESH_KEY.format(jti=jti))
+        pipe.publish(REVOCATIONS_CHANNEL, jti)
+    pipe.zadd(REVOKED_SET, live)
+    pipe.execute()
+    for jti in live:
+        revocation_index.add(jti)
+
+
+def _revoke_where(r: redis.Redis, subject: str, family: Optional[str] = None) -> int:
+    key = USER_TOKENS_KEY.format(subject=subject)
+    tokens: Dict[str, int] = {}
+    for jti, raw in r.hgetall(key).items():
+        token = json.loads(raw)
+        if family is None or token["family"] == family:
+            tokens[jti] = token["exp"]
+    if tokens:
+        _revoke_many(r, tokens)
+        r.hdel(key, *tokens)
+    return len(tokens)
+
+
+def revoke_family(r: redis.Redis, subject: str, family: str) -> int:
+    """Revokes every token issued from one login; returns how many."""
+    if not family:
+        return 0
+    return _revoke_where(r, subject, family)
+
+
+def revoke_user(r: redis.Redis, subject: str) -> int:
+    """Revokes every live token of a user; returns how many."""
+    return _revoke_where(r, subject)
+
+
+def is_revoked(jti: str, r: redis.Redis = redis_client) -> bool:
+    if not revocation_index.might_contain(jti):
+        return False
+    try:
+        return bool(r.exists(REVOKED_KEY.format(jti=jti)))
+    except redis.RedisError as e:
+        # Tokens stay valid until they expire, as before revocation existed
+        print(f"[WARNING] Could not check token revocation: {e}")
+        return False
@@ -0,0 +1,129 @@
+"""
+Short-lived cache of the users behind access tokens.
+
+get_current_user used to load the user from Postgres on every
+authenticated request. The columns it needs are now kept in Redis for
+USER_PRINCIPAL_TTL seconds, keyed by the token subject (the user's email).
+A hit is rebuilt as a User that is already attached to the request's
+session, so handlers can still read, update and commit it as before. Only
+attributes that were not cached, such as hashed_password or relationships,
+are loaded on first access.
+
+Admin changes to a user drop the entry explicitly. Every other commit that
+writes a user drops it through SQLAlchemy session hooks, so a deactivated
+or demoted user is not served from the cache.
+"""
+
+import json
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+import redis
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from .. import crud, db_models
+from ..core.config import settings
+from ..redis_client import redis_client
+
+CACHE_KEY = "user_principal:{subject}"
+
+# Everything a request handler reads from current_user; never the password hash
+CACHED_FIELDS = (
+    "id",
+    "email",
+    "full_name",
+    "is_active",
+    "is_superuser",
+    "github_id",
+    "stripe_customer_id",
+    "current_subscription_id",
+    "created_at",
+    "updated_at",
+)
+UUID_FIELDS = ("id", "current_subscription_id")
+DATETIME_FIELDS = ("created_at", "updated_at")
+
+
+def _dump(user: db_models.User) -> str:
+    values = {}
+    for field in CACHED_FIELDS:
+        value = getattr(user, field)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        elif isinstance(value, uuid.UUID):
+            value = str(value)
+        values[field] = value
+    return json.dumps(values)
+
+
+def _load(db: Session, raw: str) -> db_models.User:
+    values: Dict[str, Any] = json.loads(raw)
+    for field in UUID_FIELDS:
+        if values[field] is not None:
+            values[field] = uuid.UUID(values[field])
+    for field in DATETIME_FIELDS:
+        if values[field] is not None:
+            values[field] = datetime.fromisoformat(values[field])
+    user = db_models.User(**values)
+    # As if just loaded from the database; the rest of the columns are expired
+    make_transient_to_detached(user)
+    return db.merge(user, load=False)
+
+
+def get_principal(db: Session, subject: str, r: redis.Redis = redis_client) -> Optional[db_models.User]:
+    """The user a token was issued to, from the cache when possible."""
+    ttl = settings.USER_PRINCIPAL_TTL
+    if ttl <= 0:
+        return crud.get_user_by_email(db, email=subject)
+
+    key = CACHE_KEY.format(subject=subject)
+    try:
+        raw = r.get(key)
+        if raw:
+            return _load(db, raw)
+    except redis.RedisError as e:
+        print(f"[WARNING] User principal cache unavailable: {e}")
+        return crud.get_user_by_email(db, email=subject)
+
+    user = crud.get_user_by_email(db, email=subject)
+    if user is not None:
+        try:
+            r.set(key, _dump(user), ex=ttl)
+        except redis.RedisError as e:
+            print(f"[WARNING] Could not cache user principal: {e}")
+    return user
+
+
+def invalidate(email: str, r: redis.Redis = redis_client) -> None:
+    try:
+        r.delete(CACHE_KEY.format(subject=email))
+    except redis.RedisError as e:
+        print(f"[WARNING] Could not invalidate user principal for {email}: {e}")
+
+
+def _track_changes(session: Session, flush_context, instances) -> None:
+    for obj in (*session.dirty, *session.deleted):
+        if isinstance(obj, db_models.User):
+            emails = session.info.setdefault("user_principals_dirty", set())
+            history = inspect(obj).attrs.email.history
+            emails.update(e for e in (obj.email, *history.deleted) if e)
+
+
+def _invalidate_after_commit(session: Session) -> None:
+    for email in session.info.pop("user_principals_dirty", ()):
+        invalidate(email)
+
+
+def _reset_after_rollback(session: Session) -> None:
+    session.info.pop("user_principals_dirty", None)
+
+
+def register_invalidation_hooks() -> None:
+    """Drops cached principals whenever a commit updates or deletes a user."""
+    if event.contains(Session, "before_flush", _track_changes):
+        return
+    event.listen(Session, "before_flush", _track_changes)
+    event.listen(Session, "after_commit", _invalidate_after_commit)
+    event.listen(Session, "after_rollback", _reset_after_rollback)
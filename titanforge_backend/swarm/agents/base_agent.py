@@ -1,11 +1,12 @@
 import json
 import re
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
-import requests
 from litellm import completion
 
+from swarm.agents.transport import AgentTransport, get_default_transport
+
 
 class BaseAgent(ABC):
     """
@@ -17,16 +18,28 @@ class BaseAgent(ABC):
     def __init__(
         self,
         role: str,
-        department: str,
+        department: str = "",
         tools: List[Any] = [],
         model_name: str = "mock-response",
+        transport: Optional[AgentTransport] = None,
+        agent_id: Optional[str] = None,
+        goal: str = "",
+        backstory: str = "",
     ):
-        self.agent_id = role.replace(" ", "_").lower()  # A unique ID for the agent
+        # A unique ID for the agent; it doubles as the agent's queue name
+        self.agent_id = agent_id or role.replace(" ", "_").lower()
         self.role = role
         self.department = department
+        self.goal = goal
+        self.backstory = backstory
         self.tools = {tool.name: tool for tool in tools}
         self.model_name = model_name
-        self.mcp_api_url = "http://127.0.0.1:8000"  # URL of the MCP
+        self._transport = transport
+
+    @property
+    def transport(self) -> AgentTransport:
+        """The bus/task/memory transport; resolved lazily so the MCP can swap the default."""
+        return self._transport or get_default_transport()
 
     def get_tool_descriptions(self) -> str:
         """Returns a string describing the available tools."""
@@ -103,88 +116,33 @@ class BaseAgent(ABC):
 
     def send_message(self, recipient_id: str, message: str):
         """Sends a message to another agent via the MCP message bus."""
-        try:
-            response = requests.post(
-                f"{self.mcp_api_url}/messages/send",
-                json={
-                    "sender_id": self.agent_id,
-                    "recipient_id": recipient_id,
-                    "message": message,
-                },
-            )
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            return {"error": f"Failed to send message: {e}"}
+        return self.transport.send_message(self.agent_id, recipient_id, message)
 
     def receive_message(self):
         """Receives a message from the agent's queue on the MCP message bus."""
-        try:
-            response = requests.get(
-                f"{self.mcp_api_url}/messages/receive/{self.agent_id}"
-            )
-            response.raise_for_status()
-            data = response.json()
-            return data.get("message")
-        except requests.exceptions.RequestException as e:
-            return {"error": f"Failed to receive message: {e}"}
+        return self.transport.receive_message(self.agent_id)
 
     # --- Memory Methods ---
 
     def save_to_long_term_memory(self, document: str, metadata: Dict[str, Any]):
         """Saves a document to the long-term memory via the MCP."""
-        try:
-            response = requests.post(
-                f"{self.mcp_api_url}/memory/long_term/add",
-                json={
-                    "agent_id": self.agent_id,
-                    "document": document,
-                    "metadata": metadata,
-                },
-            )
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            return {"error": f"Failed to save to long-term memory: {e}"}
+        return self.transport.save_to_long_term_memory(
+            self.agent_id, document, metadata
+        )
 
     def retrieve_from_long_term_memory(self, query_text: str, n_results: int = 3):
         """Retrieves documents from the long-term memory via the MCP."""
-        try:
-            response = requests.post(
-                f"{self.mcp_api_url}/memory/long_term/query",
-                json={
-                    "agent_id": self.agent_id,
-                    "query_text": query_text,
-                    "n_results": n_results,
-                },
-            )
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            return {"error": f"Failed to retrieve from long-term memory: {e}"}
+        return self.transport.retrieve_from_long_term_memory(
+            self.agent_id, query_text, n_results
+        )
 
     def save_to_short_term_memory(self, key: str, value: Any):
         """Saves a key-value pair to the short-term memory via the MCP."""
-        try:
-            response = requests.post(
-                f"{self.mcp_api_url}/memory/short_term/add",
-                json={"agent_id": self.agent_id, "key": key, "value": value},
-            )
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            return {"error": f"Failed to save to short-term memory: {e}"}
+        return self.transport.save_to_short_term_memory(self.agent_id, key, value)
 
     def retrieve_from_short_term_memory(self):
         """Retrieves the short-term memory for the agent via the MCP."""
-        try:
-            response = requests.get(
-                f"{self.mcp_api_url}/memory/short_term/{self.agent_id}"
-            )
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            return {"error": f"Failed to retrieve from short-term memory: {e}"}
+        return self.transport.retrieve_from_short_term_memory(self.agent_id)
 
     # --- Task Management Methods ---
 
@@ -197,16 +155,7 @@ class BaseAgent(ABC):
 
     def update_task_status(self, task_id: str, status: str):
         """Updates the status of a task via the MCP."""
-        try:
-            response = requests.put(
-                f"{self.mcp_api_url}/tasks/{task_id}",
-                json={"status": status, "agent_id": self.agent_id},
-            )
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            print(f"Error updating task status: {e}")
-            return {"error": f"Failed to update task status: {e}"}
+        return self.transport.update_task_status(task_id, status, self.agent_id)
 
     @abstractmethod
     def execute_task(self, task_description: str) -> str:
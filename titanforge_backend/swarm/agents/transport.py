@@ -0,0 +1,255 @@
+"""
+Transports used by BaseAgent to reach the message bus, task store and memory.
+
+Agents running inside the MCP process (the CEO dispatch workers, scheduler
+jobs) use InProcessTransport and talk to Redis and the database directly.
+Remote workers that can reach Redis use RedisTransport, and anything else
+falls back to HttpTransport, which goes through the MCP REST API over a
+pooled keep-alive session.
+"""
+
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional
+
+import requests
+
+from app import agent_bus
+from app.core.config import settings
+from app.services import long_term_memory
+
+
+class AgentTransport(ABC):
+    """Interface between an agent and the MCP services it depends on."""
+
+    @abstractmethod
+    def send_message(self, sender_id: str, recipient_id: str, message: str):
+        pass
+
+    @abstractmethod
+    def receive_message(self, agent_id: str):
+        pass
+
+    @abstractmethod
+    def update_task_status(self, task_id: str, status: str, agent_id: str):
+        pass
+
+    @abstractmethod
+    def save_to_short_term_memory(self, agent_id: str, key: str, value: Any):
+        pass
+
+    @abstractmethod
+    def retrieve_from_short_term_memory(self, agent_id: str):
+        pass
+
+    @abstractmethod
+    def save_to_long_term_memory(
+        self, agent_id: str, document: str, metadata: Dict[str, Any]
+    ):
+        pass
+
+    @abstractmethod
+    def retrieve_from_long_term_memory(
+        self, agent_id: str, query_text: str, n_results: int = 3
+    ):
+        pass
+
+
+class HttpTransport(AgentTransport):
+    """Talks to the MCP REST API, reusing one pooled session per transport."""
+
+    def __init__(
+        self,
+        base_url: str = settings.MCP_API_URL,
+        token: Optional[str] = settings.MCP_AGENT_TOKEN,
+        timeout: float = 10.0,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=16)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        if token:
+            self.session.headers["Authorization"] = f"Bearer {token}"
+
+    def _request(self, method: str, path: str, error: str, **kwargs):
+        try:
+            response = self.session.request(
+                method, f"{self.base_url}{path}", timeout=self.timeout, **kwargs
+            )
+            response.raise_for_status()
+            return response.json()
+        except requests.exceptions.RequestException as e:
+            return {"error": f"{error}: {e}"}
+
+    def send_message(self, sender_id: str, recipient_id: str, message: str):
+        return self._request(
+            "POST",
+            "/api/v1/messages/send",
+            "Failed to send message",
+            json={
+                "sender_id": sender_id,
+                "recipient_id": recipient_id,
+                "message": message,
+            },
+        )
+
+    def receive_message(self, agent_id: str):
+        data = self._request(
+            "GET", f"/api/v1/messages/receive/{agent_id}", "Failed to receive message"
+        )
+        if "error" in data:
+            return data
+        return data.get("message")
+
+    def update_task_status(self, task_id: str, status: str, agent_id: str):
+        data = self._request(
+            "PUT",
+            f"/api/v1/tasks/{task_id}",
+            "Failed to update task status",
+            json={"status": status, "agent_id": agent_id},
+        )
+        if "error" in data:
+            print(f"Error updating task status: {data['error']}")
+        return data
+
+    def save_to_short_term_memory(self, agent_id: str, key: str, value: Any):
+        return self._request(
+            "POST",
+            "/api/v1/memory/short_term/add",
+            "Failed to save to short-term memory",
+            json={"agent_id": agent_id, "key": key, "value": value},
+        )
+
+    def retrieve_from_short_term_memory(self, agent_id: str):
+        return self._request(
+            "GET",
+            f"/api/v1/memory/short_term/{agent_id}",
+            "Failed to retrieve from short-term memory",
+        )
+
+    def save_to_long_term_memory(
+        self, agent_id: str, document: str, metadata: Dict[str, Any]
+    ):
+        return self._request(
+            "POST",
+            "/api/v1/memory/long_term/add",
+            "Failed to save to long-term memory",
+            json={"agent_id": agent_id, "document": document, "metadata": metadata},
+        )
+
+    def retrieve_from_long_term_memory(
+        self, agent_id: str, query_text: str, n_results: int = 3
+    ):
+        return self._request(
+            "POST",
+            "/api/v1/memory/long_term/query",
+            "Failed to retrieve from long-term memory",
+            json={"agent_id": agent_id, "query_text": query_text, "n_results": n_results},
+        )
+
+
+class RedisTransport(HttpTransport):
+    """
+    Reads and writes agent streams and memory straight in Redis.
+    Task updates still go through the MCP API.
+    """
+
+    def __init__(self, r=None, **kwargs):
+        super().__init__(**kwargs)
+        if r is None:
+            from app.redis_client import redis_client as r
+        self.r = r
+
+    def send_message(self, sender_id: str, recipient_id: str, message: str):
+        try:
+            agent_bus.publish(self.r, recipient_id, sender_id, message)
+            return {"message": f"Message queued for agent '{recipient_id}'."}
+        except Exception as e:
+            return {"error": f"Failed to send message: {e}"}
+
+    def receive_message(self, agent_id: str):
+        try:
+            return agent_bus.pop(self.r, agent_id, consumer=f"{agent_id}-inline")
+        except Exception as e:
+            return {"error": f"Failed to receive message: {e}"}
+
+    def save_to_short_term_memory(self, agent_id: str, key: str, value: Any):
+        try:
+            self.r.hset(f"short_term_memory:{agent_id}", key, value)
+            return {"message": "Data added to short-term memory."}
+        except Exception as e:
+            return {"error": f"Failed to save to short-term memory: {e}"}
+
+    def retrieve_from_short_term_memory(self, agent_id: str):
+        try:
+            memory = self.r.hgetall(f"short_term_memory:{agent_id}")
+        except Exception as e:
+            return {"error": f"Failed to retrieve from short-term memory: {e}"}
+        if not memory:
+            return {"error": "Agent not found in short-term memory."}
+        return {"memory": memory}
+
+    def save_to_long_term_memory(
+        self, agent_id: str, document: str, metadata: Dict[str, Any]
+    ):
+        try:
+            long_term_memory.add(self.r, agent_id, document, metadata)
+            return {"message": "Document added to long-term memory."}
+        except Exception as e:
+            return {"error": f"Failed to save to long-term memory: {e}"}
+
+    def retrieve_from_long_term_memory(
+        self, agent_id: str, query_text: str, n_results: int = 3
+    ):
+        try:
+            return {"results": long_term_memory.query(self.r, agent_id, query_text, n_results)}
+        except Exception as e:
+            return {"error": f"Failed to retrieve from long-term memory: {e}"}
+
+
+class InProcessTransport(RedisTransport):
+    """
+    For agents co-located with the MCP: task updates are written through the
+    database session directly instead of calling back into our own API.
+    """
+
+    def update_task_status(self, task_id: str, status: str, agent_id: str):
+        from app import crud
+        from app.database import SessionLocal
+
+        db = SessionLocal()
+        try:
+            task = crud.update_task_status(db, task_id, status, agent_id)
+            if task is None:
+                return {"error": f"Task {task_id} not found."}
+            return {"message": f"Task {task_id} status updated to {status}"}
+        except Exception as e:
+            db.rollback()
+            print(f"Error updating task status: {e}")
+            return {"error": f"Failed to update task status: {e}"}
+        finally:
+            db.close()
+
+
+TRANSPORTS = {
+    "http": HttpTransport,
+    "redis": RedisTransport,
+    "inprocess": InProcessTransport,
+}
+
+_default_transport: Optional[AgentTransport] = None
+
+
+def set_default_transport(transport: AgentTransport) -> None:
+    """Sets the transport used by agents that were not given one explicitly."""
+    global _default_transport
+    _default_transport = transport
+
+
+def get_default_transport() -> AgentTransport:
+    global _default_transport
+    if _default_transport is None:
+        transport_cls = TRANSPORTS.get(settings.AGENT_TRANSPORT.lower(), HttpTransport)
+        _default_transport = transport_cls()
+    return _default_transport
@@ -0,0 +1,139 @@
+"""
+Reprocesses recorded Stripe events from a time window.
+
+Usage:
+    python -m swarm.billing_replay --start 2026-01-01 --end 2026-01-02
+    python -m swarm.billing_replay --start 2026-01-01T10:00 --end 2026-01-01T12:00 --inline
+
+Events are read from stripe_transactions.raw_event in the order they were
+created and queued again on their customer's billing partition, so they
+are applied in the same per-customer order as live events. Replayed events
+reuse their existing audit row instead of being skipped as duplicates.
+Rows recorded before raw_event held the whole event only have the event's
+object; those events are fetched from Stripe again, which works for 30
+days. With --inline the events are processed here, one after another,
+instead of by the billing worker.
+"""
+
+import argparse
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy.orm import Session, undefer
+
+from app import db_models
+from app.database import SessionLocal
+from app.redis_client import redis_client
+from app.services.stripe_events import enqueue_event
+from swarm.tools.stripe_tool import StripeTool
+
+
+def recorded_events(
+    db: Session, start: datetime, end: datetime, batch_size: int = 500
+) -> Iterator[db_models.StripeTransaction]:
+    return (
+        db.query(db_models.StripeTransaction)
+        .filter(
+            db_models.StripeTransaction.created_at >= start,
+            db_models.StripeTransaction.created_at < end,
+        )
+        .options(undefer(db_models.StripeTransaction.raw_event))
+        .order_by(db_models.StripeTransaction.created_at, db_models.StripeTransaction.stripe_event_id)
+        .yield_per(batch_size)
+    )
+
+
+def event_from_row(
+    row: db_models.StripeTransaction, stripe_tool: Optional[StripeTool] = None
+) -> Optional[Dict[str, Any]]:
+    """The full event for a recorded row, fetched from Stripe for older rows."""
+    raw = row.raw_event
+    if isinstance(raw, dict) and raw.get("type") and isinstance(raw.get("data"), dict):
+        return raw
+    if stripe_tool is None:
+        return None
+    return stripe_tool.retrieve_event(row.stripe_event_id)
+
+
+def replay_window(
+    db: Session,
+    start: datetime,
+    end: datetime,
+    dry_run: bool = False,
+    inline: bool = False,
+    r=redis_client,
+    stripe_tool: Optional[StripeTool] = None,
+    agent: Any = None,
+) -> Dict[str, Any]:
+    """Replays the events recorded in [start, end); returns counts per outcome."""
+    summary: Dict[str, Any] = {"replayed": 0, "failed": 0, "unavailable": 0}
+    errors: List[Tuple[str, str]] = []
+    if inline and agent is None and not dry_run:
+        from swarm.departments.finance.billing_agent import BillingAgent
+
+        agent = BillingAgent()
+
+    for row in recorded_events(db, start, end):
+        try:
+            event = event_from_row(row, stripe_tool)
+        except Exception as e:
+            errors.append((row.stripe_event_id, str(e)))
+            summary["unavailable"] += 1
+            continue
+        if event is None:
+            summary["unavailable"] += 1
+            continue
+        if dry_run:
+            print(f"Would replay {event['id']} ({event['type']})")
+            summary["replayed"] += 1
+            continue
+
+        if inline:
+            result = agent.handle_webhook_event(event=event, dedupe_key=event["id"], replay=True)
+            if result.get("status") == "error":
+                errors.append((event["id"], result.get("message")))
+                summary["failed"] += 1
+                continue
+        else:
+            enqueue_event(r, event, "billing_replay", replay=True)
+        summary["replayed"] += 1
+
+    summary["errors"] = errors
+    return summary
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Replay recorded Stripe events.")
+    parser.add_argument(
+        "--start", required=True, type=datetime.fromisoformat, help="Window start (ISO 8601)."
+    )
+    parser.add_argument(
+        "--end", required=True, type=datetime.fromisoformat, help="Window end, exclusive."
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="List the events without replaying them."
+    )
+    parser.add_argument(
+        "--inline",
+        action="store_true",
+        help="Process the events here instead of queueing them for the billing worker.",
+    )
+    args = parser.parse_args(argv)
+    if args.end <= args.start:
+        parser.error("--end must be after --start")
+
+    db = SessionLocal()
+    try:
+        summary = replay_window(
+            db, args.start, args.end, dry_run=args.dry_run, inline=args.inline, stripe_tool=StripeTool()
+        )
+    finally:
+        db.close()
+
+    for event_id, error in summary.pop("errors"):
+        print(f"[WARNING] {event_id}: {error}")
+    print(f"Replay finished: {summary}")
+
+
+if __name__ == "__main__":
+    main()
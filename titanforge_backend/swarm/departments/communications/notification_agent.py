@@ -1,7 +1,13 @@
 from typing import Any, Dict, List, Optional
 
 from app.core.config import settings
+from app.database import agent_session
+from app.services import outreach_fanout
 from swarm.agents.base_agent import BaseAgent
+from swarm.departments.communications.notification_templates import (
+    NotificationTemplateError,
+    render_notification,
+)
 from swarm.tools.email_tool import EmailTool
 
 
@@ -31,7 +37,7 @@ class NotificationAgent(BaseAgent):
         :param body: Plain text body of the email.
         :param html_body: Optional HTML body.
         """
-        if not self.email_tool._configured:
+        if not self.email_tool.configured:
             return {"status": "error", "message": "Email service not configured."}
 
         success = self.email_tool.send_email(to_email, subject, body, html_body)
@@ -58,80 +64,62 @@ class NotificationAgent(BaseAgent):
         print(f"INTERNAL ALERT [{severity.upper()}]: {message}")
         return {"status": "success", "message": "Internal alert logged."}
 
+    def send_outreach_batch(
+        self, batch_id: str, recipients: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """
+        Sends alumni outreach to one fan-out chunk and records the outcome per lead.
+        :param batch_id: The outreach batch the chunk belongs to.
+        :param recipients: Dicts with lead_id, email, name and company.
+        """
+        emails = []
+        for recipient in recipients:
+            company = recipient.get("company")
+            rendered = render_notification(
+                "alumni_outreach",
+                {
+                    "email": recipient["email"],
+                    "name": recipient.get("name"),
+                    "audience": f"teams like {company}" if company else None,
+                },
+            )
+            emails.append(
+                {"to_email": rendered.to_email, "subject": rendered.subject, "body": rendered.body}
+            )
+        # One pooled SMTP session for the whole chunk
+        stats = self.email_tool.send_many(emails)
+        undelivered = {address for address, _ in stats.failures}
+        sent, failed = [], []
+        for recipient in recipients:
+            (failed if recipient["email"] in undelivered else sent).append(recipient["lead_id"])
+
+        with agent_session() as db:
+            try:
+                outreach_fanout.record_delivery(db, batch_id, sent, failed)
+            except Exception as e:
+                # The emails are out; redelivering the chunk would send them twice
+                db.rollback()
+                print(f"[WARNING] Could not record outreach delivery for batch {batch_id}: {e}")
+        return {"status": "success", "sent": len(sent), "failed": len(failed), **stats.as_dict()}
+
     def process_notification_request(
         self, notification_type: str, data: Dict[str, Any]
     ) -> Dict[str, Any]:
         """
         A general handler for various notification requests.
-        :param notification_type: Type of notification (e.g., "welcome", "payment_succeeded", "subscription_canceled").
+        :param notification_type: Type of notification (e.g., "welcome", "lead_welcome", "payment_succeeded", "subscription_canceled").
         :param data: Dictionary containing context for the notification (e.g., user_email, amount).
         """
-        if notification_type == "welcome":
-            user_email = data.get("user_email")
-            if user_email:
-                subject = "Welcome to TitanForge!"
-                body = f"Hello {data.get('user_name', '')},\n\nWelcome to TitanForge! We're excited to have you on board.\n\nRegards,\nYour TitanForge Team"
-                html_body = f"""
-                <html>
-                    <body>
-                        <p>Hello {data.get('user_name', 'there')},</p>
-                        <p>Welcome to <strong>TitanForge</strong>! We're excited to have you on board.</p>
-                        <p>You can get started by logging into your dashboard <a href="{settings.FRONTEND_URL}/dashboard">here</a>.</p>
-                        <p>Regards,<br>Your TitanForge Team</p>
-                    </body>
-                </html>
-                """
-                return self.send_user_email(user_email, subject, body, html_body)
-            else:
-                return {
-                    "status": "error",
-                    "message": "Missing user_email for welcome notification.",
-                }
-
-        elif notification_type == "payment_succeeded":
-            user_email = data.get("user_email")
-            amount = data.get("amount")
-            currency = data.get("currency")
-            if user_email and amount and currency:
-                subject = "Your TitanForge Payment Was Successful!"
-                body = f"Hello,\n\nYour payment of {amount} {currency} to TitanForge was successful. Thank you for your business!\n\nRegards,\nYour TitanForge Team"
-                html_body = f"""
-                <html>
-                    <body>
-                        <p>Hello,</p>
-                        <p>Your payment of <strong>{amount} {currency}</strong> to TitanForge was successful. Thank you for your business!</p>
-                        <p>You can view your subscription details in your dashboard.</p>
-                        <p>Regards,<br>Your TitanForge Team</p>
-                    </body>
-                </html>
-                """
-                return self.send_user_email(user_email, subject, body, html_body)
-            else:
-                return {
-                    "status": "error",
-                    "message": "Missing payment details for success notification.",
-                }
-
-        elif notification_type == "subscription_canceled":
-            user_email = data.get("user_email")
-            if user_email:
-                subject = "Your TitanForge Subscription Has Been Canceled"
-                body = "Hello,\n\nYour subscription to TitanForge has been canceled as per your request.\nWe're sorry to see you go! You can resubscribe anytime.\n\nRegards,\nYour TitanForge Team"
-                return self.send_user_email(user_email, subject, body)
-            else:
-                return {
-                    "status": "error",
-                    "message": "Missing user_email for cancellation notification.",
-                }
-
-        elif notification_type == "internal_error":
+        if notification_type == "internal_error":
             error_message = data.get("error_message", "An unknown error occurred.")
             return self.send_internal_alert(
                 f"Application Error: {error_message}", severity="error"
             )
 
-        else:
-            return {
-                "status": "error",
-                "message": f"Unknown notification type: {notification_type}",
-            }
+        try:
+            rendered = render_notification(notification_type, data)
+        except NotificationTemplateError as e:
+            return {"status": "error", "message": str(e)}
+        return self.send_user_email(
+            rendered.to_email, rendered.subject, rendered.body, rendered.html_body
+        )
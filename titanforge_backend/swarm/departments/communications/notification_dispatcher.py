@@ -0,0 +1,203 @@
+"""
+Concurrent consumer for the notification queue.
+
+The worker runs this in place of the generic QueueConsumer for
+notification_agent. It keeps up to NOTIFICATION_CONCURRENCY messages in
+flight on an asyncio loop. Sends run in threads, so the pooled SMTP
+transport overlaps them, and a burst of welcome mails is no longer
+delivered one at a time.
+
+A failed delivery is retried with exponential backoff and jitter, and the
+message stays unacknowledged until it has an outcome. After
+NOTIFICATION_MAX_ATTEMPTS attempts, or for a notification that can never
+be rendered, it is moved to the dead-letter stream. Delivered, failed and
+retried counts are kept per notification_type.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, Set
+
+import redis
+
+from app import agent_bus
+from app.core.config import settings
+from app.redis_client import redis_client
+from swarm.departments.communications.notification_templates import (
+    NotificationTemplateError,
+    render_notification,
+)
+from swarm.worker import QueueMetrics, handle_message
+
+
+class DispatchStats:
+    """Thread-safe delivered/failed/retried counters per notification type."""
+
+    def __init__(self):
+        self._counts: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {"delivered": 0, "failed": 0, "retried": 0}
+        )
+        self._lock = threading.Lock()
+
+    def record(self, notification_type: str, outcome: str) -> None:
+        with self._lock:
+            self._counts[notification_type][outcome] += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {k: dict(v) for k, v in self._counts.items()}
+
+
+class NotificationDispatcher(threading.Thread):
+    """Drains the notification stream with bounded concurrency on an asyncio loop."""
+
+    def __init__(
+        self,
+        agent: Any,
+        index: int,
+        metrics: QueueMetrics,
+        stop_event: threading.Event,
+        r: redis.Redis = redis_client,
+        block_timeout: int = 1,
+        reclaim_interval: float = 30.0,
+        concurrency: int = settings.NOTIFICATION_CONCURRENCY,
+        max_attempts: int = settings.NOTIFICATION_MAX_ATTEMPTS,
+        backoff_seconds: float = settings.NOTIFICATION_BACKOFF_SECONDS,
+    ):
+        agent_id = agent.agent_id
+        super().__init__(name=f"{agent_id}-{index}", daemon=True)
+        self.agent = agent
+        self.agent_id = agent_id
+        self.metrics = metrics
+        self.stop_event = stop_event
+        self.r = r
+        self.block_timeout = block_timeout
+        self.reclaim_interval = reclaim_interval
+        self.concurrency = max(1, concurrency)
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_seconds = backoff_seconds
+        self.consumer_name = agent_bus.consumer_name(index)
+        self.stats = DispatchStats()
+        # Bounds sends; reclaimed entries can push the task count past concurrency
+        self._sends = asyncio.Semaphore(self.concurrency)
+
+    def run(self) -> None:
+        asyncio.run(self._main())
+
+    async def _main(self) -> None:
+        agent_bus.ensure_group(self.r, self.agent_id)
+        in_flight: Set[asyncio.Task] = set()
+        # Own pending entries from before a restart come first
+        last_id = "0"
+        last_reclaim = 0.0
+
+        while not self.stop_event.is_set():
+            free = self.concurrency - len(in_flight)
+            if free <= 0:
+                await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                continue
+            try:
+                if last_id == ">" and time.monotonic() - last_reclaim >= self.reclaim_interval:
+                    last_reclaim = time.monotonic()
+                    messages = await asyncio.to_thread(
+                        agent_bus.reclaim, self.r, self.agent_id, self.consumer_name, count=free
+                    )
+                else:
+                    messages = []
+                if not messages:
+                    messages = await asyncio.to_thread(
+                        agent_bus.read,
+                        self.r,
+                        self.agent_id,
+                        self.consumer_name,
+                        count=free,
+                        block_ms=self.block_timeout * 1000 if last_id == ">" else None,
+                        last_id=last_id,
+                    )
+                    if last_id != ">":
+                        last_id = messages[-1][0] if messages else ">"
+            except redis.RedisError as e:
+                print(f"[{self.name}] Redis error while waiting for messages: {e}")
+                await asyncio.sleep(self.block_timeout)
+                continue
+
+            for entry_id, envelope in messages:
+                task = asyncio.create_task(self._process(entry_id, envelope))
+                in_flight.add(task)
+                task.add_done_callback(in_flight.discard)
+
+        if in_flight:
+            await asyncio.gather(*in_flight)
+
+    async def _process(self, entry_id: str, envelope: Dict[str, Any]) -> None:
+        started = time.monotonic()
+        ok = True
+        try:
+            content = envelope.get("message")
+            if isinstance(content, dict) and content.get("action") == "process_notification_request":
+                await self._dispatch(
+                    entry_id,
+                    envelope,
+                    content.get("notification_type"),
+                    content.get("data") or {},
+                )
+            else:
+                # Outreach batches and free-text tasks keep their own handling
+                async with self._sends:
+                    await asyncio.to_thread(handle_message, self.agent, envelope)
+                agent_bus.ack(self.r, self.agent_id, entry_id)
+        except Exception as e:
+            # Left pending: reclaimed later and dead-lettered after AGENT_MAX_DELIVERIES
+            ok = False
+            print(f"[{self.name}] Failed to process message {entry_id}: {e}")
+        finally:
+            self.metrics.record(time.monotonic() - started, ok)
+
+    async def _dispatch(
+        self, entry_id: str, envelope: Dict[str, Any], notification_type: str, data: Dict[str, Any]
+    ) -> None:
+        if notification_type == "internal_error":
+            self.agent.process_notification_request(notification_type, data)
+            self.stats.record(notification_type, "delivered")
+            agent_bus.ack(self.r, self.agent_id, entry_id)
+            return
+
+        try:
+            rendered = render_notification(notification_type, data)
+        except NotificationTemplateError as e:
+            # Retrying cannot fix a bad request
+            self.stats.record(str(notification_type), "failed")
+            agent_bus.dead_letter(self.r, self.agent_id, entry_id, envelope, str(e))
+            return
+
+        email_tool = self.agent.email_tool
+        for attempt in range(1, self.max_attempts + 1):
+            async with self._sends:
+                delivered = await asyncio.to_thread(
+                    email_tool.send_email,
+                    rendered.to_email,
+                    rendered.subject,
+                    rendered.body,
+                    rendered.html_body,
+                )
+            if delivered:
+                self.stats.record(notification_type, "delivered")
+                agent_bus.ack(self.r, self.agent_id, entry_id)
+                return
+            if not email_tool.configured or attempt == self.max_attempts:
+                break
+            self.stats.record(notification_type, "retried")
+            delay = self.backoff_seconds * 2 ** (attempt - 1)
+            await asyncio.sleep(delay * (1 + random.random() / 2))
+
+        self.stats.record(notification_type, "failed")
+        agent_bus.dead_letter(
+            self.r,
+            self.agent_id,
+            entry_id,
+            envelope,
+            f"delivery failed after {attempt} attempt(s)",
+        )
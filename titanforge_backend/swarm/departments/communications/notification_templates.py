@@ -0,0 +1,150 @@
+"""
+Email templates for user-facing notifications.
+
+Each notification_type maps to one template source. A source is parsed into
+string.Template objects the first time its type is rendered, and the
+compiled template is cached for the life of the process. Values
+interpolated into the HTML part are escaped.
+"""
+
+import html
+import string
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config import settings
+
+
+class NotificationTemplateError(ValueError):
+    """The notification type is unknown or its data is missing required fields."""
+
+
+@dataclass(frozen=True)
+class RenderedNotification:
+    to_email: str
+    subject: str
+    body: str
+    html_body: Optional[str] = None
+
+
+# notification_type -> recipient field, required fields, defaults, subject, body, html
+TEMPLATE_SOURCES: Dict[str, Dict[str, Any]] = {
+    "welcome": {
+        "recipient": "user_email",
+        "required": ("user_email",),
+        "defaults": {"user_name": "there"},
+        "subject": "Welcome to TitanForge!",
+        "body": "Hello $user_name,\n\nWelcome to TitanForge! We're excited to have you on board.\n\nRegards,\nYour TitanForge Team",
+        "html": """
+                <html>
+                    <body>
+                        <p>Hello $user_name,</p>
+                        <p>Welcome to <strong>TitanForge</strong>! We're excited to have you on board.</p>
+                        <p>You can get started by logging into your dashboard <a href="$frontend_url/dashboard">here</a>.</p>
+                        <p>Regards,<br>Your TitanForge Team</p>
+                    </body>
+                </html>
+                """,
+    },
+    "lead_welcome": {
+        "recipient": "lead_email",
+        "required": ("lead_email",),
+        "defaults": {"lead_name": "there"},
+        "subject": "Thanks for your interest in TitanForge",
+        "body": "Hello $lead_name,\n\nThanks for reaching out to TitanForge. A member of our team will be in touch shortly.\n\nRegards,\nYour TitanForge Team",
+        "html": """
+                <html>
+                    <body>
+                        <p>Hello $lead_name,</p>
+                        <p>Thanks for reaching out to <strong>TitanForge</strong>. A member of our team will be in touch shortly.</p>
+                        <p>In the meantime, see what TitanForge can do <a href="$frontend_url">here</a>.</p>
+                        <p>Regards,<br>Your TitanForge Team</p>
+                    </body>
+                </html>
+                """,
+    },
+    "payment_succeeded": {
+        "recipient": "user_email",
+        "required": ("user_email", "amount", "currency"),
+        "defaults": {},
+        "subject": "Your TitanForge Payment Was Successful!",
+        "body": "Hello,\n\nYour payment of $amount $currency to TitanForge was successful. Thank you for your business!\n\nRegards,\nYour TitanForge Team",
+        "html": """
+                <html>
+                    <body>
+                        <p>Hello,</p>
+                        <p>Your payment of <strong>$amount $currency</strong> to TitanForge was successful. Thank you for your business!</p>
+                        <p>You can view your subscription details in your dashboard.</p>
+                        <p>Regards,<br>Your TitanForge Team</p>
+                    </body>
+                </html>
+                """,
+    },
+    "subscription_canceled": {
+        "recipient": "user_email",
+        "required": ("user_email",),
+        "defaults": {},
+        "subject": "Your TitanForge Subscription Has Been Canceled",
+        "body": "Hello,\n\nYour subscription to TitanForge has been canceled as per your request.\nWe're sorry to see you go! You can resubscribe anytime.\n\nRegards,\nYour TitanForge Team",
+        "html": None,
+    },
+    # Bulk outreach to imported alumni leads (see app/services/outreach_fanout.py)
+    "alumni_outreach": {
+        "recipient": "email",
+        "required": ("email",),
+        "defaults": {"name": "there", "audience": "teams"},
+        "subject": "Reconnecting with fellow DeVry alumni at TitanForge",
+        "body": "Hello $name,\n\nAs a fellow DeVry alum, we'd love to show you how TitanForge automates the busywork for $audience.\n\nRegards,\nYour TitanForge Team",
+        "html": None,
+    },
+}
+
+
+@dataclass(frozen=True)
+class CompiledTemplate:
+    notification_type: str
+    recipient: str
+    required: Tuple[str, ...]
+    defaults: Dict[str, Any]
+    subject: string.Template
+    body: string.Template
+    html: Optional[string.Template]
+
+    def render(self, data: Dict[str, Any]) -> RenderedNotification:
+        missing = [name for name in self.required if not data.get(name)]
+        if missing:
+            raise NotificationTemplateError(
+                f"Missing {', '.join(missing)} for {self.notification_type} notification."
+            )
+        values = {"frontend_url": settings.FRONTEND_URL, **self.defaults}
+        values.update({k: v for k, v in data.items() if v not in (None, "")})
+        return RenderedNotification(
+            to_email=values[self.recipient],
+            subject=self.subject.safe_substitute(values),
+            body=self.body.safe_substitute(values),
+            html_body=self.html.safe_substitute(
+                {k: html.escape(str(v)) for k, v in values.items()}
+            ) if self.html else None,
+        )
+
+
+@lru_cache(maxsize=None)
+def get_template(notification_type: str) -> CompiledTemplate:
+    """Compiles a notification type's template once and caches it."""
+    source = TEMPLATE_SOURCES.get(notification_type)
+    if source is None:
+        raise NotificationTemplateError(f"Unknown notification type: {notification_type}")
+    return CompiledTemplate(
+        notification_type=notification_type,
+        recipient=source["recipient"],
+        required=tuple(source["required"]),
+        defaults=dict(source["defaults"]),
+        subject=string.Template(source["subject"]),
+        body=string.Template(source["body"]),
+        html=string.Template(source["html"]) if source["html"] else None,
+    )
+
+
+def render_notification(notification_type: str, data: Dict[str, Any]) -> RenderedNotification:
+    return get_template(notification_type).render(data)
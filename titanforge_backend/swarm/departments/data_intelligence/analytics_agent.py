@@ -2,9 +2,10 @@ from datetime import datetime, timedelta
 from typing import Any, Dict, Optional
 import re
 
-from app import db_models
 from app.core.config import settings
-from app.database import get_db_session_from_agent
+from app.database import agent_session
+from app.services import metrics_rollup
+from app.services.event_sink import EventBufferFull, event_sink
 from swarm.agents.base_agent import BaseAgent
 from swarm.tools.data_analyzer import DataAnalyzer  # Keep existing tool
 
@@ -30,89 +31,96 @@ class AnalyticsAgent(BaseAgent):
         self, event_type: str, user_id: str = None, payload: Dict[str, Any] = None
     ) -> Dict[str, Any]:
         """
-        Records a specific event into the events table.
+        Records a specific event into the events table. Events sent over the
+        analytics queue are written by AnalyticsEventConsumer instead; direct
+        calls are buffered and written in batches by the shared event sink.
         :param event_type: Type of the event (e.g., "user_signup", "subscription_created").
         :param user_id: Optional UUID of the user associated with the event.
         :param payload: Optional dictionary with additional event-specific data.
         """
-        db = next(get_db_session_from_agent())
         try:
-            event = db_models.Event(
-                event_type=event_type,
-                user_id=user_id,
-                payload=payload,
-                timestamp=datetime.utcnow(),
-            )
-            db.add(event)
-            db.commit()
-            return {"status": "success", "message": f"Event '{event_type}' recorded."}
+            event_sink.submit(event_type, user_id=user_id, payload=payload)
+        except EventBufferFull:
+            # Let backpressure reach the caller
+            raise
         except Exception as e:
-            db.rollback()
             return {
                 "status": "error",
                 "message": f"Failed to record event '{event_type}': {e}",
             }
-        finally:
-            db.close()
+        return {"status": "success", "message": f"Event '{event_type}' recorded."}
 
     def aggregate_daily_metrics(
-        self, date: Optional[datetime] = None
+        self, date: Optional[datetime | str] = None
     ) -> Dict[str, Any]:
         """
-        Aggregates key metrics for a given day (defaults to yesterday) from the events table.
-        This is a simplified example and would be much more complex in a real scenario.
+        Recomputes the daily_metrics rollup for a given day (defaults to yesterday).
+        :param date: The day to aggregate, as a datetime or a "YYYY-MM-DD" string
+                     (the scheduler sends the latter over the agent queue).
         """
         if date is None:
             date = datetime.utcnow() - timedelta(days=1)  # Aggregate for yesterday
-
-        start_of_day = datetime(date.year, date.month, date.day)
-        end_of_day = start_of_day + timedelta(days=1)
-
-        db = next(get_db_session_from_agent())
+        elif isinstance(date, str):
+            date = datetime.strptime(date, "%Y-%m-%d")
+        day = date.date() if isinstance(date, datetime) else date
+
+        with agent_session() as db:
+            try:
+                rows = metrics_rollup.rollup_day(db, day)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                return {
+                    "status": "error",
+                    "message": f"Failed to aggregate daily metrics: {e}",
+                }
+        metrics = {"date": day.isoformat(), "events": {}, "snapshots": {}}
+        for row in rows:
+            if row.event_type.startswith("snapshot:"):
+                metrics["snapshots"][row.event_type.split(":", 1)[1]] = {
+                    "count": row.count,
+                    "amount": row.amount,
+                }
+            else:
+                events = metrics["events"]
+                events[row.event_type] = events.get(row.event_type, 0) + row.count
+        metrics["new_signups"] = metrics["events"].get("user_signup", 0)
+        print(f"Daily Metrics for {day}: {metrics}")
+        return {"status": "success", "metrics": metrics}
+
+    def refresh_daily_metrics(self) -> Dict[str, Any]:
+        """Brings the daily_metrics rollup up to date from its watermark."""
+        with agent_session() as db:
+            try:
+                result = metrics_rollup.refresh(db)
+                return {"status": "success", **result}
+            except Exception as e:
+                db.rollback()
+                return {
+                    "status": "error",
+                    "message": f"Failed to refresh daily metrics: {e}",
+                }
+
+    def backfill_daily_metrics(self, start_date: str, end_date: str) -> Dict[str, Any]:
+        """
+        Recomputes the rollup for every day between two "YYYY-MM-DD" dates, inclusive.
+        """
         try:
-            # Example: Count new signups
-            new_signups = (
-                db.query(db_models.Event)
-                .filter(
-                    db_models.Event.event_type == "user_signup",
-                    db_models.Event.timestamp >= start_of_day,
-                    db_models.Event.timestamp < end_of_day,
-                )
-                .count()
-            )
-
-            # Example: Count new active subscriptions
-            new_active_subscriptions = (
-                db.query(db_models.Subscription)
-                .filter(
-                    db_models.Subscription.status == "active",
-                    db_models.Subscription.created_at >= start_of_day,
-                    db_models.Subscription.created_at < end_of_day,
-                )
-                .count()
-            )
-
-            # This is where more complex metrics like MRR estimation would be calculated
-            # For simplicity, we'll just return basic counts
-            metrics = {
-                "date": start_of_day.isoformat(),
-                "new_signups": new_signups,
-                "new_active_subscriptions": new_active_subscriptions,
-                # ... more metrics
-            }
-
-            # Optionally, store these aggregated metrics in a dedicated table for dashboards
-            # For now, just print/return
-            print(f"Daily Metrics for {start_of_day.date()}: {metrics}")
-            return {"status": "success", "metrics": metrics}
-        except Exception as e:
-            db.rollback()
-            return {
-                "status": "error",
-                "message": f"Failed to aggregate daily metrics: {e}",
-            }
-        finally:
-            db.close()
+            start = datetime.strptime(start_date, "%Y-%m-%d").date()
+            end = datetime.strptime(end_date, "%Y-%m-%d").date()
+        except ValueError:
+            return {"status": "error", "message": "Invalid date format. Use YYYY-MM-DD."}
+
+        with agent_session() as db:
+            try:
+                days = metrics_rollup.backfill(db, start, end)
+                return {"status": "success", "days": days}
+            except Exception as e:
+                db.rollback()
+                return {
+                    "status": "error",
+                    "message": f"Failed to backfill daily metrics: {e}",
+                }
 
     def execute_task(self, task_description: str) -> str:
         # Original execute_task logic can be adapted or replaced
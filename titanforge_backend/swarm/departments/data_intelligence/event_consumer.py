@@ -0,0 +1,87 @@
+"""
+Batched consumer for the analytics queue.
+
+The worker runs this in place of the generic QueueConsumer for
+analytics_agent. The record_event messages in each batch read from the
+stream are written with one multi-row INSERT (event_sink.write), and their
+entries are acknowledged only after that INSERT has committed, so an
+acknowledged event is always in the database. If the database cannot be
+reached, the entries stay pending and are redelivered once reclaimed.
+Events the database rejects, or that cannot be turned into a row at all,
+are moved to the dead-letter stream with the error. Other actions are
+handled one message at a time, as by QueueConsumer.
+"""
+
+import time
+from typing import Any, Dict, List, Tuple
+
+import redis
+from sqlalchemy.exc import OperationalError
+
+from app import agent_bus
+from app.core.config import settings
+from app.services.event_sink import EventSink, event_row, event_sink
+from swarm.worker import QueueConsumer
+
+# (entry id, envelope, events table row)
+QueuedEvent = Tuple[str, Dict[str, Any], Dict[str, Any]]
+
+
+class AnalyticsEventConsumer(QueueConsumer):
+    """Writes each batch of queued events in one INSERT before acknowledging it."""
+
+    def __init__(
+        self,
+        *args: Any,
+        sink: EventSink = event_sink,
+        batch_size: int = settings.EVENT_SINK_BATCH_SIZE,
+        **kwargs: Any,
+    ):
+        super().__init__(*args, batch_size=batch_size, **kwargs)
+        self.sink = sink
+
+    def _process_batch(self, messages: List[agent_bus.BusMessage]) -> None:
+        events: List[QueuedEvent] = []
+        for entry_id, envelope in messages:
+            content = envelope.get("message")
+            if not (isinstance(content, dict) and content.get("action") == "record_event"):
+                self._process(entry_id, envelope)
+                continue
+            params = {k: v for k, v in content.items() if k != "action"}
+            try:
+                events.append((entry_id, envelope, event_row(**params)))
+            except (TypeError, ValueError) as e:
+                self._settle([], [(entry_id, envelope, f"invalid event: {e}")])
+                self.metrics.record(0.0, False)
+        if events:
+            self._write(events)
+
+    def _write(self, events: List[QueuedEvent]) -> None:
+        started = time.monotonic()
+        try:
+            rejected = dict(self.sink.write([row for _, _, row in events]))
+        except OperationalError as e:
+            print(f"[{self.name}] Could not write {len(events)} event(s), leaving them pending: {e}")
+            rejected = None
+        per_event = (time.monotonic() - started) / len(events)
+        for index in range(len(events)):
+            self.metrics.record(per_event, rejected is not None and index not in rejected)
+        if rejected is None:
+            return
+        self._settle(
+            [entry_id for index, (entry_id, _, _) in enumerate(events) if index not in rejected],
+            [
+                (events[index][0], events[index][1], f"event rejected: {error}")
+                for index, error in rejected.items()
+            ],
+        )
+
+    def _settle(self, written: List[str], failed: List[Tuple[str, Dict[str, Any], str]]) -> None:
+        """Acknowledges written entries and dead-letters failed ones."""
+        try:
+            agent_bus.ack(self.r, self.agent_id, *written)
+            for entry_id, envelope, reason in failed:
+                agent_bus.dead_letter(self.r, self.agent_id, entry_id, envelope, reason)
+        except redis.RedisError as e:
+            # Still pending, so redelivered; the events may be written twice
+            print(f"[{self.name}] Could not acknowledge {len(written) + len(failed)} event(s): {e}")
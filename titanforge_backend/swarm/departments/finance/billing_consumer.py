@@ -0,0 +1,245 @@
+"""
+Ordered consumer for the billing partitions.
+
+The webhook queues each Stripe event on one of BILLING_PARTITIONS streams
+by customer id (see app/services/stripe_events.py). The worker runs this
+consumer for billing_manager in place of the generic QueueConsumer. To
+keep each customer's events in order, a partition is handled by one
+consumer at a time: the consumer takes a Redis lease on it and processes
+its entries strictly one after another. A failing entry is retried in
+place, with backoff, and holds up the rest of that partition only. After
+AGENT_MAX_DELIVERIES attempts it is moved to the dead-letter stream.
+Other partitions keep going meanwhile.
+
+Leases expire after BILLING_LEASE_SECONDS unless renewed, so the
+partitions of a crashed worker are picked up by the others. Consumers
+announce themselves in a heartbeat set, and each holds a fair share of
+the partitions (all of them while it is alone), handing back any surplus
+when others join. Renewing and releasing a lease check the holder and act
+in one Lua script, so a lease taken over in between is never touched. Every holder
+reads under the same consumer name, so a new holder first finishes the
+entries its predecessor left unacknowledged. The pre-partitioning
+billing_manager stream is drained as well, until it is empty.
+"""
+
+import math
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+import redis
+
+from app import agent_bus
+from app.core.config import settings
+from app.redis_client import redis_client
+from app.services.stripe_events import BILLING_AGENT_ID, partition_agent_id
+from swarm.worker import QueueMetrics, handle_message
+
+LEASE_KEY = "billing_partition_lease:{partition}"
+# Sorted set of consumer token -> heartbeat expiry (unix time)
+CONSUMERS_KEY = "billing_partition_consumers"
+# Shared by all lease holders so pending entries outlive the holder
+PARTITION_CONSUMER = "owner"
+
+# KEYS[1] lease key, ARGV[1] holder token, ARGV[2] lease ms
+RENEW_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+# KEYS[1] lease key, ARGV[1] holder token
+RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class BillingPartitionConsumer(threading.Thread):
+    """Processes leased billing partitions, each strictly in stream order."""
+
+    def __init__(
+        self,
+        agent: Any,
+        index: int,
+        metrics: QueueMetrics,
+        stop_event: threading.Event,
+        r: redis.Redis = redis_client,
+        block_timeout: int = 1,
+        batch_size: int = 10,
+        partitions: int = settings.BILLING_PARTITIONS,
+        lease_seconds: int = settings.BILLING_LEASE_SECONDS,
+        max_attempts: int = settings.AGENT_MAX_DELIVERIES,
+        backoff_seconds: float = 1.0,
+    ):
+        super().__init__(name=f"{agent.agent_id}-{index}", daemon=True)
+        self.agent = agent
+        self.agent_id = agent.agent_id
+        self.metrics = metrics
+        self.stop_event = stop_event
+        self.r = r
+        self.block_timeout = block_timeout
+        self.batch_size = batch_size
+        self.partitions = partitions
+        self.lease_ms = lease_seconds * 1000
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_seconds = backoff_seconds
+        self.consumer_name = agent_bus.consumer_name(index)
+        self.token = f"{self.consumer_name}-{uuid.uuid4()}"
+        self._renew_script = r.register_script(RENEW_SCRIPT)
+        self._release_script = r.register_script(RELEASE_SCRIPT)
+        # partition -> last_id for the next read ("0" until pending entries are done)
+        self.leases: Dict[int, str] = {}
+        self._last_refresh = 0.0
+        self._legacy_done = False
+
+    def run(self) -> None:
+        agent_bus.ensure_group(self.r, BILLING_AGENT_ID)
+        try:
+            while not self.stop_event.is_set():
+                try:
+                    if time.monotonic() - self._last_refresh >= self.lease_ms / 3000:
+                        self._refresh_leases()
+                    handled = sum(self._drain(p) for p in list(self.leases))
+                    if not self._legacy_done:
+                        handled += self._drain_legacy()
+                except redis.RedisError as e:
+                    print(f"[{self.name}] Redis error while waiting for messages: {e}")
+                    handled = 0
+                if not handled:
+                    self.stop_event.wait(self.block_timeout)
+        finally:
+            self._release_all()
+
+    # Leases
+
+    def _refresh_leases(self) -> None:
+        """Renews held leases, then takes or hands back partitions to hold a fair share."""
+        self._last_refresh = time.monotonic()
+        for partition in list(self.leases):
+            if not self._renew(partition):
+                print(f"[{self.name}] Lost lease on billing partition {partition}")
+                del self.leases[partition]
+
+        share = self._fair_share()
+        # Idle partitions first, so work in progress stays where it is
+        for partition in sorted(self.leases, key=lambda p: self.leases[p] != ">"):
+            if len(self.leases) <= share:
+                break
+            self._release(partition)
+
+        start = hash(self.token) % self.partitions
+        for offset in range(self.partitions):
+            if len(self.leases) >= share:
+                return
+            partition = (start + offset) % self.partitions
+            if partition in self.leases:
+                continue
+            if self.r.set(
+                LEASE_KEY.format(partition=partition), self.token, nx=True, px=self.lease_ms
+            ):
+                agent_bus.ensure_group(self.r, partition_agent_id(partition))
+                self.leases[partition] = "0"
+
+    def _fair_share(self) -> int:
+        """Heartbeats this consumer; returns the partitions it may hold."""
+        now = time.time()
+        pipe = self.r.pipeline()
+        pipe.zadd(CONSUMERS_KEY, {self.token: now + self.lease_ms / 1000})
+        pipe.zremrangebyscore(CONSUMERS_KEY, "-inf", now)
+        pipe.zcard(CONSUMERS_KEY)
+        live = max(1, int(pipe.execute()[-1]))
+        return math.ceil(self.partitions / live)
+
+    def _renew(self, partition: int) -> bool:
+        key = LEASE_KEY.format(partition=partition)
+        return bool(self._renew_script(keys=[key], args=[self.token, self.lease_ms]))
+
+    def _release(self, partition: int) -> None:
+        """Hands a partition back; the next holder resumes its pending entries."""
+        del self.leases[partition]
+        self._release_script(keys=[LEASE_KEY.format(partition=partition)], args=[self.token])
+
+    def _release_all(self) -> None:
+        try:
+            for partition in list(self.leases):
+                self._release(partition)
+            self.r.zrem(CONSUMERS_KEY, self.token)
+        except redis.RedisError:
+            pass  # Leases and the heartbeat expire on their own
+        self.leases.clear()
+
+    # Processing
+
+    def _drain(self, partition: int) -> int:
+        """Handles one batch of a partition in order; returns the number handled."""
+        agent_id = partition_agent_id(partition)
+        last_id = self.leases[partition]
+        messages = agent_bus.read(
+            self.r, agent_id, PARTITION_CONSUMER, count=self.batch_size, last_id=last_id
+        )
+        if last_id != ">" and not messages:
+            self.leases[partition] = ">"
+        for entry_id, envelope in messages:
+            # A lease lost mid-batch: the new holder resumes the rest in order
+            if not self._still_leased(partition):
+                return 0
+            if not self._process(agent_id, entry_id, envelope, partition):
+                # Still pending; nothing behind it may run first
+                if partition in self.leases:
+                    self.leases[partition] = "0"
+                return 0
+            if last_id != ">" and partition in self.leases:
+                self.leases[partition] = entry_id
+        return len(messages)
+
+    def _drain_legacy(self) -> int:
+        messages = agent_bus.read(
+            self.r, BILLING_AGENT_ID, self.consumer_name, count=self.batch_size
+        )
+        if not messages:
+            self._legacy_done = True
+        for entry_id, envelope in messages:
+            self._process(BILLING_AGENT_ID, entry_id, envelope)
+        return len(messages)
+
+    def _still_leased(self, partition: int) -> bool:
+        if time.monotonic() - self._last_refresh < self.lease_ms / 3000:
+            return partition in self.leases
+        self._refresh_leases()
+        return partition in self.leases
+
+    def _process(
+        self, agent_id: str, entry_id: str, envelope: Dict[str, Any], partition: Optional[int] = None
+    ) -> bool:
+        """Handles an entry with retries; False if it was left pending."""
+        error = None
+        for attempt in range(1, self.max_attempts + 1):
+            started = time.monotonic()
+            try:
+                result = handle_message(self.agent, envelope)
+                if isinstance(result, dict) and result.get("status") == "error":
+                    raise RuntimeError(result.get("message"))
+                self.metrics.record(time.monotonic() - started, True)
+                agent_bus.ack(self.r, agent_id, entry_id)
+                return True
+            except Exception as e:
+                error = e
+                self.metrics.record(time.monotonic() - started, False)
+                print(f"[{self.name}] Attempt {attempt} failed for message {entry_id}: {e}")
+            if attempt == self.max_attempts or self.stop_event.is_set():
+                break
+            if partition is not None and not self._still_leased(partition):
+                return False  # The new holder retries it
+            self.stop_event.wait(self.backoff_seconds * 2 ** (attempt - 1))
+
+        if self.stop_event.is_set() and attempt < self.max_attempts:
+            return False  # Left pending for whoever holds the partition next
+        agent_bus.dead_letter(
+            self.r, agent_id, entry_id, envelope, f"failed after {attempt} attempt(s): {error}"
+        )
+        return True
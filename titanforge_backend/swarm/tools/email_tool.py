@@ -1,20 +1,33 @@
-import smtplib
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
-from typing import List, Optional
+from typing import Any, Dict, Iterable, List, Optional
 
 from app.core.config import settings
+from swarm.tools.smtp_pool import BatchStats, SMTPConnectionPool, get_smtp_pool
 
 
 class EmailTool:
-    def __init__(self):
+    def __init__(
+        self,
+        pool: Optional[SMTPConnectionPool] = None,
+        sender_email: Optional[str] = None,
+    ):
+        """
+        :param pool: SMTP pool to send through. Defaults to the shared pool for
+            the configured SMTP server, so all EmailTools reuse its sessions.
+        :param sender_email: From address; defaults to the SMTP user.
+        """
         self.smtp_server = settings.SMTP_HOST
         self.smtp_port = settings.SMTP_PORT
         self.smtp_user = settings.SMTP_USER
         self.smtp_password = settings.SMTP_PASSWORD
-        self.sender_email = settings.SMTP_USER  # Sender is usually the SMTP user
+        self.sender_email = sender_email or settings.SMTP_USER  # Sender is usually the SMTP user
+        self.pool = pool
 
-        if not all(
+        if pool is not None:
+            self.sender_email = sender_email or pool.username
+            self._configured = True
+        elif not all(
             [self.smtp_server, self.smtp_port, self.smtp_user, self.smtp_password]
         ):
             print(
@@ -23,8 +36,33 @@ class EmailTool:
             # Depending on strictness, might raise an error or just disable functionality
             self._configured = False
         else:
+            self.pool = get_smtp_pool(
+                self.smtp_server, self.smtp_port, self.smtp_user, self.smtp_password
+            )
             self._configured = True
 
+    @property
+    def configured(self) -> bool:
+        """Whether SMTP settings or a pool were given, so sends can be attempted."""
+        return self._configured
+
+    def build_message(
+        self,
+        to_email: str | List[str],
+        subject: str,
+        body: str,
+        html_body: Optional[str] = None,
+    ) -> MIMEMultipart:
+        msg = MIMEMultipart("alternative") if html_body else MIMEMultipart()
+        msg["From"] = self.sender_email
+        msg["To"] = ", ".join(to_email) if isinstance(to_email, list) else to_email
+        msg["Subject"] = subject
+
+        msg.attach(MIMEText(body, "plain"))
+        if html_body:
+            msg.attach(MIMEText(html_body, "html"))
+        return msg
+
     def send_email(
         self,
         to_email: str | List[str],
@@ -44,25 +82,45 @@ class EmailTool:
             print("EmailTool is not configured. Cannot send email.")
             return False
 
-        msg = MIMEMultipart("alternative") if html_body else MIMEMultipart()
-        msg["From"] = self.sender_email
-        msg["To"] = ", ".join(to_email) if isinstance(to_email, list) else to_email
-        msg["Subject"] = subject
-
-        msg.attach(MIMEText(body, "plain"))
-        if html_body:
-            msg.attach(MIMEText(html_body, "html"))
-
         try:
-            with smtplib.SMTP_SSL(self.smtp_server, self.smtp_port) as server:
-                server.login(self.smtp_user, self.smtp_password)
-                server.sendmail(self.sender_email, to_email, msg.as_string())
+            self.pool.send(self.build_message(to_email, subject, body, html_body))
             print(f"Email sent successfully to {to_email}")
             return True
         except Exception as e:
             print(f"Failed to send email to {to_email}: {e}")
             return False
 
+    def send_many(self, emails: Iterable[Dict[str, Any]]) -> BatchStats:
+        """
+        Sends a batch of emails over one pooled SMTP session.
+        :param emails: Dicts with to_email, subject, body and optional html_body.
+        :return: Sent/failed counts and throughput for the batch.
+        """
+        emails = list(emails)
+        if not self._configured:
+            print("EmailTool is not configured. Cannot send emails.")
+            return BatchStats(
+                failed=len(emails),
+                failures=[(str(e.get("to_email")), "EmailTool is not configured") for e in emails],
+            )
+
+        try:
+            stats = self.pool.send_many(
+                self.build_message(
+                    email["to_email"], email["subject"], email["body"], email.get("html_body")
+                )
+                for email in emails
+            )
+        except Exception as e:
+            # The server could not be reached at all
+            print(f"Failed to send email batch: {e}")
+            return BatchStats(
+                failed=len(emails),
+                failures=[(str(email.get("to_email")), str(e)) for email in emails],
+            )
+        print(f"Email batch finished: {stats.as_dict()}")
+        return stats
+
 
 # Example usage (for testing purposes, not part of the tool itself)
 if __name__ == "__main__":
@@ -74,7 +132,7 @@ if __name__ == "__main__":
     # os.environ["SMTP_PASSWORD"] = "your_app_password" # Use app password for Gmail
 
     email_tool = EmailTool()
-    if email_tool._configured:
+    if email_tool.configured:
         email_tool.send_email(
             to_email="test@example.com",  # Replace with a real email for testing
             subject="Test Email from TitanForge",
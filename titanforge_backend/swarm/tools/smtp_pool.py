@@ -0,0 +1,302 @@
+"""
+Pooled SMTP transport.
+
+Authenticated SMTP sessions are kept open and reused, so a campaign does one
+TLS handshake and one LOGIN per pooled connection rather than per message.
+When the server advertises PIPELINING (RFC 2920), MAIL FROM, every RCPT TO
+and DATA go out in a single write and their replies are read back together.
+A session that the server dropped is replaced transparently, and the
+message that hit the dead session is retried once on the new one.
+"""
+
+import queue
+import re
+import smtplib
+import ssl
+import threading
+import time
+from dataclasses import dataclass, field
+from email.message import Message
+from email.policy import SMTP as SMTP_POLICY
+from email.utils import getaddresses
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.core.config import settings
+
+# Errors meaning the session itself is gone, as opposed to the server refusing a message
+CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError, ssl.SSLError)
+
+_LONE_NEWLINE = re.compile(rb"(?:\r\n|\n|\r(?!\n))")
+_LEADING_PERIOD = re.compile(rb"(?m)^\.")
+
+
+def _dot_stuff(data: bytes) -> bytes:
+    """Normalises line endings and escapes leading periods for the DATA phase."""
+    data = _LEADING_PERIOD.sub(b"..", _LONE_NEWLINE.sub(b"\r\n", data))
+    if not data.endswith(b"\r\n"):
+        data += b"\r\n"
+    return data + b".\r\n"
+
+
+@dataclass
+class BatchStats:
+    """Outcome and throughput of one send_many call."""
+
+    sent: int = 0
+    failed: int = 0
+    refused: int = 0  # Recipients refused from messages that were sent to the others
+    reconnects: int = 0
+    pipelined: bool = False
+    elapsed: float = 0.0
+    failures: List[Tuple[str, str]] = field(default_factory=list)  # (recipients, error)
+
+    @property
+    def messages_per_second(self) -> float:
+        return self.sent / self.elapsed if self.elapsed > 0 else 0.0
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            "sent": self.sent,
+            "failed": self.failed,
+            "refused": self.refused,
+            "reconnects": self.reconnects,
+            "pipelined": self.pipelined,
+            "elapsed": round(self.elapsed, 3),
+            "messages_per_second": round(self.messages_per_second, 1),
+        }
+
+
+class _PooledConnection:
+    def __init__(self, smtp: smtplib.SMTP):
+        self.smtp = smtp
+        self.messages = 0
+        self.last_used = time.monotonic()
+
+
+class SMTPConnectionPool:
+    """A bounded pool of logged-in SMTP sessions shared by every EmailTool."""
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        security: str = settings.SMTP_SECURITY,
+        size: int = settings.SMTP_POOL_SIZE,
+        timeout: float = settings.SMTP_TIMEOUT,
+        idle_timeout: float = settings.SMTP_IDLE_TIMEOUT,
+        max_messages_per_connection: int = settings.SMTP_MAX_MESSAGES_PER_CONNECTION,
+    ):
+        """
+        :param security: "ssl" (implicit TLS), "starttls" or "none".
+        :param idle_timeout: Sessions idle for longer are checked with NOOP before reuse.
+        :param max_messages_per_connection: Sessions are recycled after this many messages.
+        """
+        if security not in ("ssl", "starttls", "none"):
+            raise ValueError(f"Unknown SMTP security mode: {security}")
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.security = security
+        self.size = max(1, size)
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.max_messages_per_connection = max(1, max_messages_per_connection)
+        self._idle: "queue.LifoQueue[_PooledConnection]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.size)
+        self.connections_opened = 0
+
+    def _connect(self) -> _PooledConnection:
+        if self.security == "ssl":
+            smtp = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout)
+        else:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            smtp.ehlo()
+            if self.security == "starttls":
+                smtp.starttls()
+                smtp.ehlo()
+            if self.username and self.password:
+                smtp.login(self.username, self.password)
+        except Exception:
+            self._discard(smtp)
+            raise
+        self.connections_opened += 1
+        return _PooledConnection(smtp)
+
+    @staticmethod
+    def _discard(smtp: smtplib.SMTP) -> None:
+        try:
+            smtp.quit()
+        except Exception:
+            smtp.close()
+
+    def _acquire(self) -> _PooledConnection:
+        self._slots.acquire()
+        try:
+            while True:
+                try:
+                    conn = self._idle.get_nowait()
+                except queue.Empty:
+                    return self._connect()
+                if time.monotonic() - conn.last_used < self.idle_timeout:
+                    return conn
+                try:
+                    if conn.smtp.noop()[0] == 250:
+                        return conn
+                except Exception:
+                    pass
+                self._discard(conn.smtp)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _release(self, conn: Optional[_PooledConnection], healthy: bool) -> None:
+        try:
+            if conn is None:
+                return
+            if healthy and conn.messages < self.max_messages_per_connection:
+                conn.last_used = time.monotonic()
+                self._idle.put(conn)
+            else:
+                self._discard(conn.smtp)
+        finally:
+            self._slots.release()
+
+    def _deliver(
+        self, conn: _PooledConnection, sender: str, recipients: List[str], data: bytes
+    ) -> Tuple[bool, Dict[str, Tuple[int, bytes]]]:
+        """
+        Sends one message on the session. Returns whether RCPT/DATA were
+        pipelined, and the recipients the server refused as smtplib's
+        sendmail does; refusing every recipient raises instead.
+        """
+        smtp = conn.smtp
+        if smtp.has_extn("pipelining"):
+            refused = self._deliver_pipelined(smtp, sender, recipients, data)
+            pipelined = True
+        else:
+            refused = smtp.sendmail(sender, recipients, data)
+            pipelined = False
+        conn.messages += 1
+        return pipelined, refused
+
+    @staticmethod
+    def _deliver_pipelined(
+        smtp: smtplib.SMTP, sender: str, recipients: List[str], data: bytes
+    ) -> Dict[str, Tuple[int, bytes]]:
+        commands = [f"MAIL FROM:<{sender}>"] + [f"RCPT TO:<{r}>" for r in recipients] + ["DATA"]
+        smtp.send("".join(f"{command}\r\n" for command in commands))
+        mail_reply = smtp.getreply()
+        rcpt_replies = [smtp.getreply() for _ in recipients]
+        data_reply = smtp.getreply()
+
+        refused = {
+            r: reply for r, reply in zip(recipients, rcpt_replies) if reply[0] not in (250, 251)
+        }
+        if mail_reply[0] != 250 or len(refused) == len(recipients):
+            if data_reply[0] == 354:
+                # The server is already waiting for a body; end it empty
+                smtp.send(b".\r\n")
+                smtp.getreply()
+            smtp.rset()
+            if mail_reply[0] != 250:
+                raise smtplib.SMTPSenderRefused(mail_reply[0], mail_reply[1], sender)
+            raise smtplib.SMTPRecipientsRefused(refused)
+        if data_reply[0] != 354:
+            smtp.rset()
+            raise smtplib.SMTPDataError(*data_reply)
+
+        smtp.send(_dot_stuff(data))
+        code, response = smtp.getreply()
+        if code != 250:
+            raise smtplib.SMTPDataError(code, response)
+        return refused
+
+    @staticmethod
+    def _envelope(message: Message) -> Tuple[str, List[str], bytes]:
+        sender = getaddresses([message["From"] or ""])[0][1]
+        recipients = [
+            address
+            for _, address in getaddresses(message.get_all("To", []) + message.get_all("Cc", []))
+            if address
+        ]
+        return sender, recipients, message.as_bytes(policy=SMTP_POLICY)
+
+    def send_many(self, messages: Iterable[Message]) -> BatchStats:
+        """
+        Sends messages over one pooled session, reconnecting if the server
+        drops it. A message refused by the server is counted as failed and
+        the batch carries on. Recipients refused from a message that went to
+        the others are counted as refused; each one is listed in failures.
+        """
+        stats = BatchStats()
+        started = time.perf_counter()
+        conn = self._acquire()
+        try:
+            for message in messages:
+                sender, recipients, data = self._envelope(message)
+                for attempt in range(2):
+                    try:
+                        if conn is None:
+                            conn = self._connect()
+                            stats.reconnects += 1
+                        pipelined, refused = self._deliver(conn, sender, recipients, data)
+                        stats.pipelined = pipelined or stats.pipelined
+                        stats.sent += 1
+                        stats.refused += len(refused)
+                        stats.failures.extend(
+                            (recipient, f"{code} {reply.decode(errors='replace')}")
+                            for recipient, (code, reply) in refused.items()
+                        )
+                        break
+                    except CONNECTION_ERRORS as e:
+                        if conn is not None:
+                            self._discard(conn.smtp)
+                            conn = None
+                        if attempt == 1:
+                            stats.failed += 1
+                            stats.failures.append((", ".join(recipients), str(e)))
+                    except smtplib.SMTPException as e:
+                        stats.failed += 1
+                        stats.failures.append((", ".join(recipients), str(e)))
+                        break
+                if conn is not None and conn.messages >= self.max_messages_per_connection:
+                    self._discard(conn.smtp)
+                    conn = None
+        finally:
+            self._release(conn, healthy=conn is not None)
+            stats.elapsed = time.perf_counter() - started
+        return stats
+
+    def send(self, message: Message) -> None:
+        """Sends a single message; raises if it could not be delivered."""
+        stats = self.send_many([message])
+        if stats.failed:
+            raise smtplib.SMTPException(stats.failures[0][1])
+
+    def close(self) -> None:
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._discard(conn.smtp)
+
+
+_pools: Dict[Tuple, SMTPConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_smtp_pool(
+    host: str, port: int, username: Optional[str], password: Optional[str]
+) -> SMTPConnectionPool:
+    """Returns the process-wide pool for these credentials."""
+    key = (host, port, username)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = SMTPConnectionPool(host, port, username, password)
+        return pool
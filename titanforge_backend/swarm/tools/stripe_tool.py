@@ -66,6 +66,15 @@ class StripeTool:
             print(f"Error canceling Stripe Subscription: {e}")
             raise
 
+    def retrieve_event(self, event_id: str) -> Dict[str, Any]:
+        """Retrieves a Stripe Event; Stripe keeps events for 30 days."""
+        try:
+            event = stripe.Event.retrieve(event_id)
+            return event.to_dict()
+        except stripe.error.StripeError as e:
+            print(f"Error retrieving Stripe Event: {e}")
+            raise
+
     def construct_webhook_event(self, payload: bytes, sig_header: str) -> stripe.Event:
         """Constructs a Stripe Event from a webhook payload."""
         try:
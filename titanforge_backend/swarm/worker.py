@@ -0,0 +1,365 @@
+"""
+Long-running consumers for agent queues.
+
+Usage:
+    python -m swarm.worker --agents analytics_agent,notification_agent
+    python -m swarm.worker --agents analytics_agent:4,billing_manager --concurrency 2
+
+Each agent stream gets a configurable number of consumer threads, all
+members of the agent's consumer group (see app/agent_bus.py), so replicas
+of the same agent on other hosts share the work. Consumers block on
+XREADGROUP and handle messages as soon as they arrive. Entries are
+acknowledged only after they have been handled. A restarted consumer first
+finishes its own pending entries. Consumer names come from AGENT_WORKER_ID
+(the host name by default), which must differ between worker processes on
+one host. Entries stranded by a dead consumer are reclaimed after
+AGENT_RECLAIM_IDLE_MS. Entries that keep failing end up in the agent's
+dead-letter stream. Queues listed in CONSUMER_CLASSES use a specialised
+consumer instead, e.g. the batched analytics event writer, the concurrent
+notification dispatcher or the ordered billing partition consumer.
+"""
+
+import argparse
+import importlib
+import json
+import signal
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import redis
+
+from app import agent_bus
+from app.core.config import settings
+from app.redis_client import redis_client
+from app.services import pool_monitor, user_principals
+from app.services.dashboard_metrics import register_invalidation_hooks
+from app.services.event_sink import event_sink
+from swarm.agents.transport import InProcessTransport, set_default_transport
+
+# agent_id -> "module:Class" of the agent that owns that queue
+AGENT_CLASSES: Dict[str, str] = {
+    "analytics_agent": "swarm.departments.data_intelligence.analytics_agent:AnalyticsAgent",
+    "notification_agent": "swarm.departments.communications.notification_agent:NotificationAgent",
+    "billing_manager": "swarm.departments.finance.billing_agent:BillingAgent",
+    "provisioning_agent": "swarm.departments.operations.provisioning_agent:ProvisioningAgent",
+}
+
+# agent_id -> "module:Class" of a specialised consumer; others use QueueConsumer
+CONSUMER_CLASSES: Dict[str, str] = {
+    "analytics_agent": "swarm.departments.data_intelligence.event_consumer:AnalyticsEventConsumer",
+    "notification_agent": "swarm.departments.communications.notification_dispatcher:NotificationDispatcher",
+    "billing_manager": "swarm.departments.finance.billing_consumer:BillingPartitionConsumer",
+}
+
+METRICS_KEY = "agent_worker_metrics:{agent_id}"
+TYPE_METRICS_KEY = "agent_worker_metrics:{agent_id}:by_type"
+
+
+def load_agent(agent_id: str):
+    """Imports and instantiates the agent class registered for a queue."""
+    try:
+        module_name, class_name = AGENT_CLASSES[agent_id].split(":")
+    except KeyError:
+        raise ValueError(
+            f"No worker registered for agent '{agent_id}'. "
+            f"Known agents: {', '.join(sorted(AGENT_CLASSES))}"
+        )
+    agent_cls = getattr(importlib.import_module(module_name), class_name)
+    return agent_cls()
+
+
+def load_consumer_class(agent_id: str):
+    """The consumer thread class for a queue."""
+    if agent_id not in CONSUMER_CLASSES:
+        return QueueConsumer
+    module_name, class_name = CONSUMER_CLASSES[agent_id].split(":")
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def handle_message(agent: Any, envelope: Dict[str, Any]) -> Any:
+    """
+    Routes a queued message to the agent.
+
+    Structured messages ({"action": ..., **params}) call the agent method of
+    that name; plain text messages go through execute_task.
+    """
+    content = envelope.get("message")
+    if isinstance(content, dict) and content.get("action"):
+        params = {k: v for k, v in content.items() if k != "action"}
+        handler = getattr(agent, content["action"], None)
+        if not callable(handler):
+            raise ValueError(
+                f"Agent '{agent.agent_id}' has no action '{content['action']}'"
+            )
+        return handler(**params)
+    if not isinstance(content, str):
+        content = json.dumps(content)
+    return agent.execute_task(content)
+
+
+class QueueMetrics:
+    """Thread-safe throughput counters for one agent queue."""
+
+    def __init__(self, agent_id: str):
+        self.agent_id = agent_id
+        self.processed = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self._reported = 0
+        self._last_report = time.monotonic()
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float, ok: bool) -> None:
+        with self._lock:
+            self.processed += 1
+            self.busy_seconds += seconds
+            if not ok:
+                self.failed += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Totals plus the message rate since the previous snapshot."""
+        with self._lock:
+            now = time.monotonic()
+            elapsed = max(now - self._last_report, 1e-9)
+            rate = (self.processed - self._reported) / elapsed
+            self._reported = self.processed
+            self._last_report = now
+            return {
+                "processed": self.processed,
+                "failed": self.failed,
+                "msgs_per_sec": round(rate, 2),
+                "avg_ms": round(
+                    self.busy_seconds / self.processed * 1000, 2
+                ) if self.processed else 0.0,
+            }
+
+
+class QueueConsumer(threading.Thread):
+    """Drains one agent stream as a member of the agent's consumer group."""
+
+    def __init__(
+        self,
+        agent: Any,
+        index: int,
+        metrics: QueueMetrics,
+        stop_event: threading.Event,
+        r: redis.Redis = redis_client,
+        block_timeout: int = 1,
+        batch_size: int = 10,
+        reclaim_interval: float = 30.0,
+    ):
+        agent_id = agent.agent_id
+        super().__init__(name=f"{agent_id}-{index}", daemon=True)
+        self.agent = agent
+        self.agent_id = agent_id
+        self.metrics = metrics
+        self.stop_event = stop_event
+        self.r = r
+        self.block_timeout = block_timeout
+        self.batch_size = batch_size
+        self.reclaim_interval = reclaim_interval
+        # Stable per worker id and slot, so a restarted consumer resumes its own pending entries
+        self.consumer_name = agent_bus.consumer_name(index)
+
+    def run(self) -> None:
+        agent_bus.ensure_group(self.r, self.agent_id)
+        self._resume_pending()
+        last_reclaim = 0.0
+        while not self.stop_event.is_set():
+            try:
+                if time.monotonic() - last_reclaim >= self.reclaim_interval:
+                    last_reclaim = time.monotonic()
+                    self._process_batch(
+                        agent_bus.reclaim(self.r, self.agent_id, self.consumer_name)
+                    )
+
+                messages = agent_bus.read(
+                    self.r,
+                    self.agent_id,
+                    self.consumer_name,
+                    count=self.batch_size,
+                    block_ms=self.block_timeout * 1000,
+                )
+            except redis.RedisError as e:
+                print(f"[{self.name}] Redis error while waiting for messages: {e}")
+                self.stop_event.wait(self.block_timeout)
+                continue
+            self._process_batch(messages)
+
+    def _process_batch(self, messages: List[agent_bus.BusMessage]) -> None:
+        for entry_id, envelope in messages:
+            self._process(entry_id, envelope)
+
+    def _process(self, entry_id: str, envelope: Dict[str, Any]) -> None:
+        started = time.monotonic()
+        ok = True
+        try:
+            handle_message(self.agent, envelope)
+            agent_bus.ack(self.r, self.agent_id, entry_id)
+        except Exception as e:
+            # Left pending: it is retried once reclaimed and dead-lettered
+            # after AGENT_MAX_DELIVERIES attempts.
+            ok = False
+            print(f"[{self.name}] Failed to process message {entry_id}: {e}")
+        finally:
+            self.metrics.record(time.monotonic() - started, ok)
+
+    def _resume_pending(self) -> None:
+        """Processes entries this consumer had read but not acknowledged before a restart."""
+        last_id = "0"
+        while not self.stop_event.is_set():
+            messages = agent_bus.read(
+                self.r,
+                self.agent_id,
+                self.consumer_name,
+                count=self.batch_size,
+                last_id=last_id,
+            )
+            if not messages:
+                return
+            self._process_batch(messages)
+            last_id = messages[-1][0]
+
+
+class AgentWorker:
+    """Runs consumers for a set of agent queues until asked to stop."""
+
+    def __init__(
+        self,
+        concurrency: Dict[str, int],
+        r: redis.Redis = redis_client,
+        report_interval: float = 30.0,
+    ):
+        self.concurrency = concurrency
+        self.r = r
+        self.report_interval = report_interval
+        self.stop_event = threading.Event()
+        self.metrics = {agent_id: QueueMetrics(agent_id) for agent_id in concurrency}
+        self.consumers: List[threading.Thread] = []
+
+    def start(self) -> None:
+        consumers = sum(self.concurrency.values())
+        if consumers >= settings.REDIS_MAX_CONNECTIONS:
+            # Each consumer holds a pooled connection while blocked on its stream
+            print(
+                f"[WARNING] {consumers} consumers share a pool of "
+                f"REDIS_MAX_CONNECTIONS={settings.REDIS_MAX_CONNECTIONS}; raise it."
+            )
+        for agent_id, count in self.concurrency.items():
+            consumer_cls = load_consumer_class(agent_id)
+            for i in range(count):
+                # One agent instance per consumer; agents are not thread-safe
+                consumer = consumer_cls(
+                    load_agent(agent_id), i, self.metrics[agent_id], self.stop_event, r=self.r
+                )
+                consumer.start()
+                self.consumers.append(consumer)
+            print(f"Worker consuming '{agent_id}' with {count} consumer(s).")
+
+    def stop(self) -> None:
+        self.stop_event.set()
+
+    def run_forever(self) -> None:
+        self.start()
+        try:
+            while not self.stop_event.wait(self.report_interval):
+                self.report()
+        finally:
+            for consumer in self.consumers:
+                consumer.join()
+            event_sink.stop()
+            self.report()
+            print("Worker stopped.")
+
+    def report(self) -> None:
+        for agent_id, metrics in self.metrics.items():
+            snapshot = metrics.snapshot()
+            print(f"[worker] {agent_id}: {snapshot}")
+            try:
+                self.r.hset(METRICS_KEY.format(agent_id=agent_id), mapping=snapshot)
+            except redis.RedisError as e:
+                print(f"[worker] Could not publish metrics for {agent_id}: {e}")
+
+        # Per notification_type outcomes from consumers that track them
+        by_type: Dict[str, Dict[str, Dict[str, int]]] = {}
+        for consumer in self.consumers:
+            stats = getattr(consumer, "stats", None)
+            if stats is None:
+                continue
+            totals = by_type.setdefault(consumer.agent_id, {})
+            for kind, counts in stats.snapshot().items():
+                merged = totals.setdefault(kind, {})
+                for outcome, count in counts.items():
+                    merged[outcome] = merged.get(outcome, 0) + count
+        for agent_id, totals in by_type.items():
+            if not totals:
+                continue
+            print(f"[worker] {agent_id} by type: {totals}")
+            try:
+                self.r.hset(
+                    TYPE_METRICS_KEY.format(agent_id=agent_id),
+                    mapping={kind: json.dumps(counts) for kind, counts in totals.items()},
+                )
+            except redis.RedisError as e:
+                print(f"[worker] Could not publish metrics for {agent_id}: {e}")
+
+        # Agents share this process's database pools; leaked sessions show up here
+        for name, stats in pool_monitor.snapshot().items():
+            print(f"[worker] db pool {name}: {stats}")
+
+
+def parse_agents(spec: str, default_concurrency: int) -> Dict[str, int]:
+    """Parses "a,b:4" into {"a": default_concurrency, "b": 4}."""
+    concurrency: Dict[str, int] = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        agent_id, _, count = item.partition(":")
+        if agent_id not in AGENT_CLASSES:
+            raise ValueError(f"No worker registered for agent '{agent_id}'.")
+        concurrency[agent_id] = int(count) if count else default_concurrency
+    if not concurrency:
+        raise ValueError("At least one agent must be given with --agents.")
+    return concurrency
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Run TitanForge agent queue consumers.")
+    parser.add_argument(
+        "--agents",
+        required=True,
+        help="Comma separated agent ids, optionally with per-agent concurrency (agent:N).",
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=1, help="Default consumers per agent queue."
+    )
+    parser.add_argument(
+        "--report-interval",
+        type=float,
+        default=30.0,
+        help="Seconds between throughput reports.",
+    )
+    args = parser.parse_args(argv)
+
+    # Workers have Redis and database access, so agents skip the MCP API
+    set_default_transport(InProcessTransport())
+    # Billing and provisioning writes must drop the cached dashboard numbers
+    # and cached user principals
+    register_invalidation_hooks()
+    user_principals.register_invalidation_hooks()
+
+    worker = AgentWorker(
+        parse_agents(args.agents, args.concurrency),
+        report_interval=args.report_interval,
+    )
+
+    def shutdown(signum, frame):
+        print(f"Received signal {signum}, finishing in-flight messages...")
+        worker.stop()
+
+    signal.signal(signal.SIGINT, shutdown)
+    signal.signal(signal.SIGTERM, shutdown)
+    worker.run_forever()
+
+
+if __name__ == "__main__":
+    main()
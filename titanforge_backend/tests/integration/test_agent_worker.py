@@ -0,0 +1,121 @@
+"""Tests for the agent queue worker runtime."""
+
+import threading
+
+import pytest
+import redis
+
+from app import agent_bus
+from swarm.worker import QueueConsumer, QueueMetrics, handle_message, parse_agents
+
+from tests.conftest import FakeRedis
+
+
+class FakeAgent:
+    agent_id = "analytics_agent"
+
+    def __init__(self):
+        self.calls = []
+
+    def record_event(self, event_type, user_id=None, payload=None):
+        self.calls.append(("record_event", event_type, user_id, payload))
+        return {"status": "success"}
+
+    def execute_task(self, task_description):
+        self.calls.append(("execute_task", task_description))
+        return "done"
+
+
+class GroupRedis(FakeRedis):
+    """FakeRedis with just enough of XREADGROUP to tell whether the group exists."""
+
+    def __init__(self):
+        super().__init__()
+        self.groups = set()
+        self.commands = []
+
+    def xgroup_create(self, name, groupname, id="$", mkstream=False):
+        self.commands.append("XGROUP CREATE")
+        if (name, groupname) in self.groups:
+            raise redis.ResponseError("BUSYGROUP Consumer Group name already exists")
+        self.groups.add((name, groupname))
+
+    def xreadgroup(self, groupname, consumername, streams, count=None, block=None):
+        self.commands.append("XREADGROUP")
+        (name,) = streams
+        if (name, groupname) not in self.groups:
+            raise redis.ResponseError("NOGROUP No such key or consumer group")
+        return []
+
+
+class TestAgentWorker:
+    """Test message routing and worker configuration."""
+
+    def test_structured_message_calls_action(self):
+        agent = FakeAgent()
+        handle_message(
+            agent,
+            {
+                "sender_id": "mcp",
+                "message": {
+                    "action": "record_event",
+                    "event_type": "user_signup",
+                    "user_id": "u1",
+                    "payload": {"email": "a@example.com"},
+                },
+            },
+        )
+        assert agent.calls == [
+            ("record_event", "user_signup", "u1", {"email": "a@example.com"})
+        ]
+
+    def test_text_message_goes_to_execute_task(self):
+        agent = FakeAgent()
+        assert handle_message(agent, {"sender_id": "ceo", "message": "analyze data"}) == "done"
+        assert agent.calls == [("execute_task", "analyze data")]
+
+    def test_unknown_action_raises(self):
+        with pytest.raises(ValueError):
+            handle_message(FakeAgent(), {"message": {"action": "launch_rockets"}})
+
+    def test_parse_agents_with_concurrency(self):
+        assert parse_agents("analytics_agent:4, notification_agent", 2) == {
+            "analytics_agent": 4,
+            "notification_agent": 2,
+        }
+
+    def test_parse_agents_rejects_unknown_agent(self):
+        with pytest.raises(ValueError):
+            parse_agents("ceo", 1)
+
+    def test_metrics_snapshot(self):
+        metrics = QueueMetrics("analytics_agent")
+        metrics.record(0.01, ok=True)
+        metrics.record(0.03, ok=False)
+        snapshot = metrics.snapshot()
+        assert snapshot["processed"] == 2
+        assert snapshot["failed"] == 1
+        assert snapshot["avg_ms"] == pytest.approx(20.0)
+
+    def test_consumer_name_survives_a_restart(self, monkeypatch):
+        monkeypatch.setattr(agent_bus.settings, "AGENT_WORKER_ID", "worker-a")
+
+        def consumer():
+            return QueueConsumer(
+                FakeAgent(), 1, QueueMetrics("analytics_agent"), threading.Event(), r=FakeRedis()
+            )
+
+        assert consumer().consumer_name == consumer().consumer_name == "worker-a-1"
+        monkeypatch.setattr(agent_bus.settings, "AGENT_WORKER_ID", "worker-b")
+        assert consumer().consumer_name == "worker-b-1"
+
+    def test_pop_creates_the_group_only_when_missing(self):
+        r = GroupRedis()
+        assert agent_bus.pop(r, "analytics_agent") is None
+        assert agent_bus.pop(r, "analytics_agent") is None
+        assert r.commands == ["XREADGROUP", "XGROUP CREATE", "XREADGROUP", "XREADGROUP"]
+
+        # A flushed stream takes its group with it; the next poll recreates it
+        r.groups.clear()
+        assert agent_bus.pop(r, "analytics_agent") is None
+        assert r.commands[-3:] == ["XREADGROUP", "XGROUP CREATE", "XREADGROUP"]
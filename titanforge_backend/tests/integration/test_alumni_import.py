@@ -0,0 +1,84 @@
+"""Tests for the streaming alumni CSV importer."""
+
+import csv
+import io
+
+import pytest
+
+from app import db_models
+from app.services.alumni_importer import (
+    AlumniImporter,
+    ImportFormatError,
+    error_report_path,
+    iter_csv_rows,
+)
+
+
+def csv_upload(text):
+    return io.BytesIO(text.encode("utf-8"))
+
+
+class TestAlumniImporter:
+    """Test chunked import, deduplication and the error report."""
+
+    def test_import_in_chunks_with_error_report(self, db, test_user):
+        db.add(db_models.Lead(email="existing@example.com", name="Existing"))
+        db.commit()
+        upload = csv_upload(
+            "name,email,company,title\n"
+            "Ada,ada@example.com,Acme,CTO\n"
+            "Existing,existing@example.com,,\n"
+            ",nameless@example.com,,\n"
+            "Bad,not-an-email,,\n"
+            "Ada again,ada@example.com,,\n"
+            "Grace,grace@example.com,,\n"
+        )
+        progress = []
+        importer = AlumniImporter(
+            db,
+            user_id=test_user.id,
+            chunk_size=2,
+            on_progress=lambda result: progress.append(result.rows_processed),
+        )
+        result = importer.run(iter_csv_rows(upload))
+
+        assert result.rows_processed == 6
+        assert result.imported_count == 2
+        assert result.error_count == 2
+        assert result.skipped_count == 4
+        assert progress == [2, 4, 6]
+
+        with open(error_report_path(result.import_id), newline="") as report:
+            rows = list(csv.DictReader(report))
+        assert [row["row"] for row in rows] == ["4", "5"]
+
+        # New leads are staged for outreach; the import records one event
+        assert db.query(db_models.OutreachRecipient).count() == 2
+        batch = db.query(db_models.OutreachBatch).one()
+        assert (batch.status, batch.total) == ("ready", 2)
+        events = db.query(db_models.Event.event_type).all()
+        assert events == [("alumni_outreach_batch_created",)]
+
+    def test_missing_columns_rejected(self):
+        with pytest.raises(ImportFormatError):
+            list(iter_csv_rows(csv_upload("full_name,mail\nAda,ada@example.com\n")))
+
+    def test_resume_skips_committed_rows(self, db, test_user):
+        upload = (
+            "name,email\n"
+            "Ada,ada@example.com\n"
+            "Grace,grace@example.com\n"
+            "Linus,linus@example.com\n"
+        )
+        first = AlumniImporter(db, user_id=test_user.id, chunk_size=2)
+        rows = iter_csv_rows(csv_upload(upload))
+        # Simulate a crash after the first chunk committed
+        first._process_chunk([next(rows), next(rows)])
+        assert first.result.last_row == 3
+
+        resumed = AlumniImporter(db, user_id=test_user.id, resume_from=first.result)
+        result = resumed.run(iter_csv_rows(csv_upload(upload)))
+
+        assert result.rows_processed == 3
+        assert result.imported_count == 3
+        assert db.query(db_models.Lead).count() == 3
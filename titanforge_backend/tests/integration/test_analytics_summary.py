@@ -0,0 +1,75 @@
+"""Benchmark for GET /api/v1/analytics/summary as the subscription count grows."""
+
+from uuid import uuid4
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app import db_models
+from app.database import async_replica_engine
+from app.main import app
+
+client = TestClient(app)
+
+
+class StatementCounter:
+    """Counts SQL statements the read replica engine sends while active."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __enter__(self):
+        event.listen(async_replica_engine.sync_engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(async_replica_engine.sync_engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+
+def add_subscriptions(db, user, count):
+    monthly = db_models.Product(
+        name=f"Monthly {uuid4()}", type="subscription", unit_amount=9900, interval="month"
+    )
+    yearly = db_models.Product(
+        name=f"Yearly {uuid4()}", type="subscription", unit_amount=120000, interval="year"
+    )
+    db.add_all([monthly, yearly])
+    db.flush()
+    db.add_all(
+        db_models.Subscription(
+            user_id=user.id,
+            product_id=(monthly if i % 2 else yearly).id,
+            status="active",
+        )
+        for i in range(count)
+    )
+    db.commit()
+
+
+class TestAnalyticsSummaryBenchmark:
+    """The summary must not issue per-subscription queries."""
+
+    def measure(self, auth_headers):
+        with StatementCounter() as counter:
+            response = client.get("/api/v1/analytics/summary", headers=auth_headers)
+        assert response.status_code == 200
+        return response.json(), counter.count
+
+    def test_summary_stays_flat_as_subscriptions_grow(self, db, test_user, auth_headers):
+        test_user.is_superuser = True
+        db.commit()
+
+        add_subscriptions(db, test_user, 10)
+        small, small_statements = self.measure(auth_headers)
+
+        add_subscriptions(db, test_user, 2000)
+        large, large_statements = self.measure(auth_headers)
+
+        assert large["active_subscriptions"] - small["active_subscriptions"] == 2000
+        assert large_statements == small_statements
+        # 1000 monthly at $99 plus 1000 yearly at $1200/12
+        assert large["mrr_estimate_usd"] - small["mrr_estimate_usd"] == pytest.approx(199000.0)
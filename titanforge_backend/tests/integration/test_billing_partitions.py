@@ -0,0 +1,167 @@
+"""Tests for the ordered billing partition consumer and event replay."""
+
+import threading
+import time
+from types import SimpleNamespace
+
+from app.services.stripe_events import partition_agent_id
+from swarm import billing_replay
+from swarm.departments.finance import billing_consumer
+from swarm.departments.finance.billing_consumer import (
+    CONSUMERS_KEY,
+    LEASE_KEY,
+    BillingPartitionConsumer,
+)
+from swarm.worker import QueueMetrics
+
+from tests.conftest import FakeRedis
+
+
+class FakeBillingAgent:
+    agent_id = "billing_manager"
+
+    def __init__(self, failing=()):
+        self.failing = dict.fromkeys(failing, 1)
+        self.handled = []
+
+    def handle_webhook_event(self, event=None, dedupe_key=None, replay=False):
+        if self.failing.get(dedupe_key):
+            self.failing[dedupe_key] -= 1
+            return {"status": "error", "message": "database unavailable"}
+        self.handled.append(dedupe_key)
+        return {"status": "success"}
+
+
+def envelope(event_id):
+    return {
+        "sender_id": "stripe_webhook",
+        "message": {"action": "handle_webhook_event", "event": {"id": event_id}, "dedupe_key": event_id},
+    }
+
+
+def make_consumer(agent, r=None, **kwargs):
+    r = r or FakeRedis()
+    consumer = BillingPartitionConsumer(
+        agent, 0, QueueMetrics("billing_manager"), threading.Event(), r=r, partitions=4,
+        backoff_seconds=0, **kwargs
+    )
+    return consumer, r
+
+
+class TestBillingPartitionConsumer:
+    """Test leases and in-order processing of one partition."""
+
+    def test_sole_consumer_takes_every_partition(self):
+        consumer, r = make_consumer(FakeBillingAgent())
+        consumer._refresh_leases()
+
+        assert sorted(consumer.leases) == [0, 1, 2, 3]
+        assert all(r.get(LEASE_KEY.format(partition=p)) == consumer.token for p in consumer.leases)
+
+    def test_takes_a_fair_share_alongside_other_consumers(self):
+        consumer, r = make_consumer(FakeBillingAgent())
+        r.zadd(CONSUMERS_KEY, {"other": time.time() + 60})
+        consumer._refresh_leases()
+
+        assert len(consumer.leases) == 2
+
+    def test_hands_back_surplus_when_another_consumer_joins(self):
+        consumer, r = make_consumer(FakeBillingAgent())
+        consumer._refresh_leases()
+        other, _ = make_consumer(FakeBillingAgent(), r=r)
+        other._refresh_leases()
+        assert other.leases == {}
+
+        consumer._refresh_leases()
+        other._refresh_leases()
+        assert len(consumer.leases) == len(other.leases) == 2
+        assert not set(consumer.leases) & set(other.leases)
+
+    def test_expired_consumers_are_not_counted(self):
+        consumer, r = make_consumer(FakeBillingAgent())
+        r.zadd(CONSUMERS_KEY, {"crashed": time.time() - 1})
+        consumer._refresh_leases()
+
+        assert len(consumer.leases) == 4
+
+    def test_lost_lease_is_dropped(self):
+        consumer, r = make_consumer(FakeBillingAgent())
+        consumer._refresh_leases()
+        r.data[LEASE_KEY.format(partition=2)] = "someone-else"
+
+        consumer._refresh_leases()
+        assert sorted(consumer.leases) == [0, 1, 3]
+
+    def test_release_leaves_other_holders_alone(self):
+        consumer, r = make_consumer(FakeBillingAgent())
+        consumer._refresh_leases()
+        r.data[LEASE_KEY.format(partition=1)] = "someone-else"
+
+        consumer._release_all()
+        assert r.data == {LEASE_KEY.format(partition=1): "someone-else"}
+        assert r.zcard(CONSUMERS_KEY) == 0
+
+    def test_failure_is_retried_in_place_before_later_events(self, monkeypatch):
+        agent = FakeBillingAgent(failing=["evt_1"])
+        consumer, r = make_consumer(agent)
+        consumer.leases[0] = ">"
+        consumer._last_refresh = float("inf")
+        monkeypatch.setattr(
+            billing_consumer.agent_bus,
+            "read",
+            lambda *args, **kwargs: [("1-0", envelope("evt_1")), ("2-0", envelope("evt_2"))],
+        )
+
+        assert consumer._drain(0) == 2
+        assert agent.handled == ["evt_1", "evt_2"]
+        assert r.acked == ["1-0", "2-0"]
+
+    def test_poisoned_event_is_dead_lettered(self, monkeypatch):
+        agent = FakeBillingAgent()
+        agent.failing["evt_bad"] = 10
+        consumer, r = make_consumer(agent, max_attempts=3)
+        consumer.leases[0] = ">"
+        consumer._last_refresh = float("inf")
+        monkeypatch.setattr(
+            billing_consumer.agent_bus,
+            "read",
+            lambda *args, **kwargs: [("1-0", envelope("evt_bad")), ("2-0", envelope("evt_2"))],
+        )
+
+        consumer._drain(0)
+        assert [d["source_id"] for d in r.dead_letters(partition_agent_id(0))] == ["1-0"]
+        assert agent.handled == ["evt_2"]
+
+    def test_stop_leaves_the_rest_of_the_partition_pending(self, monkeypatch):
+        agent = FakeBillingAgent(failing=["evt_1"])
+        consumer, r = make_consumer(agent)
+        consumer.leases[0] = ">"
+        consumer._last_refresh = float("inf")
+        consumer.stop_event.set()
+        monkeypatch.setattr(
+            billing_consumer.agent_bus,
+            "read",
+            lambda *args, **kwargs: [("1-0", envelope("evt_1")), ("2-0", envelope("evt_2"))],
+        )
+
+        assert consumer._drain(0) == 0
+        assert agent.handled == []
+        assert r.acked == [] and r.dead_letters(partition_agent_id(0)) == []
+        assert consumer.leases[0] == "0"
+
+
+class TestBillingReplay:
+    """Test rebuilding events from recorded rows."""
+
+    def test_full_event_is_used_as_recorded(self):
+        event = {"id": "evt_1", "type": "invoice.payment_succeeded", "data": {"object": {}}}
+        row = SimpleNamespace(stripe_event_id="evt_1", raw_event=event)
+        assert billing_replay.event_from_row(row) is event
+
+    def test_legacy_row_is_fetched_from_stripe(self):
+        fetched = {"id": "evt_old", "type": "invoice.payment_failed", "data": {"object": {}}}
+        stripe_tool = SimpleNamespace(retrieve_event=lambda event_id: dict(fetched, id=event_id))
+        row = SimpleNamespace(stripe_event_id="evt_old", raw_event={"object": "invoice"})
+
+        assert billing_replay.event_from_row(row, stripe_tool)["id"] == "evt_old"
+        assert billing_replay.event_from_row(row) is None
@@ -124,18 +124,25 @@ class TestAuthentication:
         response = client.get("/api/v1/auth/me")
         assert response.status_code == 401
     
-    def test_refresh_token(self, test_user_token, auth_headers):
+    def test_refresh_token(self, test_user, test_user_token):
         """Test token refresh."""
-        time.sleep(1)
+        login = client.post(
+            "/api/v1/auth/login",
+            data={
+                "username": test_user.email,
+                "password": "TestPassword123!",
+            }
+        ).json()
         response = client.post(
             "/api/v1/auth/refresh",
-            headers=auth_headers
+            json={"refresh_token": login["refresh_token"]}
         )
         assert response.status_code == 200
         data = response.json()
         assert "access_token" in data
         assert data["token_type"] == "bearer"
         assert data["access_token"] != test_user_token  # Should be a new token
+        assert data["refresh_token"] != login["refresh_token"]  # Rotated
 
 
 # ============================================================================
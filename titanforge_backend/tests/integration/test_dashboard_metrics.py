@@ -0,0 +1,93 @@
+"""Tests for the shared, Redis-cached dashboard metrics."""
+
+import json
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import dashboard_metrics
+from app.services.dashboard_stream import metrics_delta
+
+from tests.conftest import FakeRedis
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def computed(monkeypatch):
+    calls = []
+
+    def fake_compute(db):
+        calls.append(db)
+        return {"leads_count": len(calls)}
+
+    monkeypatch.setattr(dashboard_metrics, "compute_metrics", fake_compute)
+    return calls
+
+
+class TestDashboardMetricsCache:
+    """Test caching, invalidation and stampede protection."""
+
+    def test_fresh_entry_is_reused(self, computed):
+        r = FakeRedis()
+        first = dashboard_metrics.get_metrics(db="session", r=r)
+        second = dashboard_metrics.get_metrics(db="session", r=r)
+        assert first == second == {"leads_count": 1}
+        assert len(computed) == 1
+
+    def test_invalidate_forces_recompute(self, computed):
+        r = FakeRedis()
+        dashboard_metrics.get_metrics(db="session", r=r)
+        dashboard_metrics.invalidate(r=r)
+        assert r.published == [(dashboard_metrics.CHANGES_CHANNEL, "invalidated")]
+        assert dashboard_metrics.get_metrics(db="session", r=r) == {"leads_count": 2}
+
+    def test_stale_entry_served_while_another_worker_refreshes(self, computed):
+        r = FakeRedis()
+        r.data[dashboard_metrics.CACHE_KEY] = json.dumps(
+            {"metrics": {"leads_count": 7}, "fresh_until": time.time() - 1}
+        )
+        r.data[dashboard_metrics.LOCK_KEY] = "other-worker"
+        assert dashboard_metrics.get_metrics(db="session", r=r) == {"leads_count": 7}
+        assert computed == []
+
+
+class TestMetricsDelta:
+    """Test what the live stream sends after a change."""
+
+    def test_only_changed_fields_are_sent(self):
+        previous = {"leads_count": 3, "mrr": 99.0, "computed_at": "t1"}
+        current = {"leads_count": 4, "mrr": 99.0, "computed_at": "t2"}
+        assert metrics_delta(previous, current) == {"leads_count": 4}
+
+    def test_first_update_is_complete(self):
+        assert metrics_delta(None, {"leads_count": 1}) == {"leads_count": 1}
+
+
+class TestSalesFunnelEndpoints:
+    """The sales funnel routes await the async metrics path."""
+
+    @pytest.mark.parametrize("path", ["/api/v1/sales/funnel/pipeline", "/api/v1/sales/funnel/dashboard"])
+    def test_metrics_are_awaited(self, path, monkeypatch):
+        async def fake_metrics(db, r):
+            return {
+                "leads_count": 8,
+                "customers_count": 2,
+                "mrr": 198.0,
+                "projected_annual": 2376.0,
+                "conversion_rate": 25.0,
+                "leads_last_7_days": 3,
+                "daily": [],
+            }
+
+        def blocking(*args, **kwargs):
+            raise AssertionError("the sync metrics path blocks the event loop")
+
+        monkeypatch.setattr(dashboard_metrics, "get_metrics_async", fake_metrics)
+        monkeypatch.setattr(dashboard_metrics, "get_metrics", blocking)
+
+        response = client.get(path)
+        assert response.status_code == 200
+        assert response.json()["sales_health"]["leads"] == 8
@@ -0,0 +1,90 @@
+"""Pool settings, checkout wait metrics, leak detection and replica routing."""
+
+import threading
+import time
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from app import database
+from app.core.config import settings
+from app.main import app
+from app.services import pool_monitor
+from app.services.pool_monitor import TimedQueuePool
+
+client = TestClient(app)
+
+
+def watched_engine(name, monkeypatch, leak_seconds=30.0, **pool):
+    # Registered in a copy, so the engine is forgotten after the test
+    monkeypatch.setattr(pool_monitor, "monitors", dict(pool_monitor.monitors))
+    engine = create_engine(
+        "sqlite://",
+        poolclass=TimedQueuePool,
+        connect_args={"check_same_thread": False},
+        **pool,
+    )
+    monitor = pool_monitor.watch(name, engine)
+    monitor.leak_seconds = leak_seconds
+    return engine, monitor
+
+
+class TestPoolMonitor:
+    """Test checkout timing and leak reports on a small SQLite pool."""
+
+    def test_records_checkout_wait(self, monkeypatch):
+        engine, monitor = watched_engine("wait", monkeypatch, pool_size=1, max_overflow=0)
+        held = engine.connect()
+        threading.Timer(0.2, held.close).start()
+
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+
+        stats = pool_monitor.snapshot()["wait"]
+        assert stats["checkouts"] == 2
+        assert stats["max_wait_ms"] >= 150
+        assert stats["size"] == 1
+
+    def test_reports_connections_held_too_long(self, monkeypatch, capsys):
+        engine, monitor = watched_engine("leak", monkeypatch, leak_seconds=0.05)
+        conn = engine.connect()
+        time.sleep(0.1)
+
+        [leak] = monitor.long_held()
+        assert __file__ in leak["checked_out_at"]
+
+        conn.close()
+        assert monitor.long_held() == []
+        assert monitor.leaks_reported == 1
+        assert "held for" in capsys.readouterr().out
+
+    def test_counters_survive_dispose(self, monkeypatch):
+        engine, monitor = watched_engine("dispose", monkeypatch)
+        with engine.connect():
+            pass
+        engine.dispose()
+        with engine.connect():
+            pass
+        assert monitor.checkouts == 2
+
+
+class TestDatabaseRouting:
+    """Test pool options and where reporting reads go."""
+
+    def test_pool_options_follow_settings(self, monkeypatch):
+        monkeypatch.setattr(settings, "DB_POOL_SIZE", 7)
+        monkeypatch.setattr(settings, "DB_POOL_PRE_PING", False)
+        options = database.pool_options()
+        assert options["pool_size"] == 7
+        assert options["pool_pre_ping"] is False
+
+    def test_reads_use_primary_without_replica(self):
+        if settings.DATABASE_REPLICA_URL:
+            assert database.replica_engine is not database.engine
+        else:
+            assert database.replica_engine is database.engine
+            assert database.ReadSessionLocal.kw["bind"] is database.engine
+
+    def test_pool_metrics_need_superuser(self, test_user, auth_headers):
+        response = client.get("/api/v1/admin/db-pool", headers=auth_headers)
+        assert response.status_code == 403
@@ -0,0 +1,146 @@
+"""Tests for the batched analytics event sink and the analytics queue consumer."""
+
+import threading
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from app.services.event_sink import EventBufferFull, EventSink
+from swarm.departments.data_intelligence.event_consumer import AnalyticsEventConsumer
+from swarm.worker import QueueMetrics
+from tests.conftest import FakeRedis
+
+
+class FakeSession:
+    """Commits every batch; rejects rows of type "bad" and fails while down."""
+
+    down = False
+
+    def __init__(self, log):
+        self.log = log
+
+    def execute(self, statement, rows):
+        if self.down:
+            raise OperationalError("INSERT", {}, Exception("connection refused"))
+        if any(row["event_type"] == "bad" for row in rows):
+            raise ValueError("violates a constraint")
+        self.log.append(list(rows))
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class TestEventSink:
+    """Test buffering, batching and backpressure without a database."""
+
+    def make_sink(self, **kwargs):
+        batches = []
+        sink = EventSink(
+            session_factory=lambda: FakeSession(batches), autostart=False, **kwargs
+        )
+        return sink, batches
+
+    def test_flush_writes_in_batches(self):
+        sink, batches = self.make_sink(batch_size=2)
+        for i in range(5):
+            sink.submit("lead_created", payload={"n": i})
+
+        assert sink.flush() == 5
+        assert [len(batch) for batch in batches] == [2, 2, 1]
+        assert sink.pending == 0
+
+    def test_rows_carry_ids_and_timestamps(self):
+        sink, batches = self.make_sink()
+        sink.submit(
+            "user_signup", user_id="6f1c2b9e-5d1a-4c1e-9a43-2f1d3a6b7c8d"
+        )
+        sink.flush()
+        row = batches[0][0]
+        assert row["event_type"] == "user_signup"
+        assert row["id"] and row["timestamp"]
+        assert str(row["user_id"]) == "6f1c2b9e-5d1a-4c1e-9a43-2f1d3a6b7c8d"
+
+    def test_full_buffer_raises(self):
+        sink, _ = self.make_sink(max_buffer=1, put_timeout=0.01)
+        sink.submit("goal_submitted")
+        with pytest.raises(EventBufferFull):
+            sink.submit("goal_submitted")
+
+    def test_rejected_rows_are_reported_not_written(self):
+        sink, batches = self.make_sink()
+        rows = [{"event_type": t} for t in ("ok", "bad", "ok")]
+
+        assert [index for index, _ in sink.write(rows)] == [1]
+        assert [len(batch) for batch in batches] == [1, 1]
+
+
+class FakeAgent:
+    agent_id = "analytics_agent"
+
+    def __init__(self):
+        self.calls = []
+
+    def aggregate_daily_metrics(self, date=None):
+        self.calls.append(date)
+
+
+def event(event_type, **params):
+    return {"message": {"action": "record_event", "event_type": event_type, **params}}
+
+
+class TestAnalyticsEventConsumer:
+    """Entries are acknowledged only once their events are committed."""
+
+    def make_consumer(self):
+        batches = []
+        sink = EventSink(session_factory=lambda: FakeSession(batches), autostart=False)
+        r = FakeRedis()
+        consumer = AnalyticsEventConsumer(
+            FakeAgent(), 0, QueueMetrics("analytics_agent"), threading.Event(), r=r, sink=sink
+        )
+        return consumer, r, batches
+
+    def test_batch_is_written_once_then_acked(self):
+        consumer, r, batches = self.make_consumer()
+        consumer._process_batch([("1-0", event("lead_created")), ("2-0", event("user_signup"))])
+
+        assert [len(batch) for batch in batches] == [2]
+        assert r.acked == ["1-0", "2-0"]
+
+    def test_unreachable_database_leaves_entries_pending(self, monkeypatch):
+        consumer, r, batches = self.make_consumer()
+        monkeypatch.setattr(FakeSession, "down", True)
+        consumer._process_batch([("1-0", event("lead_created"))])
+
+        assert batches == [] and r.acked == []
+        assert consumer.metrics.snapshot()["failed"] == 1
+
+    def test_rejected_and_malformed_events_are_dead_lettered(self):
+        consumer, r, batches = self.make_consumer()
+        consumer._process_batch(
+            [
+                ("1-0", event("lead_created")),
+                ("2-0", event("bad")),
+                ("3-0", event("user_signup", user_id="not-a-uuid")),
+            ]
+        )
+
+        assert [len(batch) for batch in batches] == [1]
+        dead = r.dead_letters("analytics_agent")
+        assert [d["source_id"] for d in dead] == ["3-0", "2-0"]
+        assert sorted(r.acked) == ["1-0", "2-0", "3-0"]
+
+    def test_other_actions_are_handled_one_by_one(self):
+        consumer, r, batches = self.make_consumer()
+        consumer._process_batch(
+            [("1-0", {"message": {"action": "aggregate_daily_metrics", "date": "2026-01-01"}})]
+        )
+
+        assert consumer.agent.calls == ["2026-01-01"]
+        assert batches == [] and r.acked == ["1-0"]
@@ -0,0 +1,164 @@
+"""Tests for background CEO dispatch of submitted goals and the task routes."""
+
+import json
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+
+from app import db_models
+from app.main import app
+from app.services.goal_dispatcher import (
+    GOAL_QUEUE,
+    GoalDispatcher,
+    enqueue_goal,
+    task_events_channel,
+)
+from swarm.departments.executive_board import ceo as ceo_module
+
+client = TestClient(app)
+
+
+class FakeCEO:
+    agent_id = "ceo"
+
+    def __init__(self, model_name=None, fail=False):
+        self.fail = fail
+        self.goals = []
+
+    def execute_task(self, task_description):
+        self.goals.append(task_description)
+        if self.fail:
+            raise RuntimeError("no department can take this")
+        return "Routed to the marketing department."
+
+
+def add_task(db, status="pending"):
+    task = db_models.Task(
+        description="Grow the newsletter",
+        status=status,
+        created_at=datetime.utcnow(),
+        history=[{"status": status}],
+    )
+    db.add(task)
+    db.commit()
+    return str(task.id)
+
+
+def events(response):
+    return [json.loads(line[len("data: "):]) for line in response.text.splitlines() if line]
+
+
+def wait_for_status(db, task_id, status, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        db.expire_all()
+        task = db.get(db_models.Task, uuid.UUID(task_id))
+        if task.status == status:
+            return task
+        time.sleep(0.02)
+    raise AssertionError(f"task {task_id} never reached {status}")
+
+
+class TestGoalDispatcher:
+    """Test that queued goals are routed by the CEO and their outcome recorded."""
+
+    def test_dispatch_records_result_and_publishes_each_status(self, db, fake_redis):
+        task_id = add_task(db)
+        ceo = FakeCEO()
+
+        GoalDispatcher(r=fake_redis).dispatch(ceo, {"task_id": task_id, "description": "Grow the newsletter"})
+
+        task = db.get(db_models.Task, uuid.UUID(task_id))
+        assert task.status == "completed"
+        assert task.result == {"ceo_response": "Routed to the marketing department.", "error": None}
+        assert [entry["status"] for entry in task.history] == ["pending", "in_progress", "completed"]
+        assert ceo.goals == [f"Task ID: {task_id}. Goal: Grow the newsletter"]
+        published = [
+            json.loads(message)["status"]
+            for channel, message in fake_redis.published
+            if channel == task_events_channel(task_id)
+        ]
+        assert published == ["in_progress", "completed"]
+
+    def test_failed_goal_is_recorded_and_reported(self, db, fake_redis):
+        task_id = add_task(db)
+
+        GoalDispatcher(r=fake_redis).dispatch(FakeCEO(fail=True), {"task_id": task_id, "description": "x"})
+
+        task = db.get(db_models.Task, uuid.UUID(task_id))
+        assert task.status == "failed"
+        assert task.result == {"ceo_response": None, "error": "no department can take this"}
+        (alert,) = fake_redis.messages("agent_stream:notification_agent")
+        assert alert["message"]["notification_type"] == "internal_error"
+
+    def test_workers_pop_queued_goals(self, db, fake_redis, monkeypatch):
+        monkeypatch.setattr(ceo_module, "CEO", FakeCEO)
+        task_id = add_task(db)
+        fake_redis.rpush(GOAL_QUEUE, "not json")
+        enqueue_goal(task_id, "Grow the newsletter", "user-1", fake_redis)
+
+        dispatcher = GoalDispatcher(workers=1, r=fake_redis, poll_timeout=0.05)
+        dispatcher.start()
+        try:
+            task = wait_for_status(db, task_id, "completed")
+        finally:
+            dispatcher.stop()
+
+        assert task.result["ceo_response"] == "Routed to the marketing department."
+        assert fake_redis.lists[GOAL_QUEUE] == []
+
+
+class TestTaskRoutes:
+    """Test the 202 goal submission, task polling and the task event stream."""
+
+    def test_submit_goal_queues_it(self, db, auth_headers, fake_redis):
+        response = client.post(
+            "/api/v1/goals", json={"description": "Grow the newsletter"}, headers=auth_headers
+        )
+
+        assert response.status_code == 202
+        body = response.json()
+        assert body["status"] == "pending"
+        (job,) = [json.loads(raw) for raw in fake_redis.lists[GOAL_QUEUE]]
+        assert (job["task_id"], job["description"]) == (body["task_id"], "Grow the newsletter")
+        assert db.get(db_models.Task, uuid.UUID(body["task_id"])).status == "pending"
+
+    def test_get_task(self, db, auth_headers):
+        task_id = add_task(db)
+
+        response = client.get(f"/api/v1/tasks/{task_id}", headers=auth_headers)
+        assert response.status_code == 200
+        assert (response.json()["id"], response.json()["result"]) == (task_id, None)
+
+        missing = client.get(f"/api/v1/tasks/{uuid.uuid4()}", headers=auth_headers)
+        assert missing.status_code == 404
+
+    def test_events_of_a_finished_task_end_after_its_state(self, db, auth_headers, fake_redis):
+        task_id = add_task(db, status="completed")
+
+        response = client.get(f"/api/v1/tasks/{task_id}/events", headers=auth_headers)
+
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert [event["status"] for event in events(response)] == ["completed"]
+
+    def test_events_follow_the_dispatcher_until_the_task_finishes(self, db, auth_headers, fake_redis):
+        task_id = add_task(db)
+
+        def dispatch():
+            time.sleep(0.2)
+            GoalDispatcher(r=fake_redis).dispatch(FakeCEO(), {"task_id": task_id, "description": "x"})
+
+        # Runs while the stream is open; whatever the interleaving, the stream
+        # sees the task's current state and then every later transition
+        worker = threading.Thread(target=dispatch)
+        worker.start()
+
+        response = client.get(f"/api/v1/tasks/{task_id}/events", headers=auth_headers)
+        worker.join()
+
+        statuses = [event["status"] for event in events(response)]
+        assert statuses[-1] == "completed"
+        assert statuses == sorted(set(statuses), key=["pending", "in_progress", "completed"].index)
@@ -0,0 +1,84 @@
+"""Tests for the SQL-side income summary and integer Stripe amounts."""
+
+import uuid
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+
+from app import db_models
+from app.main import app
+from app.services.stripe_events import event_amount
+
+client = TestClient(app)
+
+
+def add_transaction(db, amount, currency="usd", status="succeeded", created_at=None):
+    db.add(
+        db_models.StripeTransaction(
+            stripe_event_id=f"evt_{uuid.uuid4().hex}",
+            amount=amount,
+            currency=currency,
+            status=status,
+            created_at=created_at or datetime(2026, 3, 10, 12),
+            raw_event={},
+        )
+    )
+    db.commit()
+
+
+class TestIncomeSummary:
+    """Test per-currency totals and period buckets."""
+
+    def test_sums_per_currency_in_minor_units(self, db):
+        add_transaction(db, 1999)
+        add_transaction(db, 1)
+        add_transaction(db, 500, currency="eur")
+        add_transaction(db, 9999, status="failed")
+
+        response = client.get(
+            "/api/v1/income/summary",
+            params={"start_date": "2026-03-10T00:00:00", "end_date": "2026-03-10T00:00:00"},
+        )
+        assert response.status_code == 200
+        summary = response.json()
+        assert summary["total_income_by_currency"] == {"usd": 2000, "eur": 500}
+        assert summary["total_transactions"] == 3
+        assert "buckets" not in summary
+
+    def test_monthly_buckets(self, db):
+        add_transaction(db, 100, created_at=datetime(2026, 4, 2))
+        add_transaction(db, 200, created_at=datetime(2026, 4, 20))
+        add_transaction(db, 300, created_at=datetime(2026, 5, 1))
+
+        response = client.get(
+            "/api/v1/income/summary",
+            params={
+                "start_date": "2026-04-01T00:00:00",
+                "end_date": "2026-05-31T00:00:00",
+                "bucket": "month",
+            },
+        )
+        summary = response.json()
+        assert [(b["period"][:7], b["amount"], b["transactions"]) for b in summary["buckets"]] == [
+            ("2026-04", 300, 2),
+            ("2026-05", 300, 1),
+        ]
+        assert summary["total_income_by_currency"] == {"usd": 600}
+
+    def test_unknown_bucket_is_rejected(self):
+        response = client.get("/api/v1/income/summary", params={"bucket": "fortnight"})
+        assert response.status_code == 422
+
+
+class TestEventAmount:
+    """Test amount extraction used by the backfill."""
+
+    def test_whole_event(self):
+        event = {"object": "event", "type": "invoice.payment_succeeded", "data": {"object": {"amount_paid": 4900}}}
+        assert event_amount(event) == 4900
+
+    def test_legacy_object_only_row(self):
+        assert event_amount({"object": "checkout.session", "amount_total": 1200}) == 1200
+
+    def test_event_without_amount(self):
+        assert event_amount({"object": "event", "data": {"object": {"object": "subscription"}}}) is None
@@ -0,0 +1,121 @@
+"""Keyset pagination, filters and export for GET /api/v1/income/transactions."""
+
+import csv
+import io
+import json
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import db_models
+from app.main import app
+
+client = TestClient(app)
+
+
+def seed_transactions(db, count, customer_id=None, status="succeeded"):
+    customer_id = customer_id or f"cus_{uuid.uuid4().hex[:12]}"
+    start = datetime(2026, 6, 1)
+    db.execute(
+        db_models.StripeTransaction.__table__.insert(),
+        [
+            {
+                "id": uuid.uuid4(),
+                "stripe_event_id": f"evt_{uuid.uuid4().hex}",
+                "customer_id": customer_id,
+                "amount": 100 * i,
+                "currency": "usd",
+                "status": status,
+                # Pairs share a timestamp so the id tie-break is exercised
+                "created_at": start + timedelta(seconds=i // 2),
+                "raw_event": {"id": "evt", "data": {"object": {}}},
+            }
+            for i in range(count)
+        ],
+    )
+    db.commit()
+    return customer_id
+
+
+@pytest.fixture
+def superuser_headers(db, test_user, auth_headers):
+    test_user.is_superuser = True
+    db.commit()
+    return auth_headers
+
+
+class TestIncomeTransactions:
+    """Test cursor paging, filters and streaming export."""
+
+    def test_pages_do_not_overlap(self, db, auth_headers):
+        customer_id = seed_transactions(db, 25)
+        seen = []
+        cursor = None
+        while True:
+            params = {"limit": 10, "customer_id": customer_id}
+            if cursor:
+                params["cursor"] = cursor
+            response = client.get("/api/v1/income/transactions", params=params, headers=auth_headers)
+            assert response.status_code == 200
+            page = response.json()
+            seen.extend(t["id"] for t in page)
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+
+        assert len(seen) == len(set(seen)) == 25
+        assert all("raw_event" not in t for t in page)
+
+    def test_filters_by_status(self, db, auth_headers):
+        customer_id = seed_transactions(db, 3)
+        seed_transactions(db, 2, customer_id=customer_id, status="failed")
+
+        response = client.get(
+            "/api/v1/income/transactions",
+            params={"customer_id": customer_id, "status": "failed"},
+            headers=auth_headers,
+        )
+        assert [t["status"] for t in response.json()] == ["failed", "failed"]
+
+    def test_invalid_cursor_is_rejected(self, auth_headers):
+        response = client.get(
+            "/api/v1/income/transactions", params={"cursor": "not-a-cursor"}, headers=auth_headers
+        )
+        assert response.status_code == 400
+
+    def test_listing_requires_a_login(self, db):
+        response = client.get("/api/v1/income/transactions")
+        assert response.status_code == 401
+
+    def test_export_is_superuser_only(self, db, auth_headers):
+        seed_transactions(db, 2)
+        response = client.get(
+            "/api/v1/income/transactions", params={"export": "csv"}, headers=auth_headers
+        )
+        assert response.status_code == 403
+
+    def test_csv_export_streams_every_row(self, db, superuser_headers):
+        customer_id = seed_transactions(db, 30)
+        response = client.get(
+            "/api/v1/income/transactions",
+            params={"customer_id": customer_id, "export": "csv", "limit": 5},
+            headers=superuser_headers,
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/csv")
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+        assert len(rows) == 30
+        assert {int(r["amount"]) for r in rows} == {100 * i for i in range(30)}
+
+    def test_ndjson_export(self, db, superuser_headers):
+        customer_id = seed_transactions(db, 4)
+        response = client.get(
+            "/api/v1/income/transactions",
+            params={"customer_id": customer_id, "export": "ndjson"},
+            headers=superuser_headers,
+        )
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert len(lines) == 4
+        assert lines[0]["created_at"] >= lines[-1]["created_at"]
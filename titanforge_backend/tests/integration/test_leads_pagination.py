@@ -0,0 +1,150 @@
+"""Keyset pagination for GET /api/v1/leads, plus a per-page latency benchmark.
+
+The benchmark seeds LEADS_BENCHMARK_ROWS leads (default 20,000; run with
+LEADS_BENCHMARK_ROWS=1000000 for the full-size check).
+"""
+
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy import text, tuple_
+
+from app import db_models
+from app.database import engine
+from app.main import app
+from app.migrations import lead_list_indexes
+from app.pagination import encode_cursor
+
+client = TestClient(app)
+
+BENCHMARK_ROWS = int(os.getenv("LEADS_BENCHMARK_ROWS", 20000))
+
+
+def seed_leads(db, count, chunk=10000):
+    start = datetime.utcnow() - timedelta(days=365)
+    table = db_models.Lead.__table__
+    for offset in range(0, count, chunk):
+        db.execute(
+            table.insert(),
+            [
+                {
+                    "id": uuid.uuid4(),
+                    "email": f"bench{i}@example.com",
+                    "source": "alumni_import" if i % 3 else "landing_page",
+                    "status": "new",
+                    "created_at": start + timedelta(seconds=i),
+                }
+                for i in range(offset, min(offset + chunk, count))
+            ],
+        )
+        db.commit()
+
+
+class TestLeadsPagination:
+    """Test cursor paging, filters and projection."""
+
+    def test_pages_do_not_overlap(self, db):
+        seed_leads(db, 25)
+        seen = []
+        cursor = None
+        while True:
+            params = {"limit": 10}
+            if cursor:
+                params["cursor"] = cursor
+            response = client.get("/api/v1/leads", params=params)
+            assert response.status_code == 200
+            seen.extend(lead["id"] for lead in response.json())
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+        assert len(seen) == len(set(seen)) >= 25
+
+    def test_projection_and_filter(self, db):
+        seed_leads(db, 9)
+        response = client.get(
+            "/api/v1/leads", params={"fields": "email", "source": "landing_page"}
+        )
+        assert response.status_code == 200
+        assert response.json()
+        assert all(set(lead) == {"email"} for lead in response.json())
+
+    def test_invalid_cursor_and_field(self):
+        assert client.get("/api/v1/leads", params={"cursor": "nope"}).status_code == 400
+        assert client.get("/api/v1/leads", params={"fields": "password"}).status_code == 400
+
+    def test_migration_drops_the_redundant_created_at_index(self, db):
+        def lead_indexes():
+            with engine.connect() as conn:
+                return set(
+                    conn.execute(
+                        text("SELECT indexname FROM pg_indexes WHERE tablename = 'leads'")
+                    ).scalars()
+                )
+
+        with engine.begin() as conn:
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_leads_created_at ON leads (created_at)"))
+        lead_list_indexes.upgrade(engine)
+        lead_list_indexes.upgrade(engine)  # Idempotent
+
+        indexes = lead_indexes()
+        assert "ix_leads_created_at" not in indexes
+        assert "ix_leads_created_at_id" in indexes
+
+
+class TestLeadsPaginationBenchmark:
+    """A deep page must cost about the same as the first one."""
+
+    def time_page(self, params):
+        started = time.perf_counter()
+        response = client.get("/api/v1/leads", params=params)
+        elapsed = time.perf_counter() - started
+        assert response.status_code == 200
+        return elapsed, response
+
+    def test_constant_latency_per_page(self, db):
+        seed_leads(db, BENCHMARK_ROWS)
+
+        # A cursor pointing near the end of the newest-first ordering
+        deep = (
+            db.query(db_models.Lead.created_at, db_models.Lead.id)
+            .order_by(db_models.Lead.created_at.asc(), db_models.Lead.id.asc())
+            .offset(100)
+            .first()
+        )
+        first_times, deep_times = [], []
+        for _ in range(5):
+            first_times.append(self.time_page({"limit": 50})[0])
+            deep_times.append(
+                self.time_page({"limit": 50, "cursor": encode_cursor(*deep)})[0]
+            )
+        first, deepest = min(first_times), min(deep_times)
+        assert deepest < first * 3 + 0.02
+
+        if db.bind.dialect.name == "postgresql":
+            db.execute(text("ANALYZE leads"))
+            # A typical page, with most of the table behind the cursor. Near
+            # the end few rows qualify and sorting them is genuinely cheaper.
+            second_page = (
+                db.query(db_models.Lead.created_at, db_models.Lead.id)
+                .order_by(db_models.Lead.created_at.desc(), db_models.Lead.id.desc())
+                .offset(50)
+                .first()
+            )
+            compiled = (
+                db.query(db_models.Lead.id, db_models.Lead.created_at)
+                .filter(tuple_(db_models.Lead.created_at, db_models.Lead.id) < tuple(second_page))
+                .order_by(db_models.Lead.created_at.desc(), db_models.Lead.id.desc())
+                .limit(51)
+                .statement.compile(db.bind)
+            )
+            plan = "\n".join(
+                row[0]
+                for row in db.connection().exec_driver_sql(
+                    f"EXPLAIN {compiled}", compiled.params
+                )
+            )
+            assert "ix_leads_created_at_id" in plan
+            assert "Sort" not in plan
@@ -0,0 +1,54 @@
+"""Tests for agent long-term memory over the API and the Redis transports."""
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import long_term_memory
+from swarm.agents.transport import InProcessTransport
+
+from tests.conftest import FakeRedis
+
+client = TestClient(app)
+
+
+class TestLongTermMemory:
+    """Test storing and recalling agent documents."""
+
+    def test_transport_recalls_by_shared_words(self):
+        transport = InProcessTransport(r=FakeRedis())
+        transport.save_to_long_term_memory("code_reviewer", "Review of app/crud.py: add an index", {})
+        transport.save_to_long_term_memory("code_reviewer", "Review of app/main.py: fine", {"file": "main"})
+        transport.save_to_long_term_memory("backend_developer", "Wrote app/main.py", {})
+
+        result = transport.retrieve_from_long_term_memory("code_reviewer", "main.py review", n_results=5)
+
+        documents = [item["document"] for item in result["results"]]
+        assert documents == ["Review of app/main.py: fine", "Review of app/crud.py: add an index"]
+        assert result["results"][0]["metadata"] == {"file": "main"}
+
+    def test_oldest_documents_are_dropped_past_the_cap(self):
+        r = FakeRedis()
+        for i in range(5):
+            long_term_memory.add(r, "agent", f"note {i}", max_documents=3)
+
+        results = long_term_memory.query(r, "agent", "note", n_results=10)
+        assert [item["document"] for item in results] == ["note 4", "note 3", "note 2"]
+
+    def test_api_shares_the_store_with_the_transport(self, auth_headers, fake_redis):
+        response = client.post(
+            "/api/v1/memory/long_term/add",
+            json={"agent_id": "code_reviewer", "document": "Stripe webhook retries", "metadata": {}},
+            headers=auth_headers,
+        )
+        assert response.status_code == 200
+
+        transport = InProcessTransport(r=fake_redis)
+        (item,) = transport.retrieve_from_long_term_memory("code_reviewer", "webhook")["results"]
+        assert item["document"] == "Stripe webhook retries"
+
+        response = client.post(
+            "/api/v1/memory/long_term/query",
+            json={"agent_id": "code_reviewer", "query_text": "stripe"},
+            headers=auth_headers,
+        )
+        assert [item["document"] for item in response.json()["results"]] == ["Stripe webhook retries"]
@@ -0,0 +1,199 @@
+"""Tests for the daily metrics rollup, checked against the raw events it folds."""
+
+from datetime import date, datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import db_models
+from app.core.config import settings
+from app.main import app
+from app.services import metrics_rollup
+from swarm.departments.data_intelligence.analytics_agent import AnalyticsAgent
+from swarm.worker import handle_message
+
+client = TestClient(app)
+
+DAY_ONE = date(2026, 3, 1)
+DAY_TWO = DAY_ONE + timedelta(days=1)
+MIDNIGHT = datetime.combine(DAY_TWO, datetime.min.time())
+
+# (event_type, timestamp, source), straddling midnight between DAY_ONE and DAY_TWO
+EVENTS = [
+    ("user_signup", MIDNIGHT - timedelta(hours=5), "google"),
+    ("user_signup", MIDNIGHT - timedelta(seconds=1), "google"),
+    ("user_signup", MIDNIGHT - timedelta(seconds=1), None),
+    ("page_view", MIDNIGHT - timedelta(minutes=3), None),
+    ("user_signup", MIDNIGHT, "google"),
+    ("user_signup", MIDNIGHT + timedelta(seconds=1), "newsletter"),
+    ("page_view", MIDNIGHT + timedelta(hours=2), None),
+]
+
+
+@pytest.fixture(autouse=True)
+def grace_minutes(monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_ROLLUP_GRACE_MINUTES", 15)
+
+
+def add_events(db, events):
+    db.add_all(
+        db_models.Event(
+            event_type=event_type,
+            timestamp=timestamp,
+            payload={"source": source} if source else None,
+        )
+        for event_type, timestamp, source in events
+    )
+    db.commit()
+
+
+def raw_counts(events, day):
+    counts = {}
+    for event_type, timestamp, source in events:
+        if timestamp.date() == day:
+            key = (event_type, source or "")
+            counts[key] = counts.get(key, 0) + 1
+    return counts
+
+
+def rolled_up_counts(db, day):
+    rows = db.query(db_models.DailyMetric).filter(
+        db_models.DailyMetric.day == day,
+        ~db_models.DailyMetric.event_type.startswith("snapshot:"),
+    )
+    return {(row.event_type, row.source): row.count for row in rows}
+
+
+class TestRollupDay:
+    """Test folding one day of events into daily_metrics."""
+
+    def test_counts_match_raw_events_on_each_side_of_midnight(self, db):
+        add_events(db, EVENTS)
+
+        for day in (DAY_ONE, DAY_TWO):
+            metrics_rollup.rollup_day(db, day)
+        db.commit()
+
+        assert rolled_up_counts(db, DAY_ONE) == raw_counts(EVENTS, DAY_ONE)
+        assert rolled_up_counts(db, DAY_TWO) == raw_counts(EVENTS, DAY_TWO)
+        assert rolled_up_counts(db, DAY_ONE)[("user_signup", "google")] == 2
+        assert rolled_up_counts(db, DAY_TWO)[("user_signup", "google")] == 1
+
+    def test_rerun_replaces_the_day(self, db):
+        add_events(db, EVENTS)
+        metrics_rollup.rollup_day(db, DAY_ONE)
+        db.commit()
+
+        late = [("user_signup", MIDNIGHT - timedelta(minutes=1), "google")]
+        add_events(db, late)
+        metrics_rollup.rollup_day(db, DAY_ONE)
+        db.commit()
+
+        assert rolled_up_counts(db, DAY_ONE) == raw_counts(EVENTS + late, DAY_ONE)
+        snapshots = (
+            db.query(db_models.DailyMetric)
+            .filter(
+                db_models.DailyMetric.day == DAY_ONE,
+                db_models.DailyMetric.event_type == metrics_rollup.SNAPSHOT_MRR,
+            )
+            .count()
+        )
+        assert snapshots == 1
+
+
+class TestRefresh:
+    """Test the incremental job and its watermark."""
+
+    def test_watermark_waits_out_the_grace_window(self, db):
+        add_events(db, EVENTS)
+
+        # Five minutes past midnight on day three: day two is still in its grace window
+        result = metrics_rollup.refresh(db, now=MIDNIGHT + timedelta(days=1, minutes=5))
+        assert result == {
+            "from": DAY_ONE.isoformat(),
+            "to": (DAY_TWO + timedelta(days=1)).isoformat(),
+            "days": 3,
+        }
+        assert metrics_rollup.get_watermark(db) == DAY_ONE
+
+        # A buffered event for day two lands inside the grace window
+        late = [("user_signup", MIDNIGHT + timedelta(hours=23, minutes=59), "google")]
+        add_events(db, late)
+
+        result = metrics_rollup.refresh(db, now=MIDNIGHT + timedelta(days=1, minutes=20))
+        assert result["from"] == DAY_TWO.isoformat()
+        assert metrics_rollup.get_watermark(db) == DAY_TWO
+        assert rolled_up_counts(db, DAY_TWO) == raw_counts(EVENTS + late, DAY_TWO)
+
+    def test_totals_match_raw_events_around_the_watermark(self, db):
+        add_events(db, EVENTS)
+        metrics_rollup.refresh(db, now=MIDNIGHT + timedelta(minutes=30))
+        assert metrics_rollup.get_watermark(db) == DAY_ONE
+
+        # Day two is read from raw events, past the watermark
+        totals = metrics_rollup.event_totals(db, ["user_signup", "page_view"])
+        assert totals == {"user_signup": 5, "page_view": 2}
+        since = metrics_rollup.event_totals(db, ["user_signup"], since=DAY_TWO)
+        assert since == {"user_signup": 2}
+        assert db.query(metrics_rollup.event_total("user_signup")).scalar() == 5
+
+
+class TestBackfill:
+    """Test recomputing a range, directly and through the API."""
+
+    def test_backfill_recomputes_without_moving_the_watermark(self, db):
+        add_events(db, EVENTS)
+        metrics_rollup.refresh(db, now=MIDNIGHT + timedelta(minutes=30))
+
+        # A correction to an already closed day is only picked up by a backfill
+        corrected = [("page_view", MIDNIGHT - timedelta(hours=1), None)]
+        add_events(db, corrected)
+        assert metrics_rollup.backfill(db, DAY_ONE, DAY_TWO) == 2
+
+        assert metrics_rollup.get_watermark(db) == DAY_ONE
+        assert rolled_up_counts(db, DAY_ONE) == raw_counts(EVENTS + corrected, DAY_ONE)
+        assert rolled_up_counts(db, DAY_TWO) == raw_counts(EVENTS, DAY_TWO)
+
+    def test_backfill_route_queues_the_agent_action(self, db, test_user, auth_headers, fake_redis):
+        test_user.is_superuser = True
+        db.commit()
+        add_events(db, EVENTS)
+
+        response = client.post(
+            "/api/v1/analytics/rollup/backfill",
+            params={"start_date": DAY_ONE.isoformat(), "end_date": DAY_TWO.isoformat()},
+            headers=auth_headers,
+        )
+        assert response.status_code == 202
+
+        (envelope,) = fake_redis.messages("agent_stream:analytics_agent")
+        assert envelope["message"] == {
+            "action": "backfill_daily_metrics",
+            "start_date": DAY_ONE.isoformat(),
+            "end_date": DAY_TWO.isoformat(),
+        }
+        assert handle_message(AnalyticsAgent(), envelope) == {"status": "success", "days": 2}
+        db.expire_all()
+        assert rolled_up_counts(db, DAY_ONE) == raw_counts(EVENTS, DAY_ONE)
+        assert rolled_up_counts(db, DAY_TWO) == raw_counts(EVENTS, DAY_TWO)
+
+    def test_backfill_route_is_superuser_only(self, db, test_user, auth_headers, fake_redis):
+        response = client.post(
+            "/api/v1/analytics/rollup/backfill",
+            params={"start_date": DAY_ONE.isoformat(), "end_date": DAY_TWO.isoformat()},
+            headers=auth_headers,
+        )
+        assert response.status_code == 403
+        assert fake_redis.messages("agent_stream:analytics_agent") == []
+
+    def test_backfill_route_rejects_a_reversed_range(self, db, test_user, auth_headers, fake_redis):
+        test_user.is_superuser = True
+        db.commit()
+
+        response = client.post(
+            "/api/v1/analytics/rollup/backfill",
+            params={"start_date": DAY_TWO.isoformat(), "end_date": DAY_ONE.isoformat()},
+            headers=auth_headers,
+        )
+        assert response.status_code == 400
+        assert fake_redis.messages("agent_stream:analytics_agent") == []
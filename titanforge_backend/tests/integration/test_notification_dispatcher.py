@@ -0,0 +1,140 @@
+"""Tests for notification templates and the concurrent notification dispatcher."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from swarm.departments.communications.notification_dispatcher import NotificationDispatcher
+from swarm.departments.communications.notification_templates import (
+    NotificationTemplateError,
+    get_template,
+    render_notification,
+)
+from swarm.worker import QueueMetrics
+
+from tests.conftest import FakeRedis
+
+
+class FlakyEmailTool:
+    configured = True
+
+    def __init__(self, failures=0, delay=0.0):
+        self.failures = failures
+        self.delay = delay
+        self.sent = []
+        self._lock = threading.Lock()
+
+    def send_email(self, to_email, subject, body, html_body=None):
+        time.sleep(self.delay)
+        with self._lock:
+            if self.failures:
+                self.failures -= 1
+                return False
+            self.sent.append((to_email, subject))
+            return True
+
+
+class FakeAgent:
+    agent_id = "notification_agent"
+
+    def __init__(self, email_tool):
+        self.email_tool = email_tool
+
+
+def make_dispatcher(email_tool, **kwargs):
+    r = FakeRedis()
+    dispatcher = NotificationDispatcher(
+        FakeAgent(email_tool),
+        0,
+        QueueMetrics("notification_agent"),
+        threading.Event(),
+        r=r,
+        backoff_seconds=0,
+        **kwargs,
+    )
+    return dispatcher, r
+
+
+def welcome(i):
+    return {
+        "message": {
+            "action": "process_notification_request",
+            "notification_type": "lead_welcome",
+            "data": {"lead_email": f"lead{i}@example.com", "lead_name": f"Lead {i}"},
+        }
+    }
+
+
+class TestNotificationTemplates:
+    """Test template compilation and rendering."""
+
+    def test_template_is_compiled_once(self):
+        assert get_template("welcome") is get_template("welcome")
+
+    def test_render_escapes_html_only(self):
+        rendered = render_notification(
+            "welcome", {"user_email": "a@example.com", "user_name": "<Ada>"}
+        )
+        assert rendered.to_email == "a@example.com"
+        assert "Hello <Ada>," in rendered.body
+        assert "&lt;Ada&gt;" in rendered.html_body
+
+    def test_missing_fields_and_unknown_type(self):
+        with pytest.raises(NotificationTemplateError):
+            render_notification("payment_succeeded", {"user_email": "a@example.com"})
+        with pytest.raises(NotificationTemplateError):
+            render_notification("carrier_pigeon", {})
+
+
+class TestNotificationDispatcher:
+    """Test retries, dead-lettering, per-type stats and concurrency."""
+
+    def test_retries_then_delivers(self):
+        email_tool = FlakyEmailTool(failures=2)
+        dispatcher, r = make_dispatcher(email_tool, max_attempts=4)
+        asyncio.run(dispatcher._process("1-0", welcome(1)))
+
+        assert email_tool.sent == [("lead1@example.com", "Thanks for your interest in TitanForge")]
+        assert r.acked == ["1-0"]
+        assert dispatcher.stats.snapshot()["lead_welcome"] == {
+            "delivered": 1,
+            "failed": 0,
+            "retried": 2,
+        }
+
+    def test_gives_up_after_max_attempts(self):
+        dispatcher, r = make_dispatcher(FlakyEmailTool(failures=10), max_attempts=3)
+        asyncio.run(dispatcher._process("1-0", welcome(1)))
+
+        assert [d["reason"] for d in r.dead_letters("notification_agent")] == [
+            "delivery failed after 3 attempt(s)"
+        ]
+        assert dispatcher.stats.snapshot()["lead_welcome"]["failed"] == 1
+
+    def test_bad_request_is_dead_lettered_without_retry(self):
+        email_tool = FlakyEmailTool()
+        dispatcher, r = make_dispatcher(email_tool)
+        message = welcome(1)
+        message["message"]["data"] = {}
+        asyncio.run(dispatcher._process("1-0", message))
+
+        assert email_tool.sent == []
+        assert len(r.dead_letters("notification_agent")) == 1
+
+    def test_sends_run_concurrently(self):
+        email_tool = FlakyEmailTool(delay=0.05)
+        dispatcher, r = make_dispatcher(email_tool, concurrency=10)
+
+        async def burst():
+            await asyncio.gather(
+                *(dispatcher._process(f"{i}-0", welcome(i)) for i in range(20))
+            )
+
+        started = time.perf_counter()
+        asyncio.run(burst())
+        elapsed = time.perf_counter() - started
+
+        assert len(email_tool.sent) == 20
+        assert elapsed < 20 * 0.05 / 2  # Well under the serial time
@@ -0,0 +1,137 @@
+"""Tests for the bulk outreach fan-out stage."""
+
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from app import db_models
+from app.services import outreach_fanout
+from swarm.departments.communications.notification_templates import render_notification
+
+from tests.conftest import FakeRedis
+
+
+def stage(db, user_id, emails):
+    import_id = str(uuid.uuid4())
+    leads = []
+    for email in emails:
+        lead = db_models.Lead(id=uuid.uuid4(), email=email, source="devry_alumni_import")
+        db.add(lead)
+        leads.append((lead.id, email))
+    db.flush()
+    outreach_fanout.stage_recipients(db, import_id, user_id, leads)
+    db.commit()
+    return outreach_fanout.seal_batch(db, import_id)
+
+
+class TestOutreachFanout:
+    """Test chunked fan-out, per-domain rate limits and delivery tracking."""
+
+    def test_chunks_respect_domain_budget(self, db, test_user):
+        emails = [f"a{i}@gmail.com" for i in range(5)] + ["b@acme.com", "c@acme.com"]
+        batch = stage(db, test_user.id, emails)
+        r = FakeRedis()
+        limiter = outreach_fanout.DomainRateLimiter(r, per_minute=3)
+
+        queued = outreach_fanout.fan_out_batch(db, batch, r=r, limiter=limiter, chunk_size=2)
+
+        messages = r.messages("agent_stream:notification_agent")
+        sizes = sorted(len(m["message"]["recipients"]) for m in messages)
+        assert queued == 5  # 3 gmail.com within budget, both acme.com
+        assert sizes == [1, 2, 2]
+        assert batch.status == "ready"  # Two gmail.com leads wait for the next window
+
+        pending = (
+            db.query(db_models.OutreachRecipient)
+            .filter(db_models.OutreachRecipient.status == "pending")
+            .count()
+        )
+        assert pending == 2
+
+    def test_delivery_closes_batch(self, db, test_user):
+        batch = stage(db, test_user.id, ["x@example.com", "y@example.com"])
+        r = FakeRedis()
+        outreach_fanout.fan_out_batch(db, batch, r=r, limiter=outreach_fanout.DomainRateLimiter(r))
+        (message,) = r.messages("agent_stream:notification_agent")
+        lead_ids = [item["lead_id"] for item in message["message"]["recipients"]]
+
+        outreach_fanout.record_delivery(db, str(batch.id), sent=lead_ids[:1], failed=lead_ids[1:])
+
+        db.refresh(batch)
+        assert (batch.status, batch.sent_count, batch.failed_count) == ("completed", 1, 1)
+        contacted = db.query(db_models.Lead).filter(db_models.Lead.status == "contacted").count()
+        assert contacted == 1
+
+    def test_stale_queued_recipients_are_handed_out_again(self, db, test_user):
+        batch = stage(db, test_user.id, ["x@example.com", "y@example.com"])
+        r = FakeRedis()
+        limiter = outreach_fanout.DomainRateLimiter(r)
+        outreach_fanout.fan_out_batch(db, batch, r=r, limiter=limiter)
+        assert batch.status == "queued"
+
+        # The chunk was dead-lettered, so no delivery is ever recorded
+        recipient = db_models.OutreachRecipient
+        db.query(recipient).update(
+            {"queued_at": datetime.now(timezone.utc) - timedelta(hours=2)},
+            synchronize_session=False,
+        )
+        db.commit()
+        r.streams.clear()
+
+        queued = outreach_fanout.fan_out_pending(db, r=r, limiter=limiter)
+
+        db.refresh(batch)
+        assert queued == 2
+        assert (batch.status, batch.queued_count) == ("queued", 2)
+        (message,) = r.messages("agent_stream:notification_agent")
+        lead_ids = [item["lead_id"] for item in message["message"]["recipients"]]
+        outreach_fanout.record_delivery(db, str(batch.id), sent=lead_ids, failed=[])
+        db.refresh(batch)
+        assert batch.status == "completed"
+
+    def test_recent_queued_recipients_are_left_alone(self, db, test_user):
+        batch = stage(db, test_user.id, ["x@example.com"])
+        r = FakeRedis()
+        outreach_fanout.fan_out_batch(db, batch, r=r, limiter=outreach_fanout.DomainRateLimiter(r))
+
+        assert outreach_fanout.requeue_stale(db) == 0
+        db.refresh(batch)
+        assert batch.status == "queued"
+
+    def test_outreach_email_template(self):
+        rendered = render_notification(
+            "alumni_outreach",
+            {"email": "x@example.com", "name": "Ada", "audience": "teams like Acme"},
+        )
+        assert rendered.to_email == "x@example.com"
+        assert "Hello Ada," in rendered.body
+        assert "busywork for teams like Acme." in rendered.body
+
+        bare = render_notification("alumni_outreach", {"email": "x@example.com", "audience": None})
+        assert "Hello there," in bare.body
+        assert "busywork for teams." in bare.body
+
+    def test_redelivered_message_is_counted_once(self, db, test_user):
+        batch = stage(db, test_user.id, ["x@example.com", "y@example.com", "z@example.com"])
+        r = FakeRedis()
+        outreach_fanout.fan_out_batch(db, batch, r=r, limiter=outreach_fanout.DomainRateLimiter(r))
+        (message,) = r.messages("agent_stream:notification_agent")
+        lead_ids = [item["lead_id"] for item in message["message"]["recipients"]]
+
+        for _ in range(2):
+            outreach_fanout.record_delivery(db, str(batch.id), sent=lead_ids[:2], failed=[])
+
+        db.refresh(batch)
+        assert (batch.status, batch.sent_count, batch.failed_count) == ("queued", 2, 0)
+
+    def test_unclaimed_budget_is_handed_back(self, db, test_user, monkeypatch):
+        batch = stage(db, test_user.id, ["a@gmail.com", "b@gmail.com"])
+        r = FakeRedis()
+        limiter = outreach_fanout.DomainRateLimiter(r, per_minute=10)
+        # Counted as pending, but another pass claims three of them first
+        monkeypatch.setattr(outreach_fanout, "_pending_by_domain", lambda db, batch_id: [("gmail.com", 5)])
+
+        queued = outreach_fanout.fan_out_batch(db, batch, r=r, limiter=limiter)
+
+        (used,) = [value for key, value in r.data.items() if key.startswith("outreach_rate:gmail.com:")]
+        assert queued == 2
+        assert used == 2
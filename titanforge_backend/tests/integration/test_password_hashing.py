@@ -0,0 +1,118 @@
+"""Offloaded bcrypt, per-IP login throttling and rehash on cost change."""
+
+import asyncio
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+from passlib.context import CryptContext
+
+from app import security
+from app.main import app
+from app.services import password_hasher as hashing
+from app.services.password_hasher import LoginThrottle, PasswordHasher, PasswordHasherBusy
+
+from tests.conftest import FakeRedis
+
+client = TestClient(app)
+
+
+def login(email, password="TestPassword123!"):
+    return client.post("/api/v1/auth/login", data={"username": email, "password": password})
+
+
+class TestPasswordHasher:
+    """Test that hashing leaves the event loop free and is bounded."""
+
+    def test_hashing_does_not_block_the_event_loop(self):
+        hasher = PasswordHasher(workers=2, max_pending=8)
+
+        async def run():
+            ticks = 0
+
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    ticks += 1
+                    await asyncio.sleep(0.001)
+
+            task = asyncio.ensure_future(ticker())
+            hashed = await hasher.hash("correct horse battery")
+            task.cancel()
+            return hashed, ticks
+
+        hashed, ticks = asyncio.run(run())
+        hasher.shutdown()
+        assert security.verify_password("correct horse battery", hashed)
+        assert ticks > 10
+
+    def test_rejects_work_beyond_the_pending_cap(self, monkeypatch):
+        release = threading.Event()
+        monkeypatch.setattr(security, "get_password_hash", lambda password: release.wait(5) and "h")
+        hasher = PasswordHasher(workers=1, max_pending=2)
+
+        async def run():
+            waiting = [asyncio.ensure_future(hasher.hash("pw")) for _ in range(2)]
+            await asyncio.sleep(0.05)
+            with pytest.raises(PasswordHasherBusy):
+                await hasher.hash("pw")
+            release.set()
+            return await asyncio.gather(*waiting)
+
+        assert asyncio.run(run()) == ["h", "h"]
+        hasher.shutdown()
+
+
+class TestUnknownUserLogin:
+    """Test that a login for an unknown email still pays for a bcrypt check."""
+
+    def test_unknown_email_is_verified_against_a_dummy_hash(self, db, fake_redis, monkeypatch):
+        checked = []
+        verify = security.verify_password
+        monkeypatch.setattr(
+            security, "verify_password", lambda pw, hashed: checked.append(hashed) or verify(pw, hashed)
+        )
+
+        response = login("nobody@example.com")
+
+        assert response.status_code == 401
+        assert response.json()["detail"] == "Incorrect email or password"
+        assert checked == [hashing._dummy_hash()]
+        assert f"${security.BCRYPT_ROUNDS:02d}$" in checked[0]
+
+
+class TestLoginThrottle:
+    """Test the per-IP fixed window in front of login."""
+
+    def test_allows_up_to_the_limit(self):
+        throttle = LoginThrottle(FakeRedis(), per_minute=3)
+        assert [throttle.hit("10.0.0.1") for _ in range(3)] == [0, 0, 0]
+        assert 1 <= throttle.hit("10.0.0.1") <= 60
+        assert throttle.hit("10.0.0.2") == 0
+
+    def test_login_returns_429_with_retry_after(self, fake_redis, test_user, monkeypatch):
+        monkeypatch.setattr(hashing.settings, "LOGIN_ATTEMPTS_PER_MINUTE", 2)
+        for _ in range(2):
+            assert login(test_user.email, "wrong-password").status_code == 401
+
+        response = login(test_user.email)
+        assert response.status_code == 429
+        assert int(response.headers["Retry-After"]) >= 1
+
+
+class TestRehashOnLogin:
+    """Test that a hash with an outdated cost is replaced on login."""
+
+    def test_outdated_hash_is_upgraded(self, db, fake_redis, test_user):
+        old_cost = 4 if security.BCRYPT_ROUNDS != 4 else 5
+        legacy = CryptContext(schemes=["bcrypt"], bcrypt__rounds=old_cost)
+        test_user.hashed_password = legacy.hash("TestPassword123!")
+        db.commit()
+
+        assert login(test_user.email).status_code == 200
+
+        db.refresh(test_user)
+        assert security.pwd_context.identify(test_user.hashed_password) == "bcrypt"
+        assert f"${security.BCRYPT_ROUNDS:02d}$" in test_user.hashed_password
+        assert not security.pwd_context.needs_update(test_user.hashed_password)
+        assert login(test_user.email).status_code == 200
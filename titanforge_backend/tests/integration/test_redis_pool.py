@@ -0,0 +1,81 @@
+"""Shared Redis pools, the async client and pipelined agent messages."""
+
+import asyncio
+from uuid import uuid4
+
+import pytest
+import redis
+from fastapi.testclient import TestClient
+
+from app import agent_bus, scheduler
+from app import redis_client as redis_pools
+from app.core.config import settings
+from app.main import app
+
+from tests.conftest import FakeRedis
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def fresh_pools(monkeypatch):
+    monkeypatch.setattr(redis_pools, "_pools", {})
+
+
+class TestConnectionPools:
+    """Test the pool factory; no connection is opened."""
+
+    def test_one_pool_per_url(self, fresh_pools):
+        pool = redis_pools.connection_pool("redis://cache:6379/0")
+        assert redis_pools.connection_pool("redis://cache:6379/0") is pool
+        assert redis_pools.connection_pool("redis://cache:6379/0", decode_responses=False) is not pool
+        assert isinstance(pool, redis.BlockingConnectionPool)
+        assert pool.max_connections == settings.REDIS_MAX_CONNECTIONS
+
+    def test_parses_auth_and_missing_db(self, fresh_pools):
+        kwargs = redis_pools.connection_pool("redis://:s3cret@cache:6380").connection_kwargs
+        assert (kwargs["host"], kwargs["port"], kwargs["password"]) == ("cache", 6380, "s3cret")
+        assert kwargs.get("db", 0) == 0
+        assert kwargs["health_check_interval"] == settings.REDIS_HEALTH_CHECK_INTERVAL
+
+    def test_clients_share_the_pool(self, fresh_pools):
+        first = redis_pools.get_redis_client("redis://cache:6379")
+        second = redis_pools.get_redis_client("redis://cache:6379")
+        assert first.connection_pool is second.connection_pool
+
+    def test_async_client_per_event_loop(self):
+        async def clients():
+            return await redis_pools.get_async_redis(), await redis_pools.get_async_redis()
+
+        first, again = asyncio.run(clients())
+        assert first is again
+        other, _ = asyncio.run(clients())
+        assert other is not first
+
+
+class TestPipelinedMessages:
+    """Test that multi-message sends take one round trip."""
+
+    def test_publish_many(self):
+        r = FakeRedis()
+        ids = agent_bus.publish_many(
+            r, [("analytics_agent", "mcp", {"a": 1}), ("notification_agent", "mcp", {"b": 2})]
+        )
+        assert len(ids) == 2
+        assert r.round_trips == 1
+        assert set(r.streams) == {"agent_stream:analytics_agent", "agent_stream:notification_agent"}
+
+    def test_create_lead_sends_both_messages_at_once(self, fake_redis):
+        response = client.post(
+            "/api/v1/leads", json={"email": f"pipelined-{uuid4().hex[:8]}@example.com"}
+        )
+        assert response.status_code == 201
+        assert fake_redis.round_trips == 1
+        assert len(fake_redis.streams["agent_stream:analytics_agent"]) == 1
+        assert len(fake_redis.streams["agent_stream:notification_agent"]) == 1
+
+    def test_scheduler_uses_the_shared_client(self, monkeypatch):
+        r = FakeRedis()
+        monkeypatch.setattr(scheduler, "redis_client", r)
+        scheduler.aggregate_analytics_task()
+        assert len(r.streams["agent_stream:analytics_agent"]) == 1
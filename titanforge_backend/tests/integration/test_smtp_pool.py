@@ -0,0 +1,133 @@
+"""Tests for the pooled SMTP transport against a local aiosmtpd server."""
+
+import socket
+from email.message import EmailMessage
+
+import pytest
+
+aiosmtpd_controller = pytest.importorskip("aiosmtpd.controller")
+
+from swarm.tools.email_tool import EmailTool
+from swarm.tools.smtp_pool import SMTPConnectionPool
+
+
+class RecordingHandler:
+    def __init__(self):
+        self.envelopes = []
+        self.peers = set()
+
+    async def handle_DATA(self, server, session, envelope):
+        self.envelopes.append(envelope)
+        self.peers.add(session.peer)
+        return "250 Message accepted for delivery"
+
+
+class RefusingHandler(RecordingHandler):
+    """Refuses recipients at blocked.example, optionally advertising PIPELINING."""
+
+    def __init__(self, pipelining):
+        super().__init__()
+        self.pipelining = pipelining
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        session.host_name = hostname
+        if self.pipelining:
+            responses.insert(-1, "250-PIPELINING")
+        return responses
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address.endswith("@blocked.example"):
+            return "550 5.1.1 Mailbox unavailable"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(handler, port):
+    controller = aiosmtpd_controller.Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    return controller
+
+
+@pytest.fixture
+def smtp_server():
+    # A list so a test can swap in a restarted controller; a stopped
+    # controller has closed its event loop and cannot be started again
+    handler = RecordingHandler()
+    server = [start_server(handler, free_port()), handler]
+    yield server
+    server[0].stop()
+
+
+@pytest.fixture
+def email_tool(smtp_server):
+    controller, _ = smtp_server
+    pool = SMTPConnectionPool(controller.hostname, controller.port, security="none", size=2)
+    yield EmailTool(pool=pool, sender_email="noreply@titanforge.test")
+    pool.close()
+
+
+def batch(count):
+    return [
+        {"to_email": f"lead{i}@example.com", "subject": f"Hello {i}", "body": f"Body {i}"}
+        for i in range(count)
+    ]
+
+
+class TestSMTPPool:
+    """Test session reuse, batch sending and reconnects."""
+
+    def test_send_many_reuses_one_session(self, smtp_server, email_tool):
+        _, handler = smtp_server
+        stats = email_tool.send_many(batch(25))
+
+        assert (stats.sent, stats.failed) == (25, 0)
+        assert stats.messages_per_second > 0
+        assert len(handler.envelopes) == 25
+        assert len(handler.peers) == 1
+        assert handler.envelopes[0].rcpt_tos == ["lead0@example.com"]
+
+    def test_single_sends_share_the_pool(self, smtp_server, email_tool):
+        _, handler = smtp_server
+        for i in range(5):
+            assert email_tool.send_email(f"user{i}@example.com", "Welcome", "Hi")
+        assert len(handler.envelopes) == 5
+        assert email_tool.pool.connections_opened == 1
+
+    def test_reconnects_after_server_restart(self, smtp_server, email_tool):
+        controller, handler = smtp_server
+        email_tool.send_many(batch(2))
+        controller.stop()
+        smtp_server[0] = start_server(handler, controller.port)
+
+        stats = email_tool.send_many(batch(3))
+
+        assert (stats.sent, stats.failed, stats.reconnects) == (3, 0, 1)
+        assert len(handler.envelopes) == 5
+
+    @pytest.mark.parametrize("pipelining", [True, False])
+    def test_partly_refused_recipients_are_reported(self, pipelining):
+        handler = RefusingHandler(pipelining)
+        controller = start_server(handler, free_port())
+        pool = SMTPConnectionPool(controller.hostname, controller.port, security="none")
+        message = EmailMessage()
+        message["From"] = "noreply@titanforge.test"
+        message["To"] = "a@example.com, b@blocked.example, c@example.com"
+        message["Subject"] = "Hello"
+        message.set_content("Body")
+        try:
+            stats = pool.send_many([message])
+        finally:
+            pool.close()
+            controller.stop()
+
+        assert (stats.sent, stats.failed, stats.refused) == (1, 0, 1)
+        assert stats.pipelined is pipelining
+        assert [recipient for recipient, _ in stats.failures] == ["b@blocked.example"]
+        assert stats.failures[0][1].startswith("550")
+        assert handler.envelopes[0].rcpt_tos == ["a@example.com", "c@example.com"]
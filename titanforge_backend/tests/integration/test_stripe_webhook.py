@@ -0,0 +1,76 @@
+"""Tests for the idempotent Stripe webhook endpoint."""
+
+import json
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.v1 import stripe_webhooks
+from app.main import app
+from app.services.stripe_events import partition_agent_id, partition_for
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def verified(monkeypatch):
+    """Signature headers passed to Stripe verification."""
+    verified = []
+
+    def construct(payload, sig_header):
+        verified.append(sig_header)
+        body = json.loads(payload)
+        return SimpleNamespace(id=body["id"], type=body["type"])
+
+    monkeypatch.setattr(stripe_webhooks.stripe_tool, "construct_webhook_event", construct)
+    return verified
+
+
+def queued_for(r, customer_id):
+    return r.messages(f"agent_stream:{partition_agent_id(partition_for(customer_id))}")
+
+
+def post_event(event_id, customer_id="cus_1"):
+    body = {
+        "id": event_id,
+        "type": "invoice.payment_succeeded",
+        "data": {"object": {"object": "invoice", "customer": customer_id}},
+    }
+    return client.post(
+        "/api/v1/stripe-webhook",
+        content=json.dumps(body),
+        headers={"stripe-signature": "t=1,v1=sig"},
+    )
+
+
+class TestStripeWebhook:
+    """Test single verification and retry short-circuiting."""
+
+    def test_event_is_queued_parsed_with_dedupe_key(self, fake_redis, verified):
+        response = post_event("evt_1")
+
+        assert response.status_code == 200
+        assert response.json()["status"] == "success"
+        (queued,) = queued_for(fake_redis, "cus_1")
+        message = queued["message"]
+        assert message["action"] == "handle_webhook_event"
+        assert message["dedupe_key"] == "evt_1"
+        assert message["event"]["type"] == "invoice.payment_succeeded"
+        assert "signature" not in message
+        assert len(verified) == 1
+
+    def test_retry_is_a_no_op(self, fake_redis, verified):
+        post_event("evt_2")
+        response = post_event("evt_2")
+
+        assert response.status_code == 200
+        assert response.json()["status"] == "duplicate"
+        assert len(queued_for(fake_redis, "cus_1")) == 1
+
+    def test_events_of_one_customer_share_a_partition(self, fake_redis, verified):
+        for i in range(5):
+            post_event(f"evt_c{i}", customer_id="cus_ordered")
+
+        queued = queued_for(fake_redis, "cus_ordered")
+        assert [m["message"]["dedupe_key"] for m in queued] == [f"evt_c{i}" for i in range(5)]
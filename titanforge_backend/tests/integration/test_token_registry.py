@@ -0,0 +1,91 @@
+"""Tests for token revocation, refresh rotation and the revocation Bloom filter."""
+
+import time
+from uuid import uuid4
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import token_registry
+from app.services.token_registry import BloomFilter, RevocationIndex
+
+from tests.conftest import FakeRedis
+
+client = TestClient(app)
+
+
+def login(user):
+    response = client.post(
+        "/api/v1/auth/login", data={"username": user.email, "password": "TestPassword123!"}
+    )
+    assert response.status_code == 200
+    return response.json()
+
+
+def bearer(tokens):
+    return {"Authorization": f"Bearer {tokens['access_token']}"}
+
+
+class TestBloomFilter:
+    """Test the in-process revocation filter."""
+
+    def test_no_false_negatives(self):
+        bloom = BloomFilter(1000, 0.001)
+        ids = [uuid4().hex for _ in range(1000)]
+        for jti in ids:
+            bloom.add(jti)
+        assert all(jti in bloom for jti in ids)
+
+    def test_false_positive_rate_is_bounded(self):
+        bloom = BloomFilter(1000, 0.01)
+        for _ in range(1000):
+            bloom.add(uuid4().hex)
+        false_positives = sum(uuid4().hex in bloom for _ in range(10000))
+        assert false_positives < 300
+
+    def test_loaded_index_skips_expired_revocations(self):
+        r = FakeRedis()
+        r.zadd(token_registry.REVOKED_SET, {"live": time.time() + 60, "old": time.time() - 60})
+        index = RevocationIndex(r=r, capacity=100)
+        assert index.might_contain("anything")  # Not loaded: ask Redis
+
+        index.load()
+        assert index.might_contain("live")
+        assert r.zrange(token_registry.REVOKED_SET, 0, -1) == ["live"]
+
+
+class TestTokenRevocation:
+    """Test logout, rotation and reuse detection through the API."""
+
+    def test_logout_revokes_the_access_token(self, fake_redis, test_user):
+        tokens = login(test_user)
+        assert client.get("/api/v1/auth/me", headers=bearer(tokens)).status_code == 200
+
+        assert client.post("/api/v1/auth/logout", headers=bearer(tokens)).status_code == 200
+        assert client.get("/api/v1/auth/me", headers=bearer(tokens)).status_code == 401
+
+    def test_refresh_rotates_and_detects_reuse(self, fake_redis, test_user):
+        first = login(test_user)
+        response = client.post("/api/v1/auth/refresh", json={"refresh_token": first["refresh_token"]})
+        assert response.status_code == 200
+        second = response.json()
+
+        # The old refresh token was already used: the whole login is revoked
+        reused = client.post("/api/v1/auth/refresh", json={"refresh_token": first["refresh_token"]})
+        assert reused.status_code == 401
+        assert client.get("/api/v1/auth/me", headers=bearer(second)).status_code == 401
+        rotated = client.post("/api/v1/auth/refresh", json={"refresh_token": second["refresh_token"]})
+        assert rotated.status_code == 401
+
+    def test_refresh_token_is_not_an_access_token(self, fake_redis, test_user):
+        tokens = login(test_user)
+        headers = {"Authorization": f"Bearer {tokens['refresh_token']}"}
+        assert client.get("/api/v1/auth/me", headers=headers).status_code == 401
+
+    def test_logout_everywhere(self, fake_redis, test_user):
+        laptop, phone = login(test_user), login(test_user)
+        response = client.post(
+            "/api/v1/auth/logout", headers=bearer(laptop), json={"everywhere": True}
+        )
+        assert response.status_code == 200
+        assert client.get("/api/v1/auth/me", headers=bearer(phone)).status_code == 401
@@ -0,0 +1,88 @@
+"""Cached user principals in get_current_user, plus a throughput benchmark."""
+
+import time
+from uuid import uuid4
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app import crud, schemas, security
+from app.core.config import settings
+from app.database import engine
+from app.main import app
+
+client = TestClient(app)
+
+BENCHMARK_REQUESTS = 200
+
+
+class StatementCounter:
+    """Counts SQL statements sent to the database while active."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __enter__(self):
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+
+def token_for(email):
+    return {"Authorization": f"Bearer {security.create_access_token({'sub': email})}"}
+
+
+def measure(headers, requests=BENCHMARK_REQUESTS):
+    with StatementCounter() as counter:
+        started = time.perf_counter()
+        for _ in range(requests):
+            response = client.get("/api/v1/auth/me", headers=headers)
+            assert response.status_code == 200
+        elapsed = time.perf_counter() - started
+    return counter.count, requests / elapsed
+
+
+class TestUserPrincipalCache:
+    """Authenticated requests must not query the database for the user."""
+
+    def test_cached_requests_skip_the_database(self, fake_redis, test_user, auth_headers, monkeypatch):
+        monkeypatch.setattr(settings, "USER_PRINCIPAL_TTL", 0)
+        uncached_statements, uncached_rate = measure(auth_headers)
+
+        monkeypatch.setattr(settings, "USER_PRINCIPAL_TTL", 30)
+        client.get("/api/v1/auth/me", headers=auth_headers)  # Warm the cache
+        cached_statements, cached_rate = measure(auth_headers)
+
+        print(
+            f"\n{BENCHMARK_REQUESTS} authenticated requests: "
+            f"uncached {uncached_statements} statements, {uncached_rate:.0f} req/s; "
+            f"cached {cached_statements} statements, {cached_rate:.0f} req/s"
+        )
+        assert uncached_statements >= BENCHMARK_REQUESTS
+        assert cached_statements == 0
+
+    def test_cached_user_matches_the_database(self, fake_redis, test_user, auth_headers):
+        first = client.get("/api/v1/auth/me", headers=auth_headers).json()
+        second = client.get("/api/v1/auth/me", headers=auth_headers).json()
+        assert first == second
+        assert second["email"] == test_user.email
+
+    def test_deactivation_takes_effect_immediately(self, db, fake_redis, test_user, auth_headers):
+        test_user.is_superuser = True
+        db.commit()
+        other = crud.create_user(
+            db, schemas.UserCreate(email=f"cached-{uuid4().hex[:8]}@example.com", password="password123")
+        )
+        other_headers = token_for(other.email)
+        assert client.get("/api/v1/auth/me", headers=other_headers).status_code == 200
+
+        response = client.post(f"/api/v1/admin/deactivate-user/{other.id}", headers=auth_headers)
+        assert response.status_code == 200
+        assert response.json()["is_active"] is False
+
+        assert client.get("/api/v1/auth/me", headers=other_headers).status_code == 400